@@ -0,0 +1,81 @@
+"""
+Benchmark: memória por cliente com dict por linha x registro Cliente.
+
+Mede com tracemalloc a leitura de todos os clientes (SELECT *) já com os
+campos derivados calculados: no formato antigo, dict(zip(colunas, linha))
+mais as chaves ``vencimento_obj`` e ``dias_restantes`` acrescentadas pelos
+handlers; no atual, Cliente.fabrica com ``vencimento_obj`` acessado.
+
+Uso: python bench/bench_memoria.py [clientes]
+"""
+
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from comum import criar_banco, registrar
+
+from database import Cliente, SQL_CLIENTES_TODOS, agora_br, fechar_pools
+
+
+def como_dicts(conn: sqlite3.Connection) -> list:
+    """Formato antigo: um dict por linha, completado pelos handlers"""
+    cursor = conn.execute(SQL_CLIENTES_TODOS)
+    colunas = [description[0] for description in cursor.description]
+    clientes = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+    hoje = agora_br().date()
+    for cliente in clientes:
+        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
+        cliente['vencimento_obj'] = vencimento
+        cliente['dias_restantes'] = (vencimento.date() - hoje).days
+    return clientes
+
+
+def como_registros(conn: sqlite3.Connection) -> list:
+    """Formato atual: Cliente com __slots__ e vencimento convertido uma vez"""
+    cursor = conn.execute(SQL_CLIENTES_TODOS)
+    montar = Cliente.fabrica([description[0] for description in cursor.description])
+    clientes = [montar(linha) for linha in cursor.fetchall()]
+    for cliente in clientes:
+        cliente.vencimento_obj
+    return clientes
+
+
+def medir(carregar, conn: sqlite3.Connection):
+    """(clientes lidos, bytes retidos, pico em bytes) ao carregar todos os clientes"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        clientes = carregar(conn)
+        atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return len(clientes), atual, pico
+
+
+def main():
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db_path = os.path.join(pasta, 'clientes.db')
+        criar_banco(db_path, clientes)
+        fechar_pools()
+        conn = sqlite3.connect(db_path)
+        try:
+            linhas = [f"clientes: {clientes}"]
+            for nome, carregar in (("dict por linha", como_dicts), ("Cliente", como_registros)):
+                total, atual, pico = medir(carregar, conn)
+                linhas.append(f"{nome:<15} {atual / total:7.0f} bytes/cliente "
+                              f"(pico {pico / total:.0f})")
+        finally:
+            conn.close()
+
+    registrar("Memória por cliente", linhas)
+
+
+if __name__ == '__main__':
+    main()
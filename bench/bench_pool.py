@@ -0,0 +1,82 @@
+"""
+Benchmark: conexão nova a cada chamada x conexões do pool (PoolConexoes).
+
+Repete o padrão de um handler (busca pela chave primária e clientes vencendo
+em 3 dias) num banco com 50 mil clientes. Conexão avulsa era o comportamento
+do DatabaseManager antes do pool.
+
+Uso: python bench/bench_pool.py [clientes] [repeticoes]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from comum import criar_banco, registrar
+
+from database import (PoolConexoes, SQL_CLIENTE_POR_ID, SQL_CLIENTES_VENCENDO, data_br,
+                      fechar_pools)
+
+
+def consultas(clientes: int, repeticoes: int):
+    """Pares (SQL, parâmetros) executados em cada rodada"""
+    passo = max(1, clientes // repeticoes)
+    for i in range(repeticoes):
+        yield SQL_CLIENTE_POR_ID, ((i * passo) % clientes + 1,)
+        if i % 10 == 0:
+            yield SQL_CLIENTES_VENCENDO, (data_br(3), data_br(4))
+
+
+def por_chamada(db_path: str, lista) -> float:
+    """Abre e fecha uma conexão por consulta"""
+    inicio = time.perf_counter()
+    for query, params in lista:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+    return time.perf_counter() - inicio
+
+
+def com_pool(db_path: str, lista) -> float:
+    """Empresta uma conexão do pool por consulta"""
+    pool = PoolConexoes(db_path)
+    try:
+        inicio = time.perf_counter()
+        for query, params in lista:
+            with pool.conexao() as conn:
+                conn.execute(query, params).fetchall()
+        return time.perf_counter() - inicio
+    finally:
+        pool.fechar()
+
+
+def main():
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db_path = os.path.join(pasta, 'clientes.db')
+        criar_banco(db_path, clientes)
+        lista = list(consultas(clientes, repeticoes))
+
+        # Uma rodada de aquecimento para o cache de páginas do SO
+        por_chamada(db_path, lista[:100])
+        avulsa = por_chamada(db_path, lista)
+        pool = com_pool(db_path, lista)
+        # Fecha o pool aberto por criar_tabela antes de apagar a pasta
+        fechar_pools()
+
+    registrar("Pool de conexões", [
+        f"clientes: {clientes}, consultas: {len(lista)}",
+        f"conexão por chamada: {avulsa:.3f}s ({avulsa / len(lista) * 1e6:.1f} µs/consulta)",
+        f"pool:                {pool:.3f}s ({pool / len(lista) * 1e6:.1f} µs/consulta)",
+        f"ganho: {avulsa / pool:.1f}x",
+    ])
+
+
+if __name__ == '__main__':
+    main()
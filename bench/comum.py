@@ -0,0 +1,44 @@
+"""
+Apoio dos benchmarks: banco de teste com clientes fictícios e registro dos
+resultados em bench_output.txt, na raiz do projeto (fora do git).
+"""
+
+import os
+import random
+import sqlite3
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAIDA = os.path.join(RAIZ, 'bench_output.txt')
+
+sys.path.insert(0, RAIZ)
+
+import database
+from database import criar_tabela, data_br, momento_br
+
+
+def criar_banco(db_path: str, clientes: int):
+    """Cria o esquema do bot em ``db_path`` e insere ``clientes`` clientes"""
+    database.DB_PATH = db_path
+    criar_tabela()
+    sorteio = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany('''
+            INSERT INTO clientes (nome, telefone, pacote, plano, vencimento, servidor)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(f"Cliente {i}", f"55119{i:08d}", sorteio.choice(("Mensal", "Trimestral")),
+               sorteio.choice((25.0, 35.0, 90.0)), data_br(sorteio.randint(-30, 60)),
+               sorteio.choice(("srv1", "srv2", "srv3")))
+              for i in range(clientes)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def registrar(titulo: str, linhas):
+    """Mostra o resultado e o acrescenta ao arquivo de saída"""
+    texto = "\n".join([f"== {titulo} ({momento_br()}) ==", *linhas, ""])
+    print(texto)
+    with open(SAIDA, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(texto + "\n")
@@ -189,8 +189,12 @@ def verificar_admin(func):
     async def wrapper(update, context):
         admin_id = int(os.getenv('ADMIN_CHAT_ID', '0'))
         if update.effective_chat.id != admin_id:
-            await update.message.reply_text(
-                "❌ Acesso negado. Apenas o admin pode usar este bot.")
+            aviso = "❌ Acesso negado. Apenas o admin pode usar este bot."
+            if update.callback_query:
+                # Botões inline não têm update.message: responde no próprio botão
+                await update.callback_query.answer(aviso, show_alert=True)
+            else:
+                await update.effective_message.reply_text(aviso)
             return
         return await func(update, context)
 
@@ -203,9 +207,9 @@ async def start(update, context):
     nome_admin = update.effective_user.first_name
 
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        total_clientes = len(db.listar_clientes())
+        from database.db import obter_db
+        db = obter_db()
+        total_clientes = (await db.snapshot_status())['total']
     except:
         total_clientes = 0
 
@@ -539,14 +543,14 @@ async def confirmar_cadastro(update, context):
     elif update.message.text == "✅ Confirmar":
         # Salvar no banco
         try:
-            from database import DatabaseManager
-            db = DatabaseManager()
+            from database.db import obter_db
+            db = obter_db()
             dados = context.user_data
 
-            sucesso = db.adicionar_cliente(dados['nome'], dados['telefone'],
-                                           dados['pacote'], dados['valor'],
-                                           dados['vencimento'],
-                                           dados['servidor'])
+            sucesso = await db.adicionar_cliente(dados['nome'], dados['telefone'],
+                                                 dados['pacote'], dados['valor'],
+                                                 dados['vencimento'],
+                                                 dados['servidor'])
 
             if sucesso:
                 data_formatada = datetime.strptime(
@@ -659,11 +663,11 @@ async def add_cliente(update, context):
                 "❌ Data deve estar no formato AAAA-MM-DD!")
             return
 
-        from database import DatabaseManager
-        db = DatabaseManager()
+        from database.db import obter_db
+        db = obter_db()
 
-        sucesso = db.adicionar_cliente(nome, telefone, pacote, valor,
-                                       vencimento, servidor)
+        sucesso = await db.adicionar_cliente(nome, telefone, pacote, valor,
+                                             vencimento, servidor)
 
         if sucesso:
             await update.message.reply_text(
@@ -683,98 +687,113 @@ async def add_cliente(update, context):
         await update.message.reply_text("❌ Erro interno do sistema!")
 
 
-@verificar_admin
-async def listar_clientes(update, context):
-    """Lista todos os clientes com botões interativos ordenados por vencimento"""
-    try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
+async def montar_pagina_clientes(db, cursor=None, anterior=False, pagina=1):
+    """Monta texto e teclado de uma página da lista de clientes.
 
-        if not clientes:
-            await update.message.reply_text(
-                "📋 Nenhum cliente cadastrado ainda.\n\n"
-                "Use ➕ Adicionar Cliente para começar!",
-                reply_markup=criar_teclado_principal())
-            return
+    A página é buscada por cursor (vencimento, id) direto no banco; os botões
+    de navegação levam o cursor da borda da página no callback_data.
+    Retorna None quando não há clientes ativos.
+    """
+    clientes, tem_mais = await db.pagina_clientes(cursor, anterior)
 
-        # Ordenar clientes por data de vencimento (mais próximo primeiro)
-        clientes_ordenados = []
-        for cliente in clientes:
-            try:
-                vencimento = datetime.strptime(cliente['vencimento'],
-                                               '%Y-%m-%d')
-                cliente['vencimento_obj'] = vencimento
-                cliente['dias_restantes'] = (
-                    vencimento - agora_br().replace(tzinfo=None)).days
-                clientes_ordenados.append(cliente)
-            except (ValueError, KeyError) as e:
-                logger.error(f"Erro ao processar cliente {cliente}: {e}")
-                continue
-
-        # Ordenar por data de vencimento (mais próximo primeiro)
-        clientes_ordenados.sort(key=lambda x: x['vencimento_obj'])
-
-        # Contar clientes por status para resumo
-        total_clientes = len(clientes_ordenados)
-        hoje = agora_br().replace(tzinfo=None)
-        vencidos = len(
-            [c for c in clientes_ordenados if c['dias_restantes'] < 0])
-        vencendo_hoje = len(
-            [c for c in clientes_ordenados if c['dias_restantes'] == 0])
-        vencendo_breve = len(
-            [c for c in clientes_ordenados if 0 < c['dias_restantes'] <= 3])
-        ativos = total_clientes - vencidos
+    if not clientes:
+        return None
 
+    if cursor is None:
+        tem_anterior, tem_proxima = False, tem_mais
+    elif anterior:
+        tem_anterior, tem_proxima = tem_mais, True
+    else:
+        tem_anterior, tem_proxima = True, tem_mais
+
+    if pagina == 1:
+        # Resumo apenas na primeira página (lido do snapshot de status)
+        resumo = await db.snapshot_status()
         mensagem = f"""👥 *LISTA DE CLIENTES*
 
-📊 *Resumo:* {total_clientes} clientes
-🔴 {vencidos} vencidos • ⚠️ {vencendo_hoje} hoje • 🟡 {vencendo_breve} em breve • 🟢 {ativos} ativos
+📊 *Resumo:* {resumo['total']} clientes
+🔴 {resumo['vencidos']} vencidos • ⚠️ {resumo['vencendo_hoje']} hoje • 🟡 {resumo['vencendo_breve']} em breve • 🟢 {resumo['ativos']} ativos
 
 💡 *Clique em um cliente para ver detalhes:*"""
+    else:
+        mensagem = f"""👥 *LISTA DE CLIENTES* — Página {pagina}
 
-        # Criar apenas botões inline para cada cliente
-        keyboard = []
+💡 *Clique em um cliente para ver detalhes:*"""
 
-        for cliente in clientes_ordenados[:50]:  # Limitado a 50 botões
-            dias_restantes = cliente['dias_restantes']
-            vencimento = cliente['vencimento_obj']
+    # Criar apenas botões inline para cada cliente
+    keyboard = []
 
-            # Definir status e emoji
-            if dias_restantes < 0:
-                status_emoji = "🔴"
-            elif dias_restantes == 0:
-                status_emoji = "⚠️"
-            elif dias_restantes <= 3:
-                status_emoji = "🟡"
-            else:
-                status_emoji = "🟢"
+    for cliente in clientes:
+        vencimento = cliente.vencimento_obj
+        if vencimento is None:
+            logger.error(f"Vencimento inválido no cliente {cliente}")
+            continue
+        dias_restantes = cliente.dias_restantes
 
-            # Texto do botão com informações principais
-            nome_curto = cliente['nome'][:18] + "..." if len(
-                cliente['nome']) > 18 else cliente['nome']
-            botao_texto = f"{status_emoji} {nome_curto} - R${cliente['plano']:.0f} - {vencimento.strftime('%d/%m')}"
-
-            # Criar botão inline para cada cliente
-            keyboard.append([
-                InlineKeyboardButton(botao_texto,
-                                     callback_data=f"cliente_{cliente['id']}")
-            ])
+        # Definir status e emoji
+        if dias_restantes < 0:
+            status_emoji = "🔴"
+        elif dias_restantes == 0:
+            status_emoji = "⚠️"
+        elif dias_restantes <= 3:
+            status_emoji = "🟡"
+        else:
+            status_emoji = "🟢"
 
-        # Mostrar aviso se há mais clientes
-        if total_clientes > 50:
-            mensagem += f"\n\n⚠️ *Mostrando primeiros 50 de {total_clientes} clientes*\nUse 🔍 Buscar Cliente para encontrar outros."
+        # Texto do botão com informações principais
+        nome_curto = cliente.nome[:18] + "..." if len(
+            cliente.nome) > 18 else cliente.nome
+        botao_texto = f"{status_emoji} {nome_curto} - R${cliente.plano:.0f} - {vencimento.strftime('%d/%m')}"
 
-        # Adicionar botões de ação geral
         keyboard.append([
-            InlineKeyboardButton("🔄 Atualizar Lista",
-                                 callback_data="atualizar_lista"),
-            InlineKeyboardButton("📊 Relatório",
-                                 callback_data="gerar_relatorio")
+            InlineKeyboardButton(botao_texto,
+                                 callback_data=f"cliente_{cliente.id}")
         ])
 
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    # Navegação: lista_ant_<pagina>_<vencimento>_<id> / lista_prox_...
+    navegacao = []
+    if tem_anterior:
+        primeiro = clientes[0]
+        navegacao.append(
+            InlineKeyboardButton(
+                "⬅️ Anterior",
+                callback_data=f"lista_ant_{pagina - 1}_{primeiro['vencimento']}_{primeiro['id']}"))
+    if tem_proxima:
+        ultimo = clientes[-1]
+        navegacao.append(
+            InlineKeyboardButton(
+                "Próxima ➡️",
+                callback_data=f"lista_prox_{pagina + 1}_{ultimo['vencimento']}_{ultimo['id']}"))
+    if navegacao:
+        keyboard.append(navegacao)
+
+    # Adicionar botões de ação geral
+    keyboard.append([
+        InlineKeyboardButton("🔄 Atualizar Lista",
+                             callback_data="atualizar_lista"),
+        InlineKeyboardButton("📊 Relatório",
+                             callback_data="gerar_relatorio")
+    ])
+
+    return mensagem, InlineKeyboardMarkup(keyboard)
+
+
+@verificar_admin
+async def listar_clientes(update, context):
+    """Lista os clientes com botões interativos ordenados por vencimento"""
+    try:
+        from database.db import obter_db
+        db = obter_db()
+        pagina = await montar_pagina_clientes(db)
+
+        if not pagina:
+            await update.message.reply_text(
+                "📋 Nenhum cliente cadastrado ainda.\n\n"
+                "Use ➕ Adicionar Cliente para começar!",
+                reply_markup=criar_teclado_principal())
+            return
 
+        mensagem, reply_markup = pagina
         await update.message.reply_text(mensagem,
                                         parse_mode='Markdown',
                                         reply_markup=reply_markup)
@@ -802,6 +821,10 @@ async def callback_cliente(update, context):
             # Atualizar a lista de clientes
             await atualizar_lista_clientes(query, context)
 
+        elif data.startswith("lista_"):
+            # Navegar entre páginas da lista (formato: lista_prox_2_2025-01-31_123)
+            await navegar_lista_clientes(query, context, data)
+
         elif data == "gerar_relatorio":
             # Gerar relatório rápido
             await gerar_relatorio_inline(query, context)
@@ -859,17 +882,15 @@ async def callback_cliente(update, context):
 async def mostrar_detalhes_cliente(query, context, cliente_id):
     """Mostra detalhes completos de um cliente específico"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
-
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id, ativo_apenas=True)
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
-        dias_restantes = (vencimento - agora_br().replace(tzinfo=None)).days
+        vencimento = cliente.vencimento_obj
+        dias_restantes = cliente.dias_restantes
 
         # Status do cliente
         if dias_restantes < 0:
@@ -883,11 +904,11 @@ async def mostrar_detalhes_cliente(query, context, cliente_id):
 
         mensagem = f"""👤 *DETALHES DO CLIENTE*
 
-📝 *Nome:* {cliente['nome']}
-📱 *Telefone:* {cliente['telefone']}
-📦 *Pacote:* {cliente['pacote']}
-💰 *Valor:* R$ {cliente['plano']:.2f}
-🖥️ *Servidor:* {cliente['servidor']}
+📝 *Nome:* {cliente.nome}
+📱 *Telefone:* {cliente.telefone}
+📦 *Pacote:* {cliente.pacote}
+💰 *Valor:* R$ {cliente.plano:.2f}
+🖥️ *Servidor:* {cliente.servidor}
 📅 *Vencimento:* {vencimento.strftime('%d/%m/%Y')}
 
 📊 *Status:* {status}"""
@@ -924,129 +945,74 @@ async def mostrar_detalhes_cliente(query, context, cliente_id):
 
 
 async def atualizar_lista_clientes(query, context):
-    """Atualiza a lista de clientes inline"""
+    """Atualiza a lista de clientes inline (volta para a primeira página)"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
+        from database.db import obter_db
+        db = obter_db()
+        pagina = await montar_pagina_clientes(db)
 
-        if not clientes:
+        if not pagina:
             await query.edit_message_text("📋 Nenhum cliente cadastrado ainda.")
             return
 
-        # Recriar a lista ordenada (mesmo código da função listar_clientes)
-        clientes_ordenados = []
-        for cliente in clientes:
-            try:
-                vencimento = datetime.strptime(cliente['vencimento'],
-                                               '%Y-%m-%d')
-                cliente['vencimento_obj'] = vencimento
-                cliente['dias_restantes'] = (
-                    vencimento - agora_br().replace(tzinfo=None)).days
-                clientes_ordenados.append(cliente)
-            except (ValueError, KeyError):
-                continue
-
-        clientes_ordenados.sort(key=lambda x: x['vencimento_obj'])
-
-        # Contar clientes por status para resumo
-        total_clientes = len(clientes_ordenados)
-        hoje = agora_br().replace(tzinfo=None)
-        vencidos = len(
-            [c for c in clientes_ordenados if c['dias_restantes'] < 0])
-        vencendo_hoje = len(
-            [c for c in clientes_ordenados if c['dias_restantes'] == 0])
-        vencendo_breve = len(
-            [c for c in clientes_ordenados if 0 < c['dias_restantes'] <= 3])
-        ativos = total_clientes - vencidos
-
-        mensagem = f"""👥 *LISTA DE CLIENTES*
-
-📊 *Resumo:* {total_clientes} clientes
-🔴 {vencidos} vencidos • ⚠️ {vencendo_hoje} hoje • 🟡 {vencendo_breve} em breve • 🟢 {ativos} ativos
-
-💡 *Clique em um cliente para ver detalhes:*"""
-
-        keyboard = []
-
-        # Mostrar apenas botões, sem texto da lista
-        for cliente in clientes_ordenados[:50]:  # Limitado a 50 botões
-            dias_restantes = cliente['dias_restantes']
-            vencimento = cliente['vencimento_obj']
-
-            if dias_restantes < 0:
-                status_emoji = "🔴"
-            elif dias_restantes == 0:
-                status_emoji = "⚠️"
-            elif dias_restantes <= 3:
-                status_emoji = "🟡"
-            else:
-                status_emoji = "🟢"
-
-            nome_curto = cliente['nome'][:18] + "..." if len(
-                cliente['nome']) > 18 else cliente['nome']
-            botao_texto = f"{status_emoji} {nome_curto} - R${cliente['plano']:.0f} - {vencimento.strftime('%d/%m')}"
+        mensagem, reply_markup = pagina
+        await query.edit_message_text(mensagem,
+                                      parse_mode='Markdown',
+                                      reply_markup=reply_markup)
 
-            keyboard.append([
-                InlineKeyboardButton(botao_texto,
-                                     callback_data=f"cliente_{cliente['id']}")
-            ])
+    except Exception as e:
+        logger.error(f"Erro ao atualizar lista: {e}")
+        await query.edit_message_text("❌ Erro ao atualizar lista!")
 
-        keyboard.append([
-            InlineKeyboardButton("🔄 Atualizar Lista",
-                                 callback_data="atualizar_lista"),
-            InlineKeyboardButton("📊 Relatório",
-                                 callback_data="gerar_relatorio")
-        ])
 
-        reply_markup = InlineKeyboardMarkup(keyboard)
+async def navegar_lista_clientes(query, context, data):
+    """Troca de página na lista de clientes a partir do cursor do botão"""
+    try:
+        from database.db import obter_db
+        _, direcao, numero, vencimento, cliente_id = data.split("_")
+        db = obter_db()
+        pagina = await montar_pagina_clientes(db,
+                                              cursor=(vencimento, int(cliente_id)),
+                                              anterior=(direcao == "ant"),
+                                              pagina=int(numero))
+
+        if not pagina:
+            # Página ficou vazia (clientes removidos): recomeçar do início
+            await atualizar_lista_clientes(query, context)
+            return
 
+        mensagem, reply_markup = pagina
         await query.edit_message_text(mensagem,
                                       parse_mode='Markdown',
                                       reply_markup=reply_markup)
 
     except Exception as e:
-        logger.error(f"Erro ao atualizar lista: {e}")
-        await query.edit_message_text("❌ Erro ao atualizar lista!")
+        logger.error(f"Erro ao navegar na lista: {e}")
+        await query.edit_message_text("❌ Erro ao carregar página da lista!")
 
 
 async def gerar_relatorio_inline(query, context):
     """Gera relatório rápido inline"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
+        from database.db import obter_db
+        db = obter_db()
 
-        total_clientes = len(clientes)
-        receita_total = sum(float(c['plano']) for c in clientes)
-
-        hoje = agora_br().replace(tzinfo=None)
-        vencidos = [
-            c for c in clientes
-            if datetime.strptime(c['vencimento'], '%Y-%m-%d') < hoje
-        ]
-        vencendo_hoje = [
-            c for c in clientes if c['vencimento'] == hoje.strftime('%Y-%m-%d')
-        ]
-        vencendo_3_dias = [
-            c for c in clientes
-            if 0 <= (datetime.strptime(c['vencimento'], '%Y-%m-%d') -
-                     hoje).days <= 3
-        ]
+        # Contagens e receita lidas do snapshot de status (uma linha)
+        resumo = await db.snapshot_status()
 
         # Usar horário brasileiro para o relatório
         agora_brasilia = agora_br()
 
         mensagem = f"""📊 *RELATÓRIO RÁPIDO*
 
-👥 *Total de clientes:* {total_clientes}
-💰 *Receita mensal:* R$ {receita_total:.2f}
+👥 *Total de clientes:* {resumo['total']}
+💰 *Receita mensal:* R$ {resumo['receita']:.2f}
 
 📈 *Status dos Clientes:*
-🔴 Vencidos: {len(vencidos)}
-⚠️ Vencem hoje: {len(vencendo_hoje)}
-🟡 Vencem em 3 dias: {len(vencendo_3_dias)}
-🟢 Ativos: {total_clientes - len(vencidos)}
+🔴 Vencidos: {resumo['vencidos']}
+⚠️ Vencem hoje: {resumo['vencendo_hoje']}
+🟡 Vencem em 3 dias: {resumo['vencendo_3_dias']}
+🟢 Ativos: {resumo['ativos']}
 
 📅 *Atualizado:* {formatar_datetime_br(agora_brasilia)} (Brasília)"""
 
@@ -1066,72 +1032,31 @@ async def gerar_relatorio_inline(query, context):
 
 
 async def enviar_cobranca_cliente(query, context, cliente_id):
-    """Envia cobrança via WhatsApp para cliente específico"""
+    """Coloca a cobrança do cliente na fila de envio do WhatsApp"""
     try:
-        from database import DatabaseManager
-        from whatsapp_service import WhatsAppService
-        from datetime import datetime
+        from database.db import obter_db
+        from fila_envio import enfileirar
+        from utils.mensagens import mensagem_cobranca
 
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        # Preparar dados para envio
-        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
-        dias_restantes = (vencimento - agora_br().replace(tzinfo=None)).days
-
-        # Criar mensagem baseada no status
-        if dias_restantes < 0:
-            status_msg = f"VENCIDO há {abs(dias_restantes)} dias"
-            urgencia = "🔴 URGENTE"
-        elif dias_restantes == 0:
-            status_msg = "VENCE HOJE"
-            urgencia = "⚠️ ATENÇÃO"
-        elif dias_restantes <= 3:
-            status_msg = f"Vence em {dias_restantes} dias"
-            urgencia = "🟡 LEMBRETE"
-        else:
-            status_msg = f"Vence em {dias_restantes} dias"
-            urgencia = "🔔 LEMBRETE"
-
-        # Montar mensagem de cobrança
-        mensagem_whatsapp = f"""
-{urgencia} - Renovação de Plano
+        # Montar mensagem de cobrança conforme o status do vencimento
+        mensagem_whatsapp = mensagem_cobranca(cliente)
 
-Olá {cliente['nome']}!
+        # Enfileirar: o despachante envia em segundo plano e registra o resultado
+        # (cobrança avulsa pedida pelo admin tem prioridade sobre os lotes)
+        mensagem_id = await enfileirar(cliente.telefone, mensagem_whatsapp, "cobranca_manual",
+                                       cliente.nome, prioridade=10)
 
-📅 Status: {status_msg}
-📦 Pacote: {cliente['pacote']}  
-💰 Valor: R$ {cliente['plano']:.2f}
-🖥️ Servidor: {cliente['servidor']}
-
-Para renovar seu plano, entre em contato conosco.
-"""
-
-        # Enviar via WhatsApp com timeout
-        try:
-            ws = WhatsAppService()
-
-            # Usar asyncio.wait_for para timeout de 10 segundos
-            import asyncio
-            sucesso = await asyncio.wait_for(ws.enviar_mensagem(
-                cliente['telefone'], mensagem_whatsapp),
-                                             timeout=10.0)
-
-            if sucesso:
-                mensagem = f"✅ *Cobrança Enviada!*\n\n📱 Cliente: {cliente['nome']}\n📞 WhatsApp: {cliente['telefone']}\n📅 Enviado: {agora_br().replace(tzinfo=None).strftime('%d/%m/%Y %H:%M')}"
-            else:
-                mensagem = f"❌ *Falha ao Enviar*\n\nO WhatsApp não confirmou o envio.\nVerifique se o número está correto."
-
-        except asyncio.TimeoutError:
-            mensagem = f"⏱️ *Timeout ao Enviar*\n\nA mensagem pode ter sido enviada mas demorou muito para responder.\nVerifique manualmente no WhatsApp."
-        except Exception as e:
-            logger.error(f"Erro específico ao enviar WhatsApp: {e}")
-            mensagem = f"❌ *Erro ao Enviar*\n\nErro: {str(e)[:100]}\nVerifique as configurações da Evolution API."
+        if mensagem_id is not None:
+            mensagem = f"📤 *Cobrança na Fila!*\n\n📱 Cliente: {cliente.nome}\n📞 WhatsApp: {cliente.telefone}\n🆔 Fila: #{mensagem_id}\n📅 Enfileirado: {agora_br().replace(tzinfo=None).strftime('%d/%m/%Y %H:%M')}\n\nAcompanhe em 📋 Fila de Mensagens."
+        else:
+            mensagem = f"❌ *Erro ao Enfileirar*\n\nNão foi possível gravar a mensagem na fila.\nVerifique o banco de dados."
 
         keyboard = [[
             InlineKeyboardButton("⬅️ Voltar ao Cliente",
@@ -1160,32 +1085,24 @@ Para renovar seu plano, entre em contato conosco.
 async def renovar_cliente_inline(query, context, cliente_id):
     """Renova cliente por período específico"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(
-            ativo_apenas=False)  # Busca todos os clientes
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
-
-        # Debug: vamos ver se o cliente existe
-        logger.info(f"Procurando cliente ID: {cliente_id}")
-        logger.info(f"Total de clientes encontrados: {len(clientes)}")
-        if clientes:
-            logger.info(f"IDs dos clientes: {[c['id'] for c in clientes]}")
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)  # Inclui inativos
 
         if not cliente:
+            logger.info(f"Cliente ID {cliente_id} não encontrado para renovação")
             await query.edit_message_text(
-                f"❌ Cliente ID {cliente_id} não encontrado!\nTotal clientes: {len(clientes)}"
-            )
+                f"❌ Cliente ID {cliente_id} não encontrado!")
             return
 
-        vencimento_atual = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
+        vencimento_atual = cliente.vencimento_obj
 
         mensagem = f"""🔄 *RENOVAR CLIENTE*
 
-👤 *Cliente:* {cliente['nome']}
+👤 *Cliente:* {cliente.nome}
 📅 *Vencimento Atual:* {vencimento_atual.strftime('%d/%m/%Y')}
-📦 *Pacote:* {cliente['pacote']}
-💰 *Valor:* R$ {cliente['plano']:.2f}
+📦 *Pacote:* {cliente.pacote}
+💰 *Valor:* R$ {cliente.plano:.2f}
 
 Escolha o período de renovação:"""
 
@@ -1222,24 +1139,23 @@ Escolha o período de renovação:"""
 async def editar_cliente_inline(query, context, cliente_id):
     """Edita dados do cliente"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
+        vencimento = cliente.vencimento_obj
 
         mensagem = f"""✏️ *EDITAR CLIENTE*
 
-👤 *Cliente:* {cliente['nome']}
-📱 *Telefone:* {cliente['telefone']}
-📦 *Pacote:* {cliente['pacote']}
-💰 *Valor:* R$ {cliente['plano']:.2f}
-🖥️ *Servidor:* {cliente['servidor']}
+👤 *Cliente:* {cliente.nome}
+📱 *Telefone:* {cliente.telefone}
+📦 *Pacote:* {cliente.pacote}
+💰 *Valor:* R$ {cliente.plano:.2f}
+🖥️ *Servidor:* {cliente.servidor}
 📅 *Vencimento:* {vencimento.strftime('%d/%m/%Y')}
 
 Escolha o que deseja editar:"""
@@ -1286,25 +1202,24 @@ Escolha o que deseja editar:"""
 async def excluir_cliente_inline(query, context, cliente_id):
     """Confirma exclusão do cliente"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
+        vencimento = cliente.vencimento_obj
 
         mensagem = f"""🗑️ *EXCLUIR CLIENTE*
 
 ⚠️ *ATENÇÃO: Esta ação não pode ser desfeita!*
 
-👤 *Cliente:* {cliente['nome']}
-📱 *Telefone:* {cliente['telefone']}
-📦 *Pacote:* {cliente['pacote']}
-💰 *Valor:* R$ {cliente['plano']:.2f}
+👤 *Cliente:* {cliente.nome}
+📱 *Telefone:* {cliente.telefone}
+📦 *Pacote:* {cliente.pacote}
+💰 *Valor:* R$ {cliente.plano:.2f}
 📅 *Vencimento:* {vencimento.strftime('%d/%m/%Y')}
 
 Tem certeza que deseja excluir este cliente?"""
@@ -1331,19 +1246,18 @@ Tem certeza que deseja excluir este cliente?"""
 async def confirmar_exclusao_cliente(query, context, cliente_id):
     """Executa a exclusão do cliente"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        nome_cliente = cliente['nome']
+        nome_cliente = cliente.nome
 
         # Executar exclusão
-        sucesso = db.excluir_cliente(cliente_id)
+        sucesso = await db.excluir_cliente(cliente_id)
 
         if sucesso:
             mensagem = f"""✅ *CLIENTE EXCLUÍDO*
@@ -1373,41 +1287,36 @@ O cliente foi permanentemente excluído do banco de dados."""
 async def processar_renovacao_cliente(query, context, cliente_id, dias):
     """Processa a renovação do cliente por X dias"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
             return
 
-        # Calcular nova data de vencimento
-        from datetime import datetime, timedelta  # Import local para evitar conflitos
-        vencimento_atual = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
-
-        # Se já venceu, renovar a partir de hoje
-        if vencimento_atual < agora_br().replace(tzinfo=None):
-            nova_data = agora_br().replace(tzinfo=None) + timedelta(days=dias)
-        else:
-            # Se ainda não venceu, somar os dias ao vencimento atual
-            nova_data = vencimento_atual + timedelta(days=dias)
+        # Calcular nova data de vencimento (vencido ou inválido renova a partir de hoje)
+        from database import calcular_novo_vencimento
+        vencimento_atual = cliente.vencimento_obj
+        nova_data = calcular_novo_vencimento(vencimento_atual, dias)
+        if vencimento_atual is None:
+            logger.error(f"Vencimento inválido no cliente {cliente}")
 
         # Atualizar apenas a data de vencimento
-        sucesso = db.atualizar_cliente(cliente_id, 'vencimento',
-                                       nova_data.strftime('%Y-%m-%d'))
+        sucesso = await db.atualizar_cliente(cliente_id, 'vencimento',
+                                             nova_data.strftime('%Y-%m-%d'))
 
         if sucesso:
             # Registrar renovação no histórico
-            db.registrar_renovacao(cliente_id, dias, cliente['plano'])
+            await db.registrar_renovacao(cliente_id, dias, cliente.plano)
 
             mensagem = f"""✅ *CLIENTE RENOVADO*
 
-👤 *Cliente:* {cliente['nome']}
+👤 *Cliente:* {cliente.nome}
 ⏰ *Período adicionado:* {dias} dias
-📅 *Vencimento anterior:* {vencimento_atual.strftime('%d/%m/%Y')}
+📅 *Vencimento anterior:* {vencimento_atual.strftime('%d/%m/%Y') if vencimento_atual else cliente.vencimento}
 🔄 *Novo vencimento:* {nova_data.strftime('%d/%m/%Y')}
-💰 *Valor:* R$ {cliente['plano']:.2f}
+💰 *Valor:* R$ {cliente.plano:.2f}
 
 Renovação registrada com sucesso!"""
         else:
@@ -1432,10 +1341,9 @@ Renovação registrada com sucesso!"""
 async def iniciar_edicao_campo(query, context, cliente_id, campo):
     """Inicia a edição interativa de um campo específico do cliente"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes(ativo_apenas=False)
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id)
 
         if not cliente:
             await query.edit_message_text("❌ Cliente não encontrado!")
@@ -1450,35 +1358,34 @@ async def iniciar_edicao_campo(query, context, cliente_id, campo):
         campos_info = {
             'nome': {
                 'label': 'Nome',
-                'valor': cliente['nome'],
+                'valor': cliente.nome,
                 'placeholder': 'Ex: João Silva Santos'
             },
             'telefone': {
                 'label': 'Telefone',
-                'valor': cliente['telefone'],
+                'valor': cliente.telefone,
                 'placeholder': 'Ex: 11999887766'
             },
             'pacote': {
                 'label': 'Pacote',
-                'valor': cliente['pacote'],
+                'valor': cliente.pacote,
                 'placeholder': 'Ex: Netflix Premium'
             },
             'valor': {
                 'label': 'Valor',
-                'valor': f"R$ {cliente['plano']:.2f}",
+                'valor': f"R$ {cliente.plano:.2f}",
                 'placeholder': 'Ex: 45.00'
             },
             'servidor': {
                 'label': 'Servidor',
-                'valor': cliente['servidor'],
+                'valor': cliente.servidor,
                 'placeholder': 'Ex: BR-SP01'
             },
             'vencimento': {
                 'label':
                 'Vencimento',
                 'valor':
-                datetime.strptime(cliente['vencimento'],
-                                  '%Y-%m-%d').strftime('%d/%m/%Y'),
+                cliente.vencimento_obj.strftime('%d/%m/%Y'),
                 'placeholder':
                 'Ex: 15/03/2025'
             }
@@ -1492,7 +1399,7 @@ async def iniciar_edicao_campo(query, context, cliente_id, campo):
 
         mensagem = f"""✏️ *EDITAR {info['label'].upper()}*
 
-👤 *Cliente:* {cliente['nome']}
+👤 *Cliente:* {cliente.nome}
 📝 *Campo:* {info['label']}
 🔄 *Valor atual:* {info['valor']}
 
@@ -1548,10 +1455,9 @@ async def editar_cliente_cmd(update, context):
         campo = context.args[1].lower()
         novo_valor = " ".join(context.args[2:])
 
-        from database import DatabaseManager
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
-        cliente = next((c for c in clientes if c['id'] == cliente_id), None)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_id(cliente_id, ativo_apenas=True)
 
         if not cliente:
             await update.message.reply_text(
@@ -1571,12 +1477,12 @@ async def editar_cliente_cmd(update, context):
 
         # Preparar dados para atualização
         dados = {
-            'nome': cliente['nome'],
-            'telefone': cliente['telefone'],
-            'pacote': cliente['pacote'],
-            'valor': cliente['plano'],
-            'servidor': cliente['servidor'],
-            'vencimento': cliente['vencimento']
+            'nome': cliente.nome,
+            'telefone': cliente.telefone,
+            'pacote': cliente.pacote,
+            'valor': cliente.plano,
+            'servidor': cliente.servidor,
+            'vencimento': cliente.vencimento
         }
 
         # Aplicar mudança
@@ -1601,7 +1507,7 @@ async def editar_cliente_cmd(update, context):
             dados[campo] = novo_valor
 
         # Executar atualização
-        sucesso = db.atualizar_cliente(cliente_id, campo, dados[campo])
+        sucesso = await db.atualizar_cliente(cliente_id, campo, dados[campo])
 
         if sucesso:
             mensagem = f"""✅ *Cliente Atualizado!*
@@ -1631,21 +1537,15 @@ async def editar_cliente_cmd(update, context):
 async def relatorio(update, context):
     """Gera relatório básico"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-
-        clientes = db.listar_clientes()
-        total_clientes = len(clientes)
-        receita_total = sum(float(c['plano']) for c in clientes)
-
-        hoje = agora_br().replace(tzinfo=None).strftime('%Y-%m-%d')
-        vencendo_hoje = [c for c in clientes if c['vencimento'] == hoje]
+        from database.db import obter_db
+        db = obter_db()
+        resumo = await db.snapshot_status()
 
         mensagem = f"""📊 *RELATÓRIO GERAL*
 
-👥 Total de clientes: {total_clientes}
-💰 Receita mensal: R$ {receita_total:.2f}
-⚠️ Vencendo hoje: {len(vencendo_hoje)}
+👥 Total de clientes: {resumo['total']}
+💰 Receita mensal: R$ {resumo['receita']:.2f}
+⚠️ Vencendo hoje: {resumo['vencendo_hoje']}
 
 📅 Data: {agora_br().replace(tzinfo=None).strftime('%d/%m/%Y %H:%M')}"""
 
@@ -1671,6 +1571,10 @@ async def help_cmd(update, context):
 /relatorio - Relatório geral
 /help - Esta ajuda
 
+*Envios:*
+/notificar\\_lote - Cobrança em lote por vencimento
+/verificar\\_numeros - Confere quais clientes têm WhatsApp
+
 *Exemplo:*
 `/add João Silva | 11999999999 | Netflix | 25.90 | 2025-03-15 | Servidor1`
 
@@ -1771,9 +1675,9 @@ async def buscar_cliente(update, context):
 
         telefone = context.args[0]
 
-        from database import DatabaseManager
-        db = DatabaseManager()
-        cliente = db.buscar_cliente_por_telefone(telefone)
+        from database.db import obter_db
+        db = obter_db()
+        cliente = await db.buscar_cliente_por_telefone(telefone)
 
         if not cliente:
             await update.message.reply_text(
@@ -1781,16 +1685,16 @@ async def buscar_cliente(update, context):
                 reply_markup=criar_teclado_principal())
             return
 
-        vencimento = datetime.strptime(cliente['vencimento'], '%Y-%m-%d')
+        vencimento = cliente.vencimento_obj
 
         mensagem = f"""👤 *Cliente Encontrado*
 
-📝 *Nome:* {cliente['nome']}
-📱 *Telefone:* {cliente['telefone']}
-📦 *Pacote:* {cliente['pacote']}
-💰 *Valor:* R$ {cliente['plano']:.2f}
+📝 *Nome:* {cliente.nome}
+📱 *Telefone:* {cliente.telefone}
+📦 *Pacote:* {cliente.pacote}
+💰 *Valor:* R$ {cliente.plano:.2f}
 📅 *Vencimento:* {vencimento.strftime('%d/%m/%Y')}
-🖥️ *Servidor:* {cliente['servidor']}"""
+🖥️ *Servidor:* {cliente.servidor}"""
 
         await update.message.reply_text(mensagem,
                                         parse_mode='Markdown',
@@ -1806,9 +1710,9 @@ async def buscar_cliente(update, context):
 async def configuracoes_cmd(update, context):
     """Comando de configurações"""
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        config = db.get_configuracoes()
+        from database.db import obter_db
+        db = obter_db()
+        config = await db.get_configuracoes()
 
         if config:
             # Escapar caracteres especiais para HTML
@@ -1895,9 +1799,9 @@ async def config_callback(update, context):
     if data == "config_refresh":
         # Atualizar as configurações
         try:
-            from database import DatabaseManager
-            db = DatabaseManager()
-            config = db.get_configuracoes()
+            from database.db import obter_db
+            db = obter_db()
+            config = await db.get_configuracoes()
 
             if config:
                 empresa = escapar_html(config['empresa_nome'])
@@ -2084,18 +1988,18 @@ async def processar_config_empresa(update, context):
         return CONFIG_EMPRESA
 
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        config = db.get_configuracoes()
+        from database.db import obter_db
+        db = obter_db()
+        config = await db.get_configuracoes()
 
         if config:
             # Atualizar configuração existente
-            sucesso = db.salvar_configuracoes(nova_empresa, config['pix_key'],
-                                              config['contato_suporte'])
+            sucesso = await db.salvar_configuracoes(nova_empresa, config['pix_key'],
+                                                    config['contato_suporte'])
         else:
             # Criar nova configuração com valores padrão
-            sucesso = db.salvar_configuracoes(nova_empresa, "sua_chave_pix",
-                                              "@seu_suporte")
+            sucesso = await db.salvar_configuracoes(nova_empresa, "sua_chave_pix",
+                                                    "@seu_suporte")
 
         if sucesso:
             await update.message.reply_text(
@@ -2129,16 +2033,16 @@ async def processar_config_pix(update, context):
         return CONFIG_PIX
 
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        config = db.get_configuracoes()
+        from database.db import obter_db
+        db = obter_db()
+        config = await db.get_configuracoes()
 
         if config:
-            sucesso = db.salvar_configuracoes(config['empresa_nome'], nova_pix,
-                                              config['contato_suporte'])
+            sucesso = await db.salvar_configuracoes(config['empresa_nome'], nova_pix,
+                                                    config['contato_suporte'])
         else:
-            sucesso = db.salvar_configuracoes("Sua Empresa", nova_pix,
-                                              "@seu_suporte")
+            sucesso = await db.salvar_configuracoes("Sua Empresa", nova_pix,
+                                                    "@seu_suporte")
 
         if sucesso:
             await update.message.reply_text(
@@ -2172,16 +2076,16 @@ async def processar_config_suporte(update, context):
         return CONFIG_SUPORTE
 
     try:
-        from database import DatabaseManager
-        db = DatabaseManager()
-        config = db.get_configuracoes()
+        from database.db import obter_db
+        db = obter_db()
+        config = await db.get_configuracoes()
 
         if config:
-            sucesso = db.salvar_configuracoes(config['empresa_nome'],
-                                              config['pix_key'], novo_suporte)
+            sucesso = await db.salvar_configuracoes(config['empresa_nome'],
+                                                    config['pix_key'], novo_suporte)
         else:
-            sucesso = db.salvar_configuracoes("Sua Empresa", "sua_chave_pix",
-                                              novo_suporte)
+            sucesso = await db.salvar_configuracoes("Sua Empresa", "sua_chave_pix",
+                                                    novo_suporte)
 
         if sucesso:
             await update.message.reply_text(
@@ -2275,9 +2179,9 @@ Digite o contato para suporte:
 async def whatsapp_status_direct(update, context):
     """Mostra status do WhatsApp diretamente"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         status = await whatsapp.verificar_status_instancia()
 
         if status:
@@ -2288,18 +2192,26 @@ async def whatsapp_status_direct(update, context):
 <b>Estado:</b> {status_texto}
 <b>Instância:</b> {whatsapp.instance_name}
 <b>Telefone:</b> {status.get('number', 'N/A')}
+<b>Circuito de envio:</b> {whatsapp.disjuntor.descricao()}
 
-<i>Última verificação: {agora_br().strftime('%H:%M:%S')}</i>"""
+<i>Última verificação: {(agora_br() - timedelta(seconds=whatsapp.idade_estado() or 0)).strftime('%H:%M:%S')}</i>"""
         else:
-            mensagem = """📱 <b>Status WhatsApp</b>
+            mensagem = f"""📱 <b>Status WhatsApp</b>
 
 ❌ <b>Não foi possível verificar o status</b>
+<b>Circuito de envio:</b> {whatsapp.disjuntor.descricao()}
 
 Verifique se:
 • A Evolution API está rodando
 • As credenciais estão corretas
 • A instância está configurada"""
 
+        disjuntor = whatsapp.estatisticas_disjuntor()
+        if disjuntor['falhas_consecutivas'] and disjuntor['ultima_falha']:
+            mensagem += (f"\n\n⚠️ <b>Falhas seguidas:</b> {disjuntor['falhas_consecutivas']}"
+                         f"/{disjuntor['falhas_para_abrir']}"
+                         f"\n<i>{disjuntor['ultima_falha'][:100]}</i>")
+
         await update.message.reply_text(text=mensagem,
                                         parse_mode='HTML',
                                         reply_markup=criar_teclado_principal())
@@ -2314,18 +2226,18 @@ Verifique se:
 async def testar_whatsapp_direct(update, context):
     """Testa WhatsApp diretamente via teclado persistente"""
     try:
-        from whatsapp_service import WhatsAppService
-        from database import DatabaseManager
+        from whatsapp_service import obter_whatsapp_service
+        from database.db import obter_db
 
         # Verificar se há clientes cadastrados para usar como teste
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
+        db = obter_db()
+        clientes = await db.listar_clientes()
 
         if clientes:
             # Usar o primeiro cliente cadastrado
             cliente = clientes[0]
-            telefone_teste = cliente['telefone']
-            nome_teste = cliente['nome']
+            telefone_teste = cliente.telefone
+            nome_teste = cliente.nome
             mensagem_extra = f"Cliente: {nome_teste}"
         else:
             # Permitir ao usuário especificar um número para teste
@@ -2347,7 +2259,7 @@ Para testar o WhatsApp, você pode:
             f"🧪 Testando WhatsApp...\n📱 Número: {telefone_teste}\n👤 {mensagem_extra}",
             reply_markup=criar_teclado_principal())
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         mensagem_teste = f"""🧪 TESTE DE CONEXÃO - SISTEMA BOT
 
 Olá! Esta é uma mensagem de teste do sistema de gerenciamento de clientes.
@@ -2362,13 +2274,11 @@ Este é um teste automatizado do sistema."""
 
         # Adicionar timeout ao teste também
         try:
-            import asyncio
-            sucesso = await asyncio.wait_for(whatsapp.enviar_mensagem(
-                telefone_teste, mensagem_teste),
-                                             timeout=15.0)
-        except asyncio.TimeoutError:
-            sucesso = False
-            timeout_error = True
+            resultado = await whatsapp.enviar_mensagem_resultado(
+                telefone_teste, mensagem_teste, prazo=15.0)
+            sucesso = resultado['sucesso']
+            error_details = resultado['erro'] or ""
+            timeout_error = error_details.startswith("TimeoutError")
         except Exception as e:
             sucesso = False
             timeout_error = False
@@ -2519,59 +2429,58 @@ Todos os envios ocorrem automaticamente às 9h da manhã."""
 async def fila_mensagens(update, context):
     """Consulta fila de mensagens pendentes"""
     try:
-        import sqlite3
+        from database.db import obter_db
+        from fila_envio import obter_despachante
+        from whatsapp_service import obter_whatsapp_service
+        from config import EVOLUTION_MENSAGENS_POR_MINUTO
+
+        db = obter_db()
+        resumo = await db.resumo_fila()
+        despachante = obter_despachante().estatisticas()
+        limite = obter_whatsapp_service().estatisticas_limite()
 
         mensagem = """📋 <b>FILA DE MENSAGENS</b>
 
-Esta funcionalidade mostra mensagens em fila para envio pelo sistema de agendamento.
+Mensagens aguardando envio pelo WhatsApp, em tempo real.
 
 <b>Status da Fila:</b>"""
 
-        # Conectar ao banco e verificar mensagens pendentes
-        conn = sqlite3.connect("clientes.db")
-        cursor = conn.cursor()
-
-        # Verificar se existe tabela de fila (pode não existir ainda)
-        cursor.execute('''
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='fila_mensagens'
-        ''')
-
-        if cursor.fetchone():
-            # Contar mensagens pendentes por status
-            cursor.execute('''
-                SELECT status, COUNT(*) 
-                FROM fila_mensagens 
-                WHERE data_envio >= date('now') 
-                GROUP BY status
-            ''')
-            status_counts = cursor.fetchall()
-
-            if status_counts:
-                for status, count in status_counts:
-                    icon = "⏳" if status == "pendente" else "✅" if status == "enviado" else "❌"
-                    mensagem += f"\n{icon} <b>{status.title()}:</b> {count} mensagens"
-            else:
-                mensagem += "\n📭 Nenhuma mensagem na fila"
+        icones = {"pendente": "⏳", "processando": "📤", "enviado": "✅", "erro": "❌"}
+        por_status = resumo['por_status']
+        if por_status.get('pendente') or por_status.get('processando'):
+            for status in ("pendente", "processando", "erro"):
+                if por_status.get(status):
+                    mensagem += f"\n{icones[status]} <b>{status.title()}:</b> {por_status[status]} mensagens"
         else:
-            mensagem += "\n📭 Fila não inicializada (primeira execução pendente)"
-
-        conn.close()
-
-        # Obter próxima execução do agendador
-        try:
-            from scheduler_automatico import obter_status_sistema
-            status = obter_status_sistema()
-            mensagem += f"\n\n⏰ <b>Próxima execução:</b> {status['proxima_execucao']}"
-        except:
-            mensagem += "\n\n⏰ <b>Próxima execução:</b> Diariamente às 9h"
+            mensagem += "\n📭 Nenhuma mensagem na fila"
+        mensagem += f"\n✅ <b>Enviadas hoje:</b> {resumo['enviadas_hoje']}"
+
+        if resumo['proximas']:
+            mensagem += "\n\n<b>Próximas:</b>"
+            for item in resumo['proximas']:
+                horario = item['proxima_tentativa'][11:16]
+                tentativa = f" (tentativa {item['tentativas'] + 1})" if item['tentativas'] else ""
+                mensagem += f"\n• #{item['id']} {item['nome_cliente'] or item['telefone']} - {item['tipo_mensagem']} às {horario}{tentativa}"
+
+        estado = "🟢 Ativo" if despachante['ativo'] else "🔴 Parado"
+        mensagem += f"\n\n⚙️ <b>Despachante:</b> {estado}"
+        if despachante['ultimo_lote']:
+            mensagem += f"\n🕒 <b>Último lote:</b> {despachante['ultimo_lote']}"
+
+        if limite['ativo']:
+            mensagem += (f"\n🪣 <b>Limitador:</b> {limite['fichas']:.1f}/{limite['capacidade']} fichas, "
+                         f"{limite['reservas_pendentes']} aguardando vaga")
+            mensagem += (f"\n⏱️ <b>Esperas:</b> {limite['envios_com_espera']}/{limite['envios_liberados']} envios, "
+                         f"média {limite['espera_media']:.1f}s, máx {limite['espera_maxima']:.1f}s")
+        else:
+            mensagem += "\n🪣 <b>Limitador:</b> desativado"
 
-        mensagem += """
+        mensagem += f"""
 
 <b>📝 Como funciona:</b>
-• Sistema verifica vencimentos diariamente às 9h
-• Mensagens são colocadas na fila automaticamente
-• Envios respeitam rate limit (20/min)
+• Cobranças e lembretes entram na fila na hora
+• O despachante envia em segundo plano e tenta de novo em caso de falha
+• Envios respeitam rate limit ({EVOLUTION_MENSAGENS_POR_MINUTO:g}/min)
 • Status é atualizado em tempo real"""
 
         await update.message.reply_text(mensagem,
@@ -2588,8 +2497,10 @@ Esta funcionalidade mostra mensagens em fila para envio pelo sistema de agendame
 async def logs_envios(update, context):
     """Mostra logs de envios recentes"""
     try:
-        import sqlite3
-        from datetime import datetime, timedelta
+        from database.db import obter_db
+        from datetime import datetime
+
+        db = obter_db()
 
         mensagem = """📜 <b>LOGS DE ENVIOS</b>
 
@@ -2597,69 +2508,48 @@ Histórico de mensagens enviadas pelo sistema automático.
 
 <b>📊 Últimos 7 dias:</b>"""
 
-        # Conectar ao banco
-        conn = sqlite3.connect("clientes.db")
-        cursor = conn.cursor()
-
-        # Verificar se existe tabela de histórico
-        cursor.execute('''
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='historico_envios'
-        ''')
-
-        if cursor.fetchone():
-            # Buscar envios dos últimos 7 dias
-            cursor.execute('''
-                SELECT 
-                    DATE(data_envio) as data,
-                    status,
-                    COUNT(*) as total
-                FROM historico_envios 
-                WHERE data_envio >= datetime('now', '-7 days')
-                GROUP BY DATE(data_envio), status
-                ORDER BY data DESC, status
-            ''')
-
-            logs = cursor.fetchall()
-
-            if logs:
-                data_atual = None
-                for data, status, total in logs:
-                    if data != data_atual:
-                        data_atual = data
-                        data_formatada = datetime.strptime(
-                            data, '%Y-%m-%d').strftime('%d/%m')
-                        mensagem += f"\n\n📅 <b>{data_formatada}:</b>"
-
-                    icon = "✅" if status == "enviado" else "❌"
-                    mensagem += f"\n   {icon} {status.title()}: {total}"
-            else:
-                mensagem += "\n📭 Nenhum envio registrado nos últimos 7 dias"
-
-            # Estatísticas gerais
-            cursor.execute('''
-                SELECT 
-                    status,
-                    COUNT(*) as total
-                FROM historico_envios 
-                WHERE data_envio >= datetime('now', '-30 days')
-                GROUP BY status
-            ''')
-
-            stats_30d = cursor.fetchall()
-
-            if stats_30d:
-                mensagem += "\n\n📈 <b>Últimos 30 dias:</b>"
-                total_geral = sum(total for _, total in stats_30d)
-                for status, total in stats_30d:
-                    percentual = (total / total_geral *
-                                  100) if total_geral > 0 else 0
-                    icon = "✅" if status == "enviado" else "❌"
-                    mensagem += f"\n{icon} {status.title()}: {total} ({percentual:.1f}%)"
-        else:
-            mensagem += "\n📭 Histórico não inicializado (primeira execução pendente)"
+        # Envios dos últimos 7 dias (consulta por intervalo sobre o índice de data)
+        logs = await db.envios_por_dia(7)
 
-        conn.close()
+        if logs:
+            data_atual = None
+            for log in logs:
+                if log['data'] != data_atual:
+                    data_atual = log['data']
+                    data_formatada = datetime.strptime(
+                        data_atual, '%Y-%m-%d').strftime('%d/%m')
+                    mensagem += f"\n\n📅 <b>{data_formatada}:</b>"
+
+                icon = "✅" if log['status'] == "enviado" else "❌"
+                mensagem += f"\n   {icon} {log['status'].title()}: {log['total']}"
+        else:
+            mensagem += "\n📭 Nenhum envio registrado nos últimos 7 dias"
+
+        # Estatísticas gerais
+        stats_30d = await db.envios_por_status(30)
+
+        if stats_30d:
+            mensagem += "\n\n📈 <b>Últimos 30 dias:</b>"
+            total_geral = sum(s['total'] for s in stats_30d)
+            for s in stats_30d:
+                percentual = (s['total'] / total_geral *
+                              100) if total_geral > 0 else 0
+                icon = "✅" if s['status'] == "enviado" else "❌"
+                mensagem += f"\n{icon} {s['status'].title()}: {s['total']} ({percentual:.1f}%)"
+                if s['retentativas']:
+                    mensagem += f" • {s['retentativas']} retentativas"
+
+        # Recibos de entrega do webhook da Evolution API
+        entregas = await db.entregas_por_situacao(30)
+
+        if any(e['entrega'] != 'sem_recibo' for e in entregas):
+            mensagem += "\n\n📬 <b>Entrega no WhatsApp (30 dias):</b>"
+            icones = {"lido": "👁️", "reproduzido": "👁️", "entregue": "📬",
+                      "servidor": "☑️", "pendente": "⏳", "erro": "❌",
+                      "sem_recibo": "❔"}
+            for e in entregas:
+                nome = e['entrega'].replace('_', ' ').title()
+                mensagem += f"\n{icones.get(e['entrega'], '•')} {nome}: {e['total']}"
 
         mensagem += f"""
 
@@ -2681,7 +2571,7 @@ Histórico de mensagens enviadas pelo sistema automático.
 async def comando_teste_whatsapp(update, context):
     """Comando para testar WhatsApp com número específico"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
         # Verificar se foi fornecido um número
         if context.args:
@@ -2699,7 +2589,7 @@ Para testar o WhatsApp, forneça um número:
                 reply_markup=criar_teclado_principal())
             return
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         numero_formatado = whatsapp.formatar_numero_whatsapp(telefone_teste)
 
         await update.message.reply_text(
@@ -2719,13 +2609,11 @@ Sistema BOT CRM - Teste via Comando"""
 
         # Teste com timeout
         try:
-            import asyncio
-            sucesso = await asyncio.wait_for(whatsapp.enviar_mensagem(
-                telefone_teste, mensagem_teste),
-                                             timeout=15.0)
-        except asyncio.TimeoutError:
-            sucesso = False
-            timeout_error = True
+            resultado = await whatsapp.enviar_mensagem_resultado(
+                telefone_teste, mensagem_teste, prazo=15.0)
+            sucesso = resultado['sucesso']
+            error_details = resultado['erro'] or ""
+            timeout_error = error_details.startswith("TimeoutError")
         except Exception as e:
             sucesso = False
             timeout_error = False
@@ -2769,13 +2657,12 @@ Verifique se o número tem WhatsApp ativo."""
 async def qr_code_direct(update, context):
     """Gera QR Code diretamente via teclado persistente"""
     try:
-        from whatsapp_service import WhatsAppService
-        import base64
+        from whatsapp_service import obter_whatsapp_service
         import io
 
         await update.message.reply_text("📱 Gerando QR Code para conexão...")
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
 
         # Primeiro verificar se já está conectado
         status = await whatsapp.verificar_status_instancia()
@@ -2790,19 +2677,11 @@ Se quiser reconectar com uma nova conta, use "⚙️ Gerenciar WhatsApp" → Des
                 reply_markup=criar_teclado_principal())
             return
 
-        # Gerar o QR Code
-        qr_base64_raw = await whatsapp.gerar_qr_code_base64()
+        # Gerar o QR Code (ou reaproveitar o que ainda está válido)
+        qr_bytes = await whatsapp.obter_qr_code_imagem()
 
-        if qr_base64_raw:
+        if qr_bytes:
             try:
-                # Validar e limpar o base64 usando a nova função robusta
-                qr_base64_clean = whatsapp.validar_e_limpar_base64(
-                    qr_base64_raw)
-                if not qr_base64_clean:
-                    raise ValueError("QR Code base64 inválido após validação")
-
-                # Decodificar o base64 para bytes
-                qr_bytes = base64.b64decode(qr_base64_clean, validate=True)
                 qr_io = io.BytesIO(qr_bytes)
                 qr_io.name = 'qr_code.png'
 
@@ -2854,9 +2733,9 @@ Se quiser reconectar com uma nova conta, use "⚙️ Gerenciar WhatsApp" → Des
 async def gerenciar_whatsapp_direct(update, context):
     """Gerencia WhatsApp diretamente via teclado persistente"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         status = await whatsapp.verificar_status_instancia()
 
         if status:
@@ -2917,9 +2796,9 @@ Use os botões do teclado para executar as ações desejadas."""
 async def verificar_whatsapp_status(query, context):
     """Verifica o status da instância do WhatsApp"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         status = await whatsapp.verificar_status_instancia()
 
         if status:
@@ -2930,18 +2809,26 @@ async def verificar_whatsapp_status(query, context):
 <b>Estado:</b> {status_texto}
 <b>Instância:</b> {whatsapp.instance_name}
 <b>Telefone:</b> {status.get('number', 'N/A')}
+<b>Circuito de envio:</b> {whatsapp.disjuntor.descricao()}
 
-<i>Última verificação: {agora_br().strftime('%H:%M:%S')}</i>"""
+<i>Última verificação: {(agora_br() - timedelta(seconds=whatsapp.idade_estado() or 0)).strftime('%H:%M:%S')}</i>"""
         else:
-            mensagem = """📱 <b>Status WhatsApp</b>
+            mensagem = f"""📱 <b>Status WhatsApp</b>
 
 ❌ <b>Não foi possível verificar o status</b>
+<b>Circuito de envio:</b> {whatsapp.disjuntor.descricao()}
 
 Verifique se:
 • A Evolution API está rodando
 • As credenciais estão corretas
 • A instância está configurada"""
 
+        disjuntor = whatsapp.estatisticas_disjuntor()
+        if disjuntor['falhas_consecutivas'] and disjuntor['ultima_falha']:
+            mensagem += (f"\n\n⚠️ <b>Falhas seguidas:</b> {disjuntor['falhas_consecutivas']}"
+                         f"/{disjuntor['falhas_para_abrir']}"
+                         f"\n<i>{disjuntor['ultima_falha'][:100]}</i>")
+
         keyboard = [[
             InlineKeyboardButton("🔄 Atualizar Status",
                                  callback_data="whatsapp_status")
@@ -2973,13 +2860,13 @@ Verifique se:
 async def testar_whatsapp(query, context):
     """Testa o envio de mensagem WhatsApp"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
         # Usar um número válido para teste - ou permitir especificar
         telefone_teste = "61995021362"  # Será formatado automaticamente
         nome_teste = "Número de Teste"
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         mensagem_teste = f"""🧪 TESTE DE CONEXÃO - SISTEMA BOT
 
 Olá! Esta é uma mensagem de teste do sistema de gerenciamento de clientes.
@@ -2994,13 +2881,11 @@ Este é um teste automatizado do sistema."""
 
         # Adicionar timeout ao teste inline também
         try:
-            import asyncio
-            sucesso = await asyncio.wait_for(whatsapp.enviar_mensagem(
-                telefone_teste, mensagem_teste),
-                                             timeout=15.0)
-        except asyncio.TimeoutError:
-            sucesso = False
-            timeout_error = True
+            resultado = await whatsapp.enviar_mensagem_resultado(
+                telefone_teste, mensagem_teste, prazo=15.0)
+            sucesso = resultado['sucesso']
+            error_details = resultado['erro'] or ""
+            timeout_error = error_details.startswith("TimeoutError")
         except Exception as e:
             sucesso = False
             timeout_error = False
@@ -3072,9 +2957,9 @@ Verifique:
 async def gerenciar_instancia(query, context):
     """Gerencia a instância da Evolution API"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
 
         mensagem = f"""⚙️ <b>Gerenciar Instância WhatsApp</b>
 
@@ -3136,8 +3021,8 @@ async def reconexao_estavel(query, context):
             "🔗 Iniciando reconexão estável...\n\nEsse processo pode levar até 2 minutos."
         )
 
-        from whatsapp_service import WhatsAppService
-        whatsapp = WhatsAppService()
+        from whatsapp_service import obter_whatsapp_service
+        whatsapp = obter_whatsapp_service()
 
         sucesso = await whatsapp.reconectar_instancia()
 
@@ -3195,8 +3080,8 @@ async def reiniciar_instancia(query, context):
     try:
         await query.edit_message_text("🔄 Reiniciando instância...")
 
-        from whatsapp_service import WhatsAppService
-        whatsapp = WhatsAppService()
+        from whatsapp_service import obter_whatsapp_service
+        whatsapp = obter_whatsapp_service()
 
         sucesso = await whatsapp.reiniciar_instancia()
 
@@ -3239,9 +3124,9 @@ Não foi possível reiniciar a instância. Verifique se a Evolution API está re
 async def mostrar_detalhes_instancia(query, context):
     """Mostra detalhes completos da instância"""
     try:
-        from whatsapp_service import WhatsAppService
+        from whatsapp_service import obter_whatsapp_service
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
         status = await whatsapp.verificar_status_instancia()
 
         if status:
@@ -3267,7 +3152,7 @@ async def mostrar_detalhes_instancia(query, context):
 <b>API URL:</b> {whatsapp.api_url}
 
 <b>Informações Técnicas:</b>
-• Última verificação: {agora_br().strftime('%H:%M:%S')}
+• Última verificação: {(agora_br() - timedelta(seconds=whatsapp.idade_estado() or 0)).strftime('%H:%M:%S')}
 • Timeout configurado: 30s
 • Headers de autenticação: ✅ Configurados"""
         else:
@@ -3318,8 +3203,8 @@ async def desconectar_instancia(query, context):
     try:
         await query.edit_message_text("🔌 Desconectando instância...")
 
-        from whatsapp_service import WhatsAppService
-        whatsapp = WhatsAppService()
+        from whatsapp_service import obter_whatsapp_service
+        whatsapp = obter_whatsapp_service()
 
         # Method does not exist, simulate disconnection
         sucesso = True
@@ -3365,11 +3250,10 @@ async def mostrar_qr_code(query, context):
     try:
         await query.edit_message_text("📱 Gerando QR Code para conexão...")
 
-        from whatsapp_service import WhatsAppService
-        import base64
+        from whatsapp_service import obter_whatsapp_service
         import io
 
-        whatsapp = WhatsAppService()
+        whatsapp = obter_whatsapp_service()
 
         # Primeiro verificar se já está conectado
         status = await whatsapp.verificar_status_instancia()
@@ -3401,19 +3285,11 @@ Se quiser reconectar com uma nova conta, primeiro desconecte a atual."""
                                           reply_markup=reply_markup)
             return
 
-        # Gerar o QR Code
-        qr_base64_raw = await whatsapp.gerar_qr_code_base64()
+        # Gerar o QR Code (ou reaproveitar o que ainda está válido)
+        qr_bytes = await whatsapp.obter_qr_code_imagem()
 
-        if qr_base64_raw:
+        if qr_bytes:
             try:
-                # Validar e limpar o base64 usando a nova função robusta
-                qr_base64_clean = whatsapp.validar_e_limpar_base64(
-                    qr_base64_raw)
-                if not qr_base64_clean:
-                    raise ValueError("QR Code base64 inválido após validação")
-
-                # Decodificar o base64 para bytes
-                qr_bytes = base64.b64decode(qr_base64_clean, validate=True)
                 qr_io = io.BytesIO(qr_bytes)
                 qr_io.name = 'qr_code.png'
 
@@ -3624,11 +3500,11 @@ async def finalizar_edicao(update, context, campo, novo_valor):
                 reply_markup=criar_teclado_principal())
             return ConversationHandler.END
 
-        from database import DatabaseManager
-        db = DatabaseManager()
+        from database.db import obter_db
+        db = obter_db()
 
         # Aplicar a mudança
-        sucesso = db.atualizar_cliente(cliente_id, campo, novo_valor)
+        sucesso = await db.atualizar_cliente(cliente_id, campo, novo_valor)
 
         if sucesso:
             valor_exibicao = novo_valor
@@ -3640,7 +3516,7 @@ async def finalizar_edicao(update, context, campo, novo_valor):
 
             await update.message.reply_text(
                 f"✅ {campo.title()} atualizado com sucesso!\n\n"
-                f"👤 Cliente: {cliente_dados['nome']}\n"
+                f"👤 Cliente: {cliente_dados.nome}\n"
                 f"📝 Campo: {campo.title()}\n"
                 f"🔄 Novo valor: {valor_exibicao}",
                 reply_markup=criar_teclado_principal())
@@ -3663,6 +3539,30 @@ async def finalizar_edicao(update, context, campo, novo_valor):
         return ConversationHandler.END
 
 
+async def ao_iniciar(application):
+    """post_init: abre a sessão HTTP e começa a esvaziar a fila de mensagens"""
+    from config import BOT_MODO
+    from whatsapp_service import iniciar_whatsapp_service
+    from fila_envio import iniciar_despachante
+    await iniciar_whatsapp_service(application)
+    await iniciar_despachante(application)
+    if BOT_MODO == "webhook":
+        from evolution_webhook import iniciar_receptor_evolution
+        await iniciar_receptor_evolution(application)
+
+
+async def ao_encerrar(application):
+    """post_shutdown: encerra o despachante antes de fechar a sessão HTTP e o banco"""
+    from whatsapp_service import encerrar_whatsapp_service
+    from fila_envio import parar_despachante
+    from database.db import fechar_db
+    from evolution_webhook import parar_receptor_evolution
+    await parar_despachante(application)
+    await parar_receptor_evolution(application)
+    await encerrar_whatsapp_service(application)
+    await fechar_db(application)
+
+
 def main():
     """Função principal"""
     # Verificar variáveis essenciais
@@ -3681,21 +3581,38 @@ def main():
 
     # Testar componentes principais
     try:
-        from database import DatabaseManager
+        from database import (DatabaseManager, criar_tabela, iniciar_checkpoint_wal,
+                              iniciar_virada_snapshot)
+        criar_tabela()
         db = DatabaseManager()
-        print("✅ Banco de dados OK")
+        db.verificar_planos_consulta()
+        db.virar_snapshot_status()
+        iniciar_virada_snapshot()
+        if iniciar_checkpoint_wal():
+            print("✅ Banco de dados OK (perfil WAL, checkpoint agendado)")
+        else:
+            print("✅ Banco de dados OK")
     except Exception as e:
         print(f"⚠️ Database: {e}")
 
     try:
-        from whatsapp_service import WhatsAppService
-        ws = WhatsAppService()
+        from whatsapp_service import obter_whatsapp_service
+        ws = obter_whatsapp_service()
         print("✅ WhatsApp Service OK")
     except Exception as e:
         print(f"⚠️ WhatsApp: {e}")
 
-    # Criar e configurar aplicação
-    app = Application.builder().token(token).build()
+    # Criar e configurar aplicação; chats diferentes são atendidos em
+    # paralelo, cada chat em ordem
+    from config import BOT_ATUALIZACOES_SIMULTANEAS
+    from processador_updates import ProcessadorPorChat
+    builder = (Application.builder().token(token)
+               .post_init(ao_iniciar)
+               .post_shutdown(ao_encerrar))
+    if BOT_ATUALIZACOES_SIMULTANEAS > 1:
+        builder = builder.concurrent_updates(
+            ProcessadorPorChat(BOT_ATUALIZACOES_SIMULTANEAS))
+    app = builder.build()
 
     # ConversationHandler para cadastro escalonável
     cadastro_handler = ConversationHandler(
@@ -3842,13 +3759,25 @@ def main():
     app.add_handler(CommandHandler("templates", menu_templates))
     app.add_handler(CommandHandler("agendador", menu_agendador))
 
+    # Comandos de envio em lote e verificação dos números
+    from enhanced_commands import EnhancedCommands
+    comandos = EnhancedCommands()
+    app.add_handler(CommandHandler("notificar_lote",
+                                   verificar_admin(comandos.comando_notificar_lote)))
+    app.add_handler(CommandHandler("verificar_numeros",
+                                   verificar_admin(comandos.comando_verificar_numeros)))
+
     # Adicionar ConversationHandlers PRIMEIRO (prioridade mais alta)
     app.add_handler(config_handler, group=0)
     app.add_handler(config_direct_handler, group=0)
     app.add_handler(edicao_handler, group=0)
     app.add_handler(cadastro_handler, group=0)
 
-    # Handler para callbacks dos botões inline
+    # Handler para callbacks dos botões inline (o do lote vem antes do
+    # genérico, que aceita qualquer callback do grupo)
+    app.add_handler(CallbackQueryHandler(
+        verificar_admin(comandos.processar_lote_callback), pattern="^lote_"),
+                    group=1)
     app.add_handler(CallbackQueryHandler(callback_cliente), group=1)
 
     # Handler específico para callbacks de templates
@@ -3897,14 +3826,26 @@ def main():
 
     print("🤖 Bot online e funcionando!")
 
-    # Iniciar polling
+    # Iniciar polling ou o servidor de webhook
+    from config import BOT_MODO
     try:
-        app.run_polling(drop_pending_updates=True)
+        if BOT_MODO == "webhook":
+            import asyncio
+            from servidor_webhook import executar_webhook
+            from evolution_webhook import registrar_rotas_evolution
+            registrar_rotas_evolution()
+            asyncio.run(executar_webhook(app))
+        else:
+            app.run_polling(drop_pending_updates=True)
     except KeyboardInterrupt:
         print("\n👋 Bot encerrado pelo usuário")
     except Exception as e:
         print(f"❌ Erro: {e}")
         sys.exit(1)
+    finally:
+        from database import parar_checkpoint_wal, parar_virada_snapshot
+        parar_virada_snapshot()
+        parar_checkpoint_wal()
 
 
 if __name__ == "__main__":
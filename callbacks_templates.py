@@ -91,11 +91,11 @@ async def callback_templates_testar(query, context):
     """Callback para testar template com dados reais"""
     try:
         from templates_system import TemplateManager
-        from database import DatabaseManager
+        from database.db import obter_db
         
         # Buscar um cliente para teste
-        db = DatabaseManager()
-        clientes = db.listar_clientes()
+        db = obter_db()
+        clientes = await db.listar_clientes()
         
         if not clientes:
             await query.edit_message_text(
@@ -219,12 +219,22 @@ Verifique:
 async def callback_agendador_stats(query, context):
     """Callback para mostrar estatísticas do agendador"""
     try:
-        from scheduler_automatico import AgendadorAutomatico
-        
-        agendador = AgendadorAutomatico()
-        
-        # Obter status do sistema
-        status = agendador.obter_status_agendador()
+        from whatsapp_service import obter_whatsapp_service
+        
+        try:
+            from scheduler_automatico import AgendadorAutomatico
+            
+            agendador = AgendadorAutomatico()
+            
+            # Obter status do sistema
+            status = agendador.obter_status_agendador()
+        except ImportError:
+            status = {'rodando': False, 'proxima_execucao': 'Diariamente às 9h',
+                      'jobs_ativos': 0}
+        
+        # Circuit breaker dos envios à Evolution API
+        whatsapp = obter_whatsapp_service()
+        disjuntor = whatsapp.estatisticas_disjuntor()
         
         # Estatísticas simplificadas
         historico_7d = {
@@ -260,6 +270,10 @@ async def callback_agendador_stats(query, context):
 • Falhas: {historico_30d['falhas']}
 • Taxa sucesso: {historico_30d['taxa_sucesso']:.1f}%
 
+🔌 <b>Circuito Evolution API:</b> {whatsapp.disjuntor.descricao()}
+• Falhas seguidas: {disjuntor['falhas_consecutivas']}/{disjuntor['falhas_para_abrir']}
+• Aberturas: {disjuntor['aberturas']} • Envios recusados: {disjuntor['recusados']}
+
 <i>Atualizado em: {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</i>"""
         
         keyboard = [
@@ -10,13 +10,116 @@ TOKEN = os.getenv("BOT_TOKEN")
 # ID do chat do administrador
 ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0"))
 
+# Atualizações do Telegram processadas ao mesmo tempo (chats diferentes;
+# as de um mesmo chat seguem em ordem). 1 = processamento sequencial
+BOT_ATUALIZACOES_SIMULTANEAS = int(os.getenv("BOT_ATUALIZACOES_SIMULTANEAS", "8"))
+
+# Recebimento das atualizações: "polling" ou "webhook" (servidor aiohttp
+# embutido). Sem WEBHOOK_URL o servidor sobe mas não é registrado no
+# Telegram (testes locais); sem WEBHOOK_SEGREDO um segredo é gerado a cada início
+BOT_MODO = os.getenv("BOT_MODO", "polling").lower()
+WEBHOOK_ENDERECO = os.getenv("WEBHOOK_ENDERECO", "0.0.0.0")
+WEBHOOK_PORTA = int(os.getenv("WEBHOOK_PORTA", os.getenv("PORT", "8443")))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_CAMINHO = os.getenv("WEBHOOK_CAMINHO", "/telegram")
+WEBHOOK_SEGREDO = os.getenv("WEBHOOK_SEGREDO", "")
+
 # Configurações da Evolution API
 EVOLUTION_API_URL = os.getenv("EVOLUTION_API_URL", "http://localhost:8080")
 EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY", "")
 EVOLUTION_INSTANCE_NAME = os.getenv("EVOLUTION_INSTANCE_NAME", "default")
 
+# Conexões HTTP com a Evolution API (sessão única compartilhada pelo bot)
+EVOLUTION_CONEXOES_MAX = int(os.getenv("EVOLUTION_CONEXOES_MAX", "20"))
+EVOLUTION_CONEXOES_POR_HOST = int(os.getenv("EVOLUTION_CONEXOES_POR_HOST", "10"))
+EVOLUTION_KEEPALIVE = float(os.getenv("EVOLUTION_KEEPALIVE", "30"))
+EVOLUTION_DNS_CACHE_TTL = int(os.getenv("EVOLUTION_DNS_CACHE_TTL", "300"))
+EVOLUTION_TIMEOUT = float(os.getenv("EVOLUTION_TIMEOUT", "30"))
+EVOLUTION_TIMEOUT_CONEXAO = float(os.getenv("EVOLUTION_TIMEOUT_CONEXAO", "10"))
+
+# Retentativas das chamadas à Evolution API (timeouts, 429 e 5xx): total de
+# tentativas, backoff exponencial com jitter e prazo máximo de cada chamada
+EVOLUTION_TENTATIVAS = int(os.getenv("EVOLUTION_TENTATIVAS", "4"))
+EVOLUTION_BACKOFF_BASE = float(os.getenv("EVOLUTION_BACKOFF_BASE", "0.5"))
+EVOLUTION_BACKOFF_MAX = float(os.getenv("EVOLUTION_BACKOFF_MAX", "8"))
+EVOLUTION_PRAZO_CHAMADA = float(os.getenv("EVOLUTION_PRAZO_CHAMADA", "60"))
+
+# Circuit breaker dos envios: falhas seguidas para abrir o circuito e
+# segundos com o circuito aberto antes de sondar a instância de novo
+EVOLUTION_DISJUNTOR_FALHAS = int(os.getenv("EVOLUTION_DISJUNTOR_FALHAS", "5"))
+EVOLUTION_DISJUNTOR_ESPERA = float(os.getenv("EVOLUTION_DISJUNTOR_ESPERA", "30"))
+# Timeout da sondagem que fecha o circuito (uma tentativa, sem retentativas)
+EVOLUTION_SONDAGEM_TIMEOUT = float(os.getenv("EVOLUTION_SONDAGEM_TIMEOUT", "5"))
+
+# Estado da conexão da instância: validade do valor em memória e intervalo
+# do monitor que o mantém atualizado em segundo plano
+EVOLUTION_ESTADO_TTL = float(os.getenv("EVOLUTION_ESTADO_TTL", "30"))
+EVOLUTION_ESTADO_INTERVALO = float(os.getenv("EVOLUTION_ESTADO_INTERVALO", "15"))
+# Com eventos CONNECTION_UPDATE chegando pelo webhook, a consulta vira só uma
+# conferência: intervalo do monitor (o estado vale o dobro disso)
+EVOLUTION_ESTADO_INTERVALO_EVENTOS = float(os.getenv("EVOLUTION_ESTADO_INTERVALO_EVENTOS", "300"))
+
+# Webhook da Evolution API, servido junto com o do Telegram (BOT_MODO=webhook):
+# caminho, segredo exigido em ?segredo= e URL pública que a instância chama
+# (padrão: WEBHOOK_URL + caminho)
+EVOLUTION_WEBHOOK_CAMINHO = os.getenv("EVOLUTION_WEBHOOK_CAMINHO", "/evolution")
+EVOLUTION_WEBHOOK_SEGREDO = os.getenv("EVOLUTION_WEBHOOK_SEGREDO", "")
+EVOLUTION_WEBHOOK_URL = os.getenv(
+    "EVOLUTION_WEBHOOK_URL",
+    f"{WEBHOOK_URL}{EVOLUTION_WEBHOOK_CAMINHO}" if WEBHOOK_URL else "")
+# Recibos de entrega: intervalo e tamanho do lote gravado em mensagens_log, e
+# por quantos segundos um recibo espera o envio correspondente aparecer no log
+EVOLUTION_RECIBOS_INTERVALO = float(os.getenv("EVOLUTION_RECIBOS_INTERVALO", "2"))
+EVOLUTION_RECIBOS_LOTE = int(os.getenv("EVOLUTION_RECIBOS_LOTE", "200"))
+EVOLUTION_RECIBOS_RETENCAO = float(os.getenv("EVOLUTION_RECIBOS_RETENCAO", "120"))
+
+# QR Code: prazo das consultas sem efeito colateral antes de partir para o
+# restart/recriação da instância e atraso máximo entre consultas paralelas
+EVOLUTION_QR_PRAZO = float(os.getenv("EVOLUTION_QR_PRAZO", "10"))
+EVOLUTION_QR_ATRASO_MAX = float(os.getenv("EVOLUTION_QR_ATRASO_MAX", "2"))
+# Validade do QR Code em memória: cliques repetidos reaproveitam a mesma imagem
+EVOLUTION_QR_VALIDADE = float(os.getenv("EVOLUTION_QR_VALIDADE", "40"))
+
+# Envio em lote: workers simultâneos
+EVOLUTION_LOTE_CONCORRENCIA = int(os.getenv("EVOLUTION_LOTE_CONCORRENCIA", "5"))
+
+# Verificação de números no WhatsApp: números por consulta, consultas
+# simultâneas e validade (horas) do resultado guardado em whatsapp_contatos
+EVOLUTION_VERIFICACAO_LOTE = int(os.getenv("EVOLUTION_VERIFICACAO_LOTE", "50"))
+EVOLUTION_VERIFICACAO_CONCORRENCIA = int(os.getenv("EVOLUTION_VERIFICACAO_CONCORRENCIA", "3"))
+EVOLUTION_CONTATO_VALIDADE_HORAS = int(os.getenv("EVOLUTION_CONTATO_VALIDADE_HORAS", "168"))
+
+# Limite de envio (token bucket): ritmo sustentado, rajada máxima e intervalo
+# mínimo entre duas mensagens para o mesmo número
+EVOLUTION_MENSAGENS_POR_MINUTO = float(os.getenv("EVOLUTION_MENSAGENS_POR_MINUTO", "120"))
+EVOLUTION_RAJADA = int(os.getenv("EVOLUTION_RAJADA", "5"))
+EVOLUTION_INTERVALO_DESTINO = float(os.getenv("EVOLUTION_INTERVALO_DESTINO", "10"))
+
+# Fila persistente de mensagens: tamanho do lote reservado pelo despachante,
+# validade da reserva, intervalo de verificação e limite de tentativas
+FILA_LOTE = int(os.getenv("FILA_LOTE", "10"))
+FILA_LEASE_SEGUNDOS = int(os.getenv("FILA_LEASE_SEGUNDOS", "300"))
+FILA_INTERVALO = float(os.getenv("FILA_INTERVALO", "5"))
+FILA_MAX_TENTATIVAS = int(os.getenv("FILA_MAX_TENTATIVAS", "3"))
+FILA_ESPERA_RETENTATIVA = int(os.getenv("FILA_ESPERA_RETENTATIVA", "60"))
+
 # Configurações do banco de dados
 DB_PATH = "clientes.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Perfil de armazenamento: "padrao" (journal rollback) ou "wal"
+# (WAL + PRAGMAs de desempenho; leitores não esperam os escritores)
+DB_STORAGE_PROFILE = os.getenv("DB_STORAGE_PROFILE", "padrao").lower()
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_CHECKPOINT_INTERVALO = int(os.getenv("DB_CHECKPOINT_INTERVALO", "300"))
+
+# Limite de clientes mantidos no cache em memória (LRU)
+CACHE_CLIENTES_TAMANHO = int(os.getenv("CACHE_CLIENTES_TAMANHO", "10000"))
+
+# Quantidade de clientes por página na lista inline
+CLIENTES_POR_PAGINA = int(os.getenv("CLIENTES_POR_PAGINA", "20"))
 
 # Estados da conversa
 ADD_NAME, ADD_PHONE, ADD_PACOTE, ADD_PLANO, ADD_SERVIDOR, ALTERAR_VENCIMENTO = range(6)
@@ -0,0 +1,1746 @@
+"""
+Gerenciador do banco de dados SQLite
+"""
+
+import os
+import sqlite3
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytz
+from typing import List, Dict, Optional, Tuple
+from config import (DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STORAGE_PROFILE,
+                    DB_MMAP_SIZE, DB_CACHE_SIZE_KB, DB_CHECKPOINT_INTERVALO,
+                    CLIENTES_POR_PAGINA, CACHE_CLIENTES_TAMANHO,
+                    FILA_MAX_TENTATIVAS, FILA_ESPERA_RETENTATIVA,
+                    EVOLUTION_CONTATO_VALIDADE_HORAS)
+
+# Configurar timezone brasileiro
+TIMEZONE_BR = pytz.timezone('America/Sao_Paulo')
+
+def agora_br():
+    """Retorna datetime atual no fuso horário de Brasília"""
+    return datetime.now(TIMEZONE_BR)
+
+def momento_br(segundos: float = 0) -> str:
+    """Data e hora de Brasília (deslocada em X segundos) no formato do banco"""
+    return (agora_br() + timedelta(seconds=segundos)).strftime('%Y-%m-%d %H:%M:%S')
+
+def data_br(dias: int = 0) -> str:
+    """Retorna a data de hoje (Brasília) deslocada em X dias, no formato do banco"""
+    return (agora_br().date() + timedelta(days=dias)).strftime('%Y-%m-%d')
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs aplicados uma única vez, quando a conexão é criada pelo pool
+PRAGMAS_CONEXAO = [
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+]
+
+# PRAGMAs adicionais de cada perfil de armazenamento (DB_STORAGE_PROFILE)
+PRAGMAS_PERFIL = {
+    'padrao': [],
+    'wal': [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        f"PRAGMA mmap_size = {DB_MMAP_SIZE}",
+        f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}",
+        "PRAGMA temp_store = MEMORY",
+    ],
+}
+
+
+def perfil_wal_ativo() -> bool:
+    """Indica se o perfil de armazenamento WAL está habilitado"""
+    return DB_STORAGE_PROFILE == 'wal'
+
+
+def pragmas_conexao() -> List[str]:
+    """Retorna os PRAGMAs a aplicar em cada nova conexão"""
+    if DB_STORAGE_PROFILE not in PRAGMAS_PERFIL:
+        logger.warning(f"Perfil de armazenamento desconhecido: {DB_STORAGE_PROFILE}")
+        return list(PRAGMAS_CONEXAO)
+    return PRAGMAS_CONEXAO + PRAGMAS_PERFIL[DB_STORAGE_PROFILE]
+
+
+# Índices secundários das consultas por vencimento, histórico e logs
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS idx_clientes_ativo_vencimento ON clientes (ativo, vencimento)",
+    "CREATE INDEX IF NOT EXISTS idx_renovacoes_telefone_data ON renovacoes (telefone, data_renovacao)",
+    "CREATE INDEX IF NOT EXISTS idx_mensagens_log_data_status ON mensagens_log (data_envio, status)",
+    "CREATE INDEX IF NOT EXISTS idx_mensagens_log_whatsapp_id ON mensagens_log (whatsapp_id)",
+    "CREATE INDEX IF NOT EXISTS idx_fila_status_proxima ON fila_mensagens (status, proxima_tentativa)",
+    "CREATE INDEX IF NOT EXISTS idx_fila_status_lease ON fila_mensagens (status, lease_ate)",
+]
+
+# Consultas com predicados de intervalo (sem funções sobre a coluna),
+# para que o SQLite possa usar os índices acima
+SQL_CLIENTES_VENCENDO = '''
+    SELECT * FROM clientes
+    WHERE ativo = 1 AND vencimento >= ? AND vencimento < ?
+'''
+SQL_CLIENTES_VENCIDOS = '''
+    SELECT * FROM clientes
+    WHERE ativo = 1 AND vencimento < ?
+'''
+SQL_HISTORICO_TELEFONE = '''
+    SELECT * FROM renovacoes WHERE telefone = ? ORDER BY data_renovacao DESC
+'''
+SQL_ENVIOS_POR_DIA = '''
+    SELECT substr(data_envio, 1, 10) AS data, status, COUNT(*) AS total
+    FROM mensagens_log
+    WHERE data_envio >= ?
+    GROUP BY substr(data_envio, 1, 10), status
+    ORDER BY data DESC, status
+'''
+SQL_ENVIOS_POR_STATUS = '''
+    SELECT status, COUNT(*) AS total, COALESCE(SUM(tentativas - 1), 0) AS retentativas
+    FROM mensagens_log
+    WHERE data_envio >= ?
+    GROUP BY status
+'''
+SQL_ENTREGAS_POR_SITUACAO = '''
+    SELECT COALESCE(entrega, 'sem_recibo') AS entrega, COUNT(*) AS total
+    FROM mensagens_log
+    WHERE data_envio >= ? AND status = 'enviado'
+    GROUP BY COALESCE(entrega, 'sem_recibo')
+'''
+
+# Paginação por cursor (keyset) sobre (vencimento, id), servida pelo índice
+# idx_clientes_ativo_vencimento (o id entra implicitamente como rowid)
+SQL_PAGINA_CLIENTES_INICIO = '''
+    SELECT * FROM clientes
+    WHERE ativo = 1
+    ORDER BY vencimento, id
+    LIMIT ?
+'''
+SQL_PAGINA_CLIENTES_PROXIMA = '''
+    SELECT * FROM clientes
+    WHERE ativo = 1 AND (vencimento, id) > (?, ?)
+    ORDER BY vencimento, id
+    LIMIT ?
+'''
+SQL_PAGINA_CLIENTES_ANTERIOR = '''
+    SELECT * FROM clientes
+    WHERE ativo = 1 AND (vencimento, id) < (?, ?)
+    ORDER BY vencimento DESC, id DESC
+    LIMIT ?
+'''
+
+# Contagem e receita dos clientes ativos por faixa de vencimento, numa única
+# consulta agrupada sobre o índice (ativo, vencimento)
+SQL_RESUMO_STATUS = '''
+    SELECT CASE
+               WHEN vencimento < ?1 THEN 'vencidos'
+               WHEN vencimento = ?1 THEN 'vencendo_hoje'
+               WHEN vencimento <= ?2 THEN 'vencendo_breve'
+               ELSE 'em_dia'
+           END AS faixa,
+           COUNT(*) AS total,
+           COALESCE(SUM(plano), 0) AS receita
+    FROM clientes
+    WHERE ativo = 1
+    GROUP BY faixa
+'''
+FAIXAS_STATUS = ('vencidos', 'vencendo_hoje', 'vencendo_breve', 'em_dia')
+
+# Snapshot materializado do resumo de status (linha única, id = 1). Os
+# triggers abaixo ajustam as faixas a cada escrita em clientes, relativas a
+# data_referencia; a virada diária (virar_snapshot_status) desloca as faixas.
+SQL_SNAPSHOT_TABELA = '''
+    CREATE TABLE IF NOT EXISTS status_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        data_referencia TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        receita REAL NOT NULL DEFAULT 0,
+        vencidos INTEGER NOT NULL DEFAULT 0,
+        vencendo_hoje INTEGER NOT NULL DEFAULT 0,
+        vencendo_breve INTEGER NOT NULL DEFAULT 0,
+        em_dia INTEGER NOT NULL DEFAULT 0,
+        atualizado_em TEXT
+    )
+'''
+
+
+def _termos_snapshot(linha: str) -> Dict[str, str]:
+    """Contribuição de uma linha (NEW/OLD) para cada coluna do snapshot"""
+    ativo = f"{linha}.ativo = 1"
+    limite_breve = "date(data_referencia, '+3 days')"
+    return {
+        'total': f"({ativo})",
+        'receita': f"(CASE WHEN {ativo} THEN {linha}.plano ELSE 0 END)",
+        'vencidos': f"({ativo} AND {linha}.vencimento < data_referencia)",
+        'vencendo_hoje': f"({ativo} AND {linha}.vencimento = data_referencia)",
+        'vencendo_breve': f"({ativo} AND {linha}.vencimento > data_referencia"
+                          f" AND {linha}.vencimento <= {limite_breve})",
+        'em_dia': f"({ativo} AND {linha}.vencimento > {limite_breve})",
+    }
+
+
+def _ajuste_snapshot(somar: bool, subtrair: bool) -> str:
+    """UPDATE do snapshot somando NEW e/ou subtraindo OLD"""
+    novo, antigo = _termos_snapshot('NEW'), _termos_snapshot('OLD')
+    colunas = []
+    for coluna in novo:
+        expressao = coluna
+        if somar:
+            expressao += f" + {novo[coluna]}"
+        if subtrair:
+            expressao += f" - {antigo[coluna]}"
+        colunas.append(f"{coluna} = {expressao}")
+    return f"UPDATE status_snapshot SET {', '.join(colunas)} WHERE id = 1;"
+
+
+TRIGGERS_SNAPSHOT = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_status_snapshot_insert
+        AFTER INSERT ON clientes
+        BEGIN {_ajuste_snapshot(somar=True, subtrair=False)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_status_snapshot_update
+        AFTER UPDATE OF ativo, vencimento, plano ON clientes
+        BEGIN {_ajuste_snapshot(somar=True, subtrair=True)} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_status_snapshot_delete
+        AFTER DELETE ON clientes
+        BEGIN {_ajuste_snapshot(somar=False, subtrair=True)} END""",
+]
+
+# Fila persistente de mensagens WhatsApp. Uma mensagem passa de 'pendente'
+# para 'processando' quando o despachante a reserva (lease_dono/lease_ate);
+# se o processo cair, a reserva vence e a mensagem volta a ser elegível.
+SQL_FILA_TABELA = '''
+    CREATE TABLE IF NOT EXISTS fila_mensagens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        telefone TEXT NOT NULL,
+        nome_cliente TEXT,
+        tipo_mensagem TEXT NOT NULL,
+        conteudo TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pendente',
+        prioridade INTEGER NOT NULL DEFAULT 0,
+        tentativas INTEGER NOT NULL DEFAULT 0,
+        max_tentativas INTEGER NOT NULL DEFAULT 3,
+        proxima_tentativa TEXT NOT NULL,
+        lease_dono TEXT,
+        lease_ate TEXT,
+        ultimo_erro TEXT,
+        criado_em TEXT NOT NULL,
+        enviado_em TEXT
+    )
+'''
+
+SQL_FILA_DISPONIVEIS = '''
+    SELECT id FROM fila_mensagens
+    WHERE (status = 'pendente' AND proxima_tentativa <= ?1)
+       OR (status = 'processando' AND lease_ate <= ?1)
+    ORDER BY prioridade DESC, proxima_tentativa, id
+    LIMIT ?2
+'''
+
+# Resultado da verificação "número tem WhatsApp?", por número já formatado
+SQL_CONTATOS_TABELA = '''
+    CREATE TABLE IF NOT EXISTS whatsapp_contatos (
+        numero TEXT PRIMARY KEY,
+        existe INTEGER NOT NULL,
+        jid TEXT,
+        verificado_em TEXT NOT NULL
+    )
+'''
+
+# Situação da entrega no WhatsApp (recibos da Evolution API), da menos para a
+# mais avançada: um recibo que chega atrasado não rebaixa a situação gravada
+NIVEIS_ENTREGA = {'pendente': 1, 'servidor': 2, 'erro': 3, 'entregue': 4,
+                  'lido': 5, 'reproduzido': 6}
+
+SQL_LOG_ENTREGA = '''
+    UPDATE mensagens_log SET entrega = ?, entrega_em = ?
+    WHERE whatsapp_id = ?
+      AND COALESCE(CASE entrega {niveis} END, 0) < ?
+'''.format(niveis=" ".join(f"WHEN '{situacao}' THEN {nivel}"
+                             for situacao, nivel in NIVEIS_ENTREGA.items()))
+
+# {marcadores}: um "?" por id de mensagem do WhatsApp
+SQL_LOG_IDS_EXISTENTES = '''
+    SELECT DISTINCT whatsapp_id FROM mensagens_log WHERE whatsapp_id IN ({marcadores})
+'''
+
+SQL_FILA_EXPIRAR_ESGOTADAS = '''
+    UPDATE fila_mensagens
+    SET status = 'erro', lease_dono = NULL, lease_ate = NULL,
+        ultimo_erro = COALESCE(ultimo_erro, 'reserva expirada')
+    WHERE status = 'processando' AND lease_ate <= ?
+      AND tentativas >= max_tentativas
+'''
+
+# {marcadores}: um "?" por id reservado
+SQL_FILA_RESERVAR = '''
+    UPDATE fila_mensagens
+    SET status = 'processando', tentativas = tentativas + 1,
+        lease_dono = ?, lease_ate = ?
+    WHERE id IN ({marcadores})
+'''
+
+SQL_FILA_RESERVADAS = '''
+    SELECT * FROM fila_mensagens WHERE id IN ({marcadores})
+    ORDER BY prioridade DESC, proxima_tentativa, id
+'''
+
+SQL_FILA_CONCLUIR_SUCESSO = '''
+    UPDATE fila_mensagens
+    SET status = 'enviado', enviado_em = ?, ultimo_erro = NULL,
+        lease_dono = NULL, lease_ate = NULL
+    WHERE id = ? AND lease_dono = ? AND status = 'processando'
+'''
+
+SQL_FILA_CONCLUIR_FALHA = '''
+    UPDATE fila_mensagens
+    SET status = CASE WHEN ? OR tentativas >= max_tentativas
+                      THEN 'erro' ELSE 'pendente' END,
+        proxima_tentativa = ?, ultimo_erro = ?,
+        lease_dono = NULL, lease_ate = NULL
+    WHERE id = ? AND lease_dono = ? AND status = 'processando'
+'''
+
+SQL_SNAPSHOT_GRAVAR = '''
+    INSERT OR REPLACE INTO status_snapshot
+    (id, data_referencia, total, receita, vencidos, vencendo_hoje,
+     vencendo_breve, em_dia, atualizado_em)
+    VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# breve -> hoje, hoje -> vencidos, em dia -> breve
+SQL_SNAPSHOT_VIRAR_DIA = '''
+    UPDATE status_snapshot SET
+        vencidos = vencidos + vencendo_hoje,
+        vencendo_hoje = ?,
+        vencendo_breve = vencendo_breve - ? + ?,
+        em_dia = em_dia - ?,
+        data_referencia = ?,
+        atualizado_em = ?
+    WHERE id = 1
+'''
+
+SQL_CONTAR_VENCIMENTO = '''
+    SELECT COUNT(*) FROM clientes WHERE ativo = 1 AND vencimento = ?
+'''
+
+# Consultas conferidas por DatabaseManager.verificar_planos_consulta()
+CONSULTAS_INDEXADAS = {
+    'resumo_status': (SQL_RESUMO_STATUS, ('2000-01-01', '2000-01-04')),
+    'contar_vencimento': (SQL_CONTAR_VENCIMENTO, ('2000-01-01',)),
+    'pagina_clientes_inicio': (SQL_PAGINA_CLIENTES_INICIO, (20,)),
+    'pagina_clientes_proxima': (SQL_PAGINA_CLIENTES_PROXIMA, ('2000-01-01', 0, 20)),
+    'pagina_clientes_anterior': (SQL_PAGINA_CLIENTES_ANTERIOR, ('2000-01-01', 0, 20)),
+    'clientes_vencendo': (SQL_CLIENTES_VENCENDO, ('2000-01-01', '2000-01-02')),
+    'clientes_vencidos': (SQL_CLIENTES_VENCIDOS, ('2000-01-01',)),
+    'historico_renovacoes': (SQL_HISTORICO_TELEFONE, ('0',)),
+    'envios_por_dia': (SQL_ENVIOS_POR_DIA, ('2000-01-01',)),
+    'envios_por_status': (SQL_ENVIOS_POR_STATUS, ('2000-01-01',)),
+}
+
+
+# Demais comandos dos gerenciadores; o síncrono (DatabaseManager) e o
+# assíncrono (database/db.py) usam os mesmos textos e as funções abaixo,
+# diferindo só na forma de executar
+SQL_CLIENTES_TODOS = "SELECT * FROM clientes"
+SQL_CLIENTE_POR_ID = "SELECT * FROM clientes WHERE id = ?"
+SQL_CLIENTE_POR_TELEFONE = "SELECT * FROM clientes WHERE telefone = ?"
+# {marcadores}: um "?" por id
+SQL_CLIENTES_POR_IDS = "SELECT * FROM clientes WHERE id IN ({marcadores})"
+SQL_CLIENTE_INSERIR = '''
+    INSERT INTO clientes (nome, telefone, pacote, plano, vencimento, servidor, chat_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# {coluna}: nome da coluna, vindo de coluna_cliente() ou do próprio código
+SQL_CLIENTE_ATUALIZAR_CAMPO = "UPDATE clientes SET {coluna} = ? WHERE id = ?"
+SQL_CLIENTE_ATUALIZAR_CAMPO_TELEFONE = "UPDATE clientes SET {coluna} = ? WHERE telefone = ?"
+SQL_CLIENTE_ATUALIZAR_COMPLETO = '''
+    UPDATE clientes
+    SET nome = ?, telefone = ?, pacote = ?, plano = ?, servidor = ?, vencimento = ?
+    WHERE id = ?
+'''
+SQL_CLIENTE_EXCLUIR = "DELETE FROM clientes WHERE id = ?"
+SQL_CLIENTE_DESATIVAR = "UPDATE clientes SET ativo = 0 WHERE telefone = ?"
+
+SQL_RENOVACAO_INSERIR = '''
+    INSERT INTO renovacoes
+    (telefone, data_renovacao, novo_vencimento, pacote_anterior,
+     pacote_novo, plano_anterior, plano_novo, observacoes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_HISTORICO_TODOS = "SELECT * FROM renovacoes ORDER BY data_renovacao DESC"
+
+SQL_CONFIGURACOES = "SELECT * FROM configuracoes WHERE id = 1"
+SQL_CONFIGURACOES_SALVAR = '''
+    INSERT OR REPLACE INTO configuracoes
+    (id, pix_key, empresa_nome, contato_suporte, updated_at)
+    VALUES (1, ?, ?, ?, ?)
+'''
+
+SQL_LOG_INSERIR = '''
+    INSERT INTO mensagens_log
+    (telefone, nome_cliente, tipo_mensagem, conteudo_mensagem,
+     data_envio, status, erro_detalhes, tentativas, whatsapp_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_LOG_TOTAL = "SELECT COUNT(*) AS total FROM mensagens_log"
+SQL_LOG_POR_STATUS = "SELECT status, COUNT(*) AS count FROM mensagens_log GROUP BY status"
+SQL_LOG_POR_TIPO = ("SELECT tipo_mensagem, COUNT(*) AS count FROM mensagens_log "
+                    "GROUP BY tipo_mensagem")
+
+SQL_FILA_INSERIR = '''
+    INSERT INTO fila_mensagens
+    (telefone, nome_cliente, tipo_mensagem, conteudo, prioridade,
+     max_tentativas, proxima_tentativa, criado_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_FILA_STATUS = "SELECT status FROM fila_mensagens WHERE id = ?"
+SQL_FILA_POR_STATUS = "SELECT status, COUNT(*) AS total FROM fila_mensagens GROUP BY status"
+SQL_FILA_PROXIMAS = '''
+    SELECT id, telefone, nome_cliente, tipo_mensagem, prioridade,
+           tentativas, proxima_tentativa
+    FROM fila_mensagens
+    WHERE status = 'pendente'
+    ORDER BY prioridade DESC, proxima_tentativa, id
+    LIMIT ?
+'''
+SQL_FILA_ENVIADAS_HOJE = '''
+    SELECT COUNT(*) AS total FROM fila_mensagens
+    WHERE status = 'enviado' AND enviado_em >= ?
+'''
+
+# {marcadores}: um "?" por número; o último parâmetro é o limite de validade
+SQL_CONTATOS_VERIFICADOS = '''
+    SELECT numero, existe FROM whatsapp_contatos
+    WHERE numero IN ({marcadores}) AND verificado_em >= ?
+'''
+SQL_CONTATOS_SALVAR = '''
+    INSERT OR REPLACE INTO whatsapp_contatos (numero, existe, jid, verificado_em)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_CONTATOS_RESUMO = '''
+    SELECT SUM(existe = 1) AS com_whatsapp, SUM(existe = 0) AS sem_whatsapp
+    FROM whatsapp_contatos WHERE verificado_em >= ?
+'''
+
+SQL_SNAPSHOT_LER = "SELECT * FROM status_snapshot WHERE id = 1"
+SQL_SNAPSHOT_DATA = "SELECT data_referencia FROM status_snapshot WHERE id = 1"
+
+SQL_TEMPLATE_SALVAR = '''
+    INSERT OR REPLACE INTO templates (nome, titulo, conteudo, tipo)
+    VALUES (?, ?, ?, ?)
+'''
+SQL_TEMPLATE_BUSCAR = "SELECT * FROM templates WHERE nome = ? AND ativo = 1"
+SQL_TEMPLATES_LISTAR = "SELECT * FROM templates WHERE ativo = 1 ORDER BY nome"
+
+# Colunas editáveis pelo bot (nome do campo no bot -> coluna no banco)
+COLUNAS_CLIENTE = {
+    'nome': 'nome',
+    'telefone': 'telefone',
+    'pacote': 'pacote',
+    'valor': 'plano',  # valor -> plano no banco
+    'servidor': 'servidor',
+    'vencimento': 'vencimento',
+}
+
+# Limite de parâmetros por consulta com IN (...), abaixo do máximo do SQLite
+TAMANHO_PARTE = 500
+
+
+def em_partes(itens: List, tamanho: int = TAMANHO_PARTE):
+    """Divide ``itens`` em listas de até ``tamanho`` elementos"""
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def marcadores(quantidade: int) -> str:
+    """``?, ?, ...`` para uma cláusula IN com ``quantidade`` valores"""
+    return ", ".join("?" * quantidade)
+
+
+def alertar_planos(nome: str, detalhes: List[str]):
+    """Registra um alerta se o plano de ``nome`` varre a tabela"""
+    if not detalhes or any(d.startswith('SCAN') for d in detalhes):
+        logger.warning(f"Consulta {nome} sem uso de índice: {detalhes}")
+
+
+def consulta_pagina(cursor: Optional[Tuple[str, int]], anterior: bool,
+                    limite: int) -> Tuple[str, tuple]:
+    """(SQL, parâmetros) da página de clientes; pede um registro a mais para
+    saber se há outra página naquela direção"""
+    if cursor is None:
+        return SQL_PAGINA_CLIENTES_INICIO, (limite + 1,)
+    if anterior:
+        return SQL_PAGINA_CLIENTES_ANTERIOR, (cursor[0], cursor[1], limite + 1)
+    return SQL_PAGINA_CLIENTES_PROXIMA, (cursor[0], cursor[1], limite + 1)
+
+
+def recortar_pagina(clientes: List, limite: int, anterior: bool) -> Tuple[List, bool]:
+    """Aplica o limite à página lida por consulta_pagina: (clientes, tem_mais)"""
+    tem_mais = len(clientes) > limite
+    clientes = clientes[:limite]
+    if anterior:
+        clientes.reverse()
+    return clientes, tem_mais
+
+
+def resumo_por_faixa(linhas) -> Dict:
+    """Soma as linhas (faixa, total, receita) de SQL_RESUMO_STATUS"""
+    resumo = {faixa: 0 for faixa in FAIXAS_STATUS}
+    resumo['total'] = 0
+    resumo['receita'] = 0.0
+    for faixa, total, receita in linhas:
+        resumo[faixa] = total
+        resumo['total'] += total
+        resumo['receita'] += receita
+    return resumo
+
+
+def completar_resumo(resumo: Dict) -> Dict:
+    """Acrescenta os totais derivados ``vencendo_3_dias`` e ``ativos``"""
+    resumo['vencendo_3_dias'] = resumo['vencendo_hoje'] + resumo['vencendo_breve']
+    resumo['ativos'] = resumo['total'] - resumo['vencidos']
+    return resumo
+
+
+def params_snapshot_gravar(hoje: str, resumo: Dict) -> tuple:
+    """Parâmetros de SQL_SNAPSHOT_GRAVAR a partir de resumo_por_faixa()"""
+    return (hoje, resumo['total'], resumo['receita'],
+            *(resumo[faixa] for faixa in FAIXAS_STATUS), momento_br())
+
+
+def params_virar_dia(hoje: str, novos_hoje: int, novos_breve: int) -> tuple:
+    """Parâmetros de SQL_SNAPSHOT_VIRAR_DIA"""
+    return (novos_hoje, novos_hoje, novos_breve, novos_breve, hoje, momento_br())
+
+
+def coluna_cliente(campo: str) -> Optional[str]:
+    """Coluna do banco de um campo editável pelo bot (None se não editável)"""
+    return COLUNAS_CLIENTE.get(campo)
+
+
+def calcular_novo_vencimento(vencimento_atual: Optional[datetime], dias: int) -> datetime:
+    """Vencimento após renovar por ``dias``.
+    
+    Cliente vencido (ou com data inválida) renova a partir de hoje; os
+    demais somam os dias ao vencimento atual.
+    """
+    hoje = agora_br().replace(tzinfo=None)
+    if vencimento_atual is None or vencimento_atual < hoje:
+        return hoje + timedelta(days=dias)
+    return vencimento_atual + timedelta(days=dias)
+
+
+def params_renovacao(cliente: 'Cliente', dias_adicionados: int, valor: float,
+                     observacoes: str = "") -> tuple:
+    """Parâmetros de SQL_RENOVACAO_INSERIR para a renovação por dias"""
+    novo_vencimento = calcular_novo_vencimento(cliente.vencimento_obj, dias_adicionados)
+    return (cliente.telefone, momento_br(), novo_vencimento.strftime('%Y-%m-%d'),
+            cliente.pacote, cliente.pacote,  # Mantém o mesmo pacote
+            cliente.plano, valor,
+            f"Renovação por {dias_adicionados} dias. {observacoes}")
+
+
+def params_renovacao_telefone(cliente: 'Cliente', novo_vencimento: str, pacote_novo: str,
+                              plano_novo: float, observacoes: str = "") -> tuple:
+    """Parâmetros de SQL_RENOVACAO_INSERIR para o método legado por telefone"""
+    return (cliente.telefone, momento_br(), novo_vencimento,
+            cliente.pacote, pacote_novo,
+            cliente.plano, plano_novo,
+            observacoes)
+
+
+def params_log_mensagem(telefone: str, nome_cliente: str, tipo_mensagem: str,
+                        conteudo: str, status: str, erro_detalhes: str = "",
+                        tentativas: int = 1, whatsapp_id: Optional[str] = None) -> tuple:
+    """Parâmetros de SQL_LOG_INSERIR, com a data do envio"""
+    return (telefone, nome_cliente, tipo_mensagem, conteudo,
+            momento_br(), status, erro_detalhes, tentativas, whatsapp_id)
+
+
+def params_entregas(entregas: List[Tuple[str, str, str]], existentes: set) -> List[tuple]:
+    """Parâmetros de SQL_LOG_ENTREGA dos recibos cujo envio já está no log"""
+    return [(situacao, momento, whatsapp_id, NIVEIS_ENTREGA[situacao])
+            for whatsapp_id, situacao, momento in entregas
+            if whatsapp_id in existentes]
+
+
+def params_enfileirar(telefone: str, conteudo: str, tipo_mensagem: str, nome_cliente: str,
+                      prioridade: int, max_tentativas: int) -> tuple:
+    """Parâmetros de SQL_FILA_INSERIR (elegível para envio imediato)"""
+    agora = momento_br()
+    return (telefone, nome_cliente, tipo_mensagem, conteudo, prioridade,
+            max_tentativas, agora, agora)
+
+
+def comando_concluir(mensagem_id: int, dono: str, sucesso: bool, erro: str,
+                     definitivo: bool) -> Tuple[str, tuple]:
+    """(SQL, parâmetros) que registram o resultado de uma mensagem reservada"""
+    if sucesso:
+        return SQL_FILA_CONCLUIR_SUCESSO, (momento_br(), mensagem_id, dono)
+    return SQL_FILA_CONCLUIR_FALHA, (int(definitivo), momento_br(FILA_ESPERA_RETENTATIVA),
+                                     erro, mensagem_id, dono)
+
+
+def montar_resumo_fila(por_status: List[Dict], proximas: List[Dict],
+                       enviadas_hoje: List[Dict]) -> Dict:
+    """Junta as três consultas da tela da fila"""
+    return {
+        'por_status': {linha['status']: linha['total'] for linha in por_status},
+        'proximas': proximas,
+        'enviadas_hoje': enviadas_hoje[0]['total'] if enviadas_hoje else 0,
+    }
+
+
+def limite_validade_contatos(validade_horas: int) -> str:
+    """Verificações anteriores a este momento estão vencidas"""
+    return momento_br(-validade_horas * 3600)
+
+
+def params_contatos(resultados: List[Tuple[str, bool, Optional[str]]]) -> List[tuple]:
+    """Parâmetros de SQL_CONTATOS_SALVAR, com a data da verificação"""
+    agora = momento_br()
+    return [(numero, int(existe), jid, agora) for numero, existe, jid in resultados]
+
+
+def montar_resumo_contatos(linhas: List[Dict]) -> Dict:
+    """Resultado de SQL_CONTATOS_RESUMO (SUM de zero linhas é NULL)"""
+    linha = linhas[0] if linhas else {}
+    return {'com_whatsapp': linha.get('com_whatsapp') or 0,
+            'sem_whatsapp': linha.get('sem_whatsapp') or 0}
+
+
+def montar_estatisticas_mensagens(total: List[Dict], por_status: List[Dict],
+                                  por_tipo: List[Dict]) -> Dict:
+    """Junta as consultas de contagem de mensagens_log"""
+    return {
+        'total': total[0]['total'] if total else 0,
+        'por_status': {linha['status']: linha['count'] for linha in por_status},
+        'por_tipo': {linha['tipo_mensagem']: linha['count'] for linha in por_tipo},
+    }
+
+
+class Cliente:
+    """Registro compacto de um cliente (uma linha da tabela clientes).
+    
+    Usa ``__slots__`` no lugar de um dict por linha. O ``vencimento`` é
+    convertido para datetime só no primeiro acesso a ``vencimento_obj`` e
+    guardado no próprio registro. Instâncias são compartilhadas pelo cache e
+    devem ser tratadas como somente leitura.
+    """
+    
+    CAMPOS = ('id', 'nome', 'telefone', 'pacote', 'plano', 'vencimento',
+              'servidor', 'chat_id', 'data_criacao', 'ativo')
+    __slots__ = CAMPOS + ('_vencimento_obj',)
+    
+    _NAO_CALCULADO = object()
+    
+    def __init__(self, id, nome, telefone, pacote, plano, vencimento, servidor,
+                 chat_id=None, data_criacao=None, ativo=1):
+        self.id = id
+        self.nome = nome
+        self.telefone = telefone
+        self.pacote = pacote
+        self.plano = plano
+        self.vencimento = vencimento
+        self.servidor = servidor
+        self.chat_id = chat_id
+        self.data_criacao = data_criacao
+        self.ativo = ativo
+        self._vencimento_obj = Cliente._NAO_CALCULADO
+    
+    @classmethod
+    def fabrica(cls, colunas: List[str]):
+        """Retorna uma função que monta Clientes a partir das linhas do cursor"""
+        if tuple(colunas) == cls.CAMPOS:
+            return lambda linha: cls(*linha)
+        posicoes = [colunas.index(c) if c in colunas else None for c in cls.CAMPOS]
+        return lambda linha: cls(*(linha[i] if i is not None else None for i in posicoes))
+    
+    @property
+    def vencimento_obj(self) -> Optional[datetime]:
+        """Data de vencimento como datetime (None se inválida), calculada uma vez"""
+        if self._vencimento_obj is Cliente._NAO_CALCULADO:
+            try:
+                self._vencimento_obj = datetime.strptime(self.vencimento, '%Y-%m-%d')
+            except (ValueError, TypeError):
+                self._vencimento_obj = None
+        return self._vencimento_obj
+    
+    @property
+    def dias_restantes(self) -> Optional[int]:
+        """Dias de hoje (Brasília) até o vencimento; negativo se vencido"""
+        vencimento = self.vencimento_obj
+        if vencimento is None:
+            return None
+        return (vencimento.date() - agora_br().date()).days
+    
+    def __getitem__(self, campo: str):
+        """Compatibilidade com o acesso no estilo dict (cliente['nome'])"""
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo)
+    
+    def get(self, campo: str, padrao=None):
+        """Compatibilidade com dict.get"""
+        return getattr(self, campo, padrao)
+    
+    def para_dict(self) -> Dict:
+        """Retorna os campos da tabela em um dict"""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+    
+    def __repr__(self) -> str:
+        return f"Cliente(id={self.id!r}, nome={self.nome!r}, vencimento={self.vencimento!r})"
+
+
+class PoolConexoes:
+    """Pool de conexões SQLite reutilizáveis e seguro entre threads"""
+    
+    def __init__(self, db_path: str, tamanho: int = DB_POOL_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.tamanho = max(1, tamanho)
+        self.timeout = timeout
+        self._disponiveis = queue.LifoQueue(maxsize=self.tamanho)
+        self._criadas = 0
+        self._lock = threading.Lock()
+    
+    def _criar_conexao(self) -> sqlite3.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs configurados"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               timeout=self.timeout)
+        for pragma in pragmas_conexao():
+            conn.execute(pragma)
+        return conn
+    
+    @staticmethod
+    def _conexao_saudavel(conn: sqlite3.Connection) -> bool:
+        """Verifica se a conexão ainda responde"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _descartar(self, conn: sqlite3.Connection):
+        """Fecha uma conexão e libera sua vaga no pool"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._criadas -= 1
+    
+    def obter(self) -> sqlite3.Connection:
+        """Retira uma conexão do pool, criando uma nova se houver vaga"""
+        while True:
+            try:
+                conn = self._disponiveis.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._criadas < self.tamanho
+                    if pode_criar:
+                        self._criadas += 1
+                if pode_criar:
+                    try:
+                        return self._criar_conexao()
+                    except Exception:
+                        with self._lock:
+                            self._criadas -= 1
+                        raise
+                try:
+                    conn = self._disponiveis.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Pool de conexões esgotado após {self.timeout}s")
+            
+            if self._conexao_saudavel(conn):
+                return conn
+            logger.warning("Conexão do pool inválida descartada")
+            self._descartar(conn)
+    
+    def devolver(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool, desfazendo transações pendentes"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._disponiveis.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            self._descartar(conn)
+    
+    @contextmanager
+    def conexao(self):
+        """Context manager que empresta uma conexão do pool"""
+        conn = self.obter()
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+    
+    def fechar(self):
+        """Fecha todas as conexões ociosas do pool"""
+        while True:
+            try:
+                conn = self._disponiveis.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
+    
+    def estatisticas(self) -> Dict:
+        """Retorna o uso atual do pool"""
+        return {
+            'tamanho': self.tamanho,
+            'criadas': self._criadas,
+            'ociosas': self._disponiveis.qsize(),
+        }
+
+
+_pools: Dict[str, PoolConexoes] = {}
+_pools_lock = threading.Lock()
+
+
+def obter_pool(db_path: str = DB_PATH) -> PoolConexoes:
+    """Retorna o pool compartilhado do banco informado"""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = PoolConexoes(db_path)
+            _pools[db_path] = pool
+        return pool
+
+
+def fechar_pools():
+    """Fecha as conexões de todos os pools (usar no desligamento)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.fechar()
+
+
+class CacheClientes:
+    """Cache read-through dos clientes, indexado por id e por telefone.
+    
+    Guarda os registros ``Cliente`` já montados, com limite de tamanho e
+    despejo LRU. Quando todos os clientes cabem no
+    cache, a lista completa também é servida dele; escritas invalidam só os
+    ids afetados, que são relidos em lote na próxima listagem.
+    """
+    
+    def __init__(self, capacidade: int = CACHE_CLIENTES_TAMANHO):
+        self.capacidade = max(1, capacidade)
+        self._entradas: "OrderedDict[int, Cliente]" = OrderedDict()
+        self._telefones: Dict[str, int] = {}
+        self._ids_lista: Optional[set] = None  # None = lista completa não carregada
+        self._pendentes: set = set()
+        self._geracao = 0
+        self._lock = threading.Lock()
+        self._stats = {'acertos': 0, 'falhas': 0, 'despejos': 0, 'invalidacoes': 0}
+    
+    @property
+    def geracao(self) -> int:
+        """Contador de invalidações, usado para descartar leituras concorrentes"""
+        return self._geracao
+    
+    def _registrar(self, evento: str):
+        self._stats[evento] += 1
+    
+    def _guardar(self, cliente: Cliente):
+        cliente_id = cliente.id
+        self._entradas[cliente_id] = cliente
+        self._entradas.move_to_end(cliente_id)
+        self._telefones[cliente.telefone] = cliente_id
+        while len(self._entradas) > self.capacidade:
+            despejado_id, despejado = self._entradas.popitem(last=False)
+            if self._telefones.get(despejado.telefone) == despejado_id:
+                del self._telefones[despejado.telefone]
+            self._stats['despejos'] += 1
+            # Sem todos os registros em memória a lista completa volta ao banco
+            self._ids_lista = None
+            self._pendentes.clear()
+    
+    def guardar(self, clientes: List[Cliente], geracao: int):
+        """Insere registros lidos do banco, se nada foi invalidado desde a leitura"""
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            for cliente in clientes:
+                self._guardar(cliente)
+    
+    def obter(self, cliente_id: int) -> Optional[Cliente]:
+        """Retorna o cliente em cache (None se ausente)"""
+        with self._lock:
+            cliente = self._entradas.get(cliente_id)
+            if cliente is None:
+                self._registrar('falhas')
+                return None
+            self._entradas.move_to_end(cliente_id)
+            self._registrar('acertos')
+            return cliente
+    
+    def obter_por_telefone(self, telefone: str) -> Optional[Cliente]:
+        """Retorna o cliente com o telefone informado (None se ausente)"""
+        with self._lock:
+            cliente_id = self._telefones.get(telefone)
+            if cliente_id is None or cliente_id not in self._entradas:
+                self._registrar('falhas')
+                return None
+            self._entradas.move_to_end(cliente_id)
+            self._registrar('acertos')
+            return self._entradas[cliente_id]
+    
+    def lista(self) -> Tuple[Optional[List[Cliente]], set]:
+        """Retorna (clientes em cache, ids pendentes) ou (None, vazio) sem lista completa"""
+        with self._lock:
+            if self._ids_lista is None:
+                self._registrar('falhas')
+                return None, set()
+            self._registrar('acertos')
+            clientes = [self._entradas[i] for i in self._ids_lista
+                        if i not in self._pendentes and i in self._entradas]
+            return clientes, set(self._pendentes)
+    
+    def carregar_lista(self, clientes: List[Cliente], geracao: int) -> bool:
+        """Carrega a lista completa de clientes, se couber no cache"""
+        with self._lock:
+            if geracao != self._geracao or len(clientes) > self.capacidade:
+                return False
+            for cliente in clientes:
+                self._guardar(cliente)
+            self._ids_lista = {c.id for c in clientes}
+            self._pendentes.clear()
+            return True
+    
+    def resolver_pendentes(self, clientes: List[Cliente], ids: set, geracao: int):
+        """Atualiza os ids pendentes com os registros relidos do banco"""
+        with self._lock:
+            if geracao != self._geracao or self._ids_lista is None:
+                return
+            for cliente in clientes:
+                self._guardar(cliente)
+            if self._ids_lista is None:
+                return
+            encontrados = {c.id for c in clientes}
+            self._ids_lista -= ids - encontrados
+            self._pendentes -= ids
+    
+    def invalidar_id(self, cliente_id: int, novo: bool = False):
+        """Descarta um cliente; ``novo`` inclui o id na lista completa"""
+        with self._lock:
+            self._geracao += 1
+            self._registrar('invalidacoes')
+            cliente = self._entradas.pop(cliente_id, None)
+            if cliente and self._telefones.get(cliente.telefone) == cliente_id:
+                del self._telefones[cliente.telefone]
+            if self._ids_lista is not None and (novo or cliente_id in self._ids_lista):
+                self._ids_lista.add(cliente_id)
+                self._pendentes.add(cliente_id)
+    
+    def invalidar_telefone(self, telefone: str):
+        """Descarta todos os clientes em cache com o telefone informado"""
+        with self._lock:
+            ids = [i for i, c in self._entradas.items() if c.telefone == telefone]
+            self._telefones.pop(telefone, None)
+        for cliente_id in ids:
+            self.invalidar_id(cliente_id)
+        if not ids:
+            # Nada em cache com esse telefone; só descarta leituras em andamento
+            with self._lock:
+                self._geracao += 1
+    
+    def limpar(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._geracao += 1
+            self._entradas.clear()
+            self._telefones.clear()
+            self._ids_lista = None
+            self._pendentes.clear()
+    
+    def estatisticas(self) -> Dict:
+        """Retorna acertos, falhas e ocupação do cache"""
+        with self._lock:
+            consultas = self._stats['acertos'] + self._stats['falhas']
+            return {
+                **self._stats,
+                'taxa_acerto': (self._stats['acertos'] / consultas * 100) if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'capacidade': self.capacidade,
+                'lista_completa': self._ids_lista is not None,
+            }
+
+
+_caches: Dict[str, CacheClientes] = {}
+
+
+def obter_cache(db_path: str = DB_PATH) -> CacheClientes:
+    """Retorna o cache de clientes compartilhado do banco informado"""
+    with _pools_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = CacheClientes()
+            _caches[db_path] = cache
+        return cache
+
+
+class AgendadorCheckpoint:
+    """Executa checkpoints periódicos do WAL em uma thread de fundo"""
+    
+    def __init__(self, pool: PoolConexoes, intervalo: int = DB_CHECKPOINT_INTERVALO,
+                 modo: str = "PASSIVE"):
+        self.pool = pool
+        self.intervalo = max(1, intervalo)
+        self.modo = modo
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'execucoes': 0,
+            'falhas': 0,
+            'paginas_checkpoint_total': 0,
+            'ultima_execucao': None,
+            'ultima_duracao_ms': 0.0,
+            'ultimo_resultado': None,
+            'ultimo_erro': None,
+        }
+        self._lock = threading.Lock()
+    
+    def executar(self) -> Optional[Dict]:
+        """Executa um checkpoint imediatamente e registra o resultado"""
+        inicio = time.perf_counter()
+        try:
+            with self.pool.conexao() as conn:
+                busy, paginas_log, paginas_checkpoint = conn.execute(
+                    f"PRAGMA wal_checkpoint({self.modo})").fetchone()
+            resultado = {
+                'bloqueado': bool(busy),
+                'paginas_log': paginas_log,
+                'paginas_checkpoint': paginas_checkpoint,
+            }
+            with self._lock:
+                self._stats['execucoes'] += 1
+                self._stats['paginas_checkpoint_total'] += max(0, paginas_checkpoint)
+                self._stats['ultimo_resultado'] = resultado
+            return resultado
+        except Exception as e:
+            logger.error(f"Erro no checkpoint do WAL: {e}")
+            with self._lock:
+                self._stats['falhas'] += 1
+                self._stats['ultimo_erro'] = str(e)
+            return None
+        finally:
+            with self._lock:
+                self._stats['ultima_execucao'] = agora_br().strftime('%d/%m/%Y %H:%M:%S')
+                self._stats['ultima_duracao_ms'] = (time.perf_counter() - inicio) * 1000
+    
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.executar()
+    
+    def iniciar(self):
+        """Inicia a thread de checkpoint (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="checkpoint-wal",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"Checkpoint do WAL agendado a cada {self.intervalo}s")
+    
+    def parar(self):
+        """Interrompe a thread e faz um último checkpoint"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.executar()
+    
+    def estatisticas(self) -> Dict:
+        """Retorna as estatísticas acumuladas de checkpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+        caminho_wal = f"{self.pool.db_path}-wal"
+        stats['tamanho_wal_bytes'] = (os.path.getsize(caminho_wal)
+                                      if os.path.exists(caminho_wal) else 0)
+        stats['intervalo'] = self.intervalo
+        stats['ativo'] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+
+_agendador_checkpoint: Optional[AgendadorCheckpoint] = None
+
+
+def iniciar_checkpoint_wal() -> bool:
+    """Inicia o checkpoint periódico quando o perfil WAL está ativo"""
+    global _agendador_checkpoint
+    if not perfil_wal_ativo():
+        return False
+    if _agendador_checkpoint is None:
+        _agendador_checkpoint = AgendadorCheckpoint(obter_pool(DB_PATH))
+    _agendador_checkpoint.iniciar()
+    return True
+
+
+def parar_checkpoint_wal():
+    """Interrompe o checkpoint periódico, se estiver rodando"""
+    if _agendador_checkpoint is not None:
+        _agendador_checkpoint.parar()
+
+
+def estatisticas_checkpoint_wal() -> Optional[Dict]:
+    """Estatísticas do checkpoint do WAL (None se desativado)"""
+    if _agendador_checkpoint is None:
+        return None
+    return _agendador_checkpoint.estatisticas()
+
+
+class AgendadorVirada:
+    """Faz a virada diária do snapshot de status à meia-noite de Brasília"""
+    
+    def __init__(self):
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def segundos_ate_meia_noite() -> float:
+        """Segundos até a próxima meia-noite no fuso de Brasília"""
+        agora = agora_br()
+        amanha = TIMEZONE_BR.localize(
+            datetime.combine(agora.date() + timedelta(days=1), datetime.min.time()))
+        return max(1.0, (amanha - agora).total_seconds())
+    
+    def _loop(self):
+        # Margem de 1s para que data_br() já aponte para o novo dia
+        while not self._parar.wait(self.segundos_ate_meia_noite() + 1):
+            try:
+                DatabaseManager().virar_snapshot_status()
+            except Exception as e:
+                logger.error(f"Erro na virada do snapshot de status: {e}")
+    
+    def iniciar(self):
+        """Inicia a thread da virada diária (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="virada-snapshot",
+                                        daemon=True)
+        self._thread.start()
+    
+    def parar(self):
+        """Interrompe a thread da virada diária"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_agendador_virada: Optional[AgendadorVirada] = None
+
+
+def iniciar_virada_snapshot():
+    """Agenda a virada diária do snapshot de status"""
+    global _agendador_virada
+    if _agendador_virada is None:
+        _agendador_virada = AgendadorVirada()
+    _agendador_virada.iniciar()
+
+
+def parar_virada_snapshot():
+    """Interrompe a virada diária do snapshot, se estiver agendada"""
+    if _agendador_virada is not None:
+        _agendador_virada.parar()
+
+
+def criar_tabela():
+    """Cria as tabelas necessárias no banco de dados"""
+    pool = obter_pool(DB_PATH)
+    conn = pool.obter()
+    cursor = conn.cursor()
+    
+    try:
+        # Tabela de clientes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS clientes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT NOT NULL,
+                telefone TEXT UNIQUE NOT NULL,
+                pacote TEXT NOT NULL,
+                plano REAL NOT NULL,
+                vencimento TEXT NOT NULL,
+                servidor TEXT NOT NULL,
+                chat_id INTEGER,
+                data_criacao TEXT DEFAULT CURRENT_TIMESTAMP,
+                ativo BOOLEAN DEFAULT 1
+            )
+        ''')
+        
+        # Tabela de renovações
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS renovacoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telefone TEXT NOT NULL,
+                data_renovacao TEXT NOT NULL,
+                novo_vencimento TEXT NOT NULL,
+                pacote_anterior TEXT,
+                pacote_novo TEXT,
+                plano_anterior REAL,
+                plano_novo REAL,
+                observacoes TEXT
+            )
+        ''')
+        
+        # Tabela de configurações do admin
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS configuracoes (
+                id INTEGER PRIMARY KEY,
+                pix_key TEXT,
+                empresa_nome TEXT,
+                contato_suporte TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Tabela de log de mensagens enviadas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mensagens_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telefone TEXT NOT NULL,
+                nome_cliente TEXT,
+                tipo_mensagem TEXT NOT NULL,
+                conteudo_mensagem TEXT,
+                data_envio TEXT NOT NULL,
+                status TEXT NOT NULL,
+                erro_detalhes TEXT,
+                tentativas INTEGER DEFAULT 1,
+                whatsapp_id TEXT,
+                entrega TEXT,
+                entrega_em TEXT
+            )
+        ''')
+        # Bancos criados antes do registro de retentativas e dos recibos de entrega
+        colunas_log = {linha[1] for linha in cursor.execute("PRAGMA table_info(mensagens_log)")}
+        for coluna, tipo in (('tentativas', 'INTEGER DEFAULT 1'), ('whatsapp_id', 'TEXT'),
+                             ('entrega', 'TEXT'), ('entrega_em', 'TEXT')):
+            if coluna not in colunas_log:
+                cursor.execute(f"ALTER TABLE mensagens_log ADD COLUMN {coluna} {tipo}")
+        
+        # Tabela de templates personalizáveis
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS templates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT UNIQUE NOT NULL,
+                titulo TEXT NOT NULL,
+                conteudo TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                ativo BOOLEAN DEFAULT 1,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Fila persistente de mensagens WhatsApp
+        cursor.execute(SQL_FILA_TABELA)
+        
+        # Cache da verificação de números no WhatsApp
+        cursor.execute(SQL_CONTATOS_TABELA)
+        
+        for indice in INDICES:
+            cursor.execute(indice)
+        
+        # Snapshot do resumo de status, mantido pelos triggers
+        cursor.execute(SQL_SNAPSHOT_TABELA)
+        for trigger in TRIGGERS_SNAPSHOT:
+            cursor.execute(trigger)
+        
+        conn.commit()
+        logger.info("Tabelas criadas com sucesso")
+        
+    except Exception as e:
+        logger.error(f"Erro ao criar tabelas: {e}")
+        conn.rollback()
+    finally:
+        pool.devolver(conn)
+
+class DatabaseManager:
+    """Classe para gerenciar operações do banco de dados"""
+    
+    def __init__(self):
+        self.db_path = DB_PATH
+        self.pool = obter_pool(self.db_path)
+        self.cache = obter_cache(self.db_path)
+    
+    def get_connection(self):
+        """Retorna uma conexão avulsa, fora do pool (o chamador deve fechá-la)"""
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+    
+    def verificar_planos_consulta(self) -> Dict[str, List[str]]:
+        """Roda EXPLAIN QUERY PLAN nas consultas indexadas e alerta sobre SCANs"""
+        planos = {}
+        for nome, (query, params) in CONSULTAS_INDEXADAS.items():
+            linhas = self.executar_query(f"EXPLAIN QUERY PLAN {query}", params)
+            planos[nome] = [linha['detail'] for linha in linhas]
+            alertar_planos(nome, planos[nome])
+        return planos
+    
+    def estatisticas_cache(self) -> Dict:
+        """Retorna acertos/falhas do cache de clientes"""
+        return self.cache.estatisticas()
+    
+    def estatisticas_checkpoint(self) -> Optional[Dict]:
+        """Retorna as estatísticas do checkpoint do WAL (None se desativado)"""
+        return estatisticas_checkpoint_wal()
+    
+    def executar_query(self, query: str, params: tuple = ()) -> List[Dict]:
+        """Executa uma query e retorna os resultados"""
+        try:
+            with self.pool.conexao() as conn:
+                cursor = conn.execute(query, params)
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao executar query: {e}")
+            return []
+    
+    def consultar_clientes(self, query: str, params: tuple = ()) -> List[Cliente]:
+        """Executa uma consulta na tabela clientes e retorna registros Cliente"""
+        try:
+            with self.pool.conexao() as conn:
+                cursor = conn.execute(query, params)
+                montar = Cliente.fabrica([description[0] for description in cursor.description])
+                return [montar(linha) for linha in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao executar query: {e}")
+            return []
+    
+    def executar_comando(self, query: str, params: tuple = ()) -> bool:
+        """Executa um comando (INSERT, UPDATE, DELETE)"""
+        return self._executar_escrita(query, params) is not None
+    
+    def _executar_escrita(self, query: str, params: tuple = (),
+                          varios: bool = False) -> Optional[sqlite3.Cursor]:
+        """Executa e confirma um comando (``varios``: executemany); None em erro"""
+        try:
+            with self.pool.conexao() as conn:
+                try:
+                    if varios:
+                        cursor = conn.executemany(query, params)
+                    else:
+                        cursor = conn.execute(query, params)
+                    conn.commit()
+                    return cursor
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao executar comando: {e}")
+            return None
+    
+    # Métodos para clientes
+    def adicionar_cliente(self, nome: str, telefone: str, pacote: str, 
+                         plano: float, vencimento: str, servidor: str, 
+                         chat_id: Optional[int] = None) -> bool:
+        """Adiciona um novo cliente"""
+        cursor = self._executar_escrita(SQL_CLIENTE_INSERIR, (nome, telefone, pacote, plano,
+                                                              vencimento, servidor, chat_id))
+        if cursor is None:
+            return False
+        self.cache.invalidar_id(cursor.lastrowid, novo=True)
+        return True
+    
+    def listar_clientes(self, ativo_apenas: bool = True) -> List[Cliente]:
+        """Lista todos os clientes (servido pelo cache quando possível)"""
+        geracao = self.cache.geracao
+        clientes, pendentes = self.cache.lista()
+        
+        if clientes is None:
+            clientes = self.consultar_clientes(SQL_CLIENTES_TODOS)
+            self.cache.carregar_lista(clientes, geracao)
+        
+        if pendentes:
+            relidos = list(self._ler_clientes_por_ids(pendentes).values())
+            self.cache.resolver_pendentes(relidos, pendentes, geracao)
+            clientes.extend(relidos)
+        
+        if ativo_apenas:
+            clientes = [c for c in clientes if c.ativo]
+        clientes.sort(key=lambda c: c.nome)
+        return clientes
+    
+    def buscar_cliente_por_telefone(self, telefone: str) -> Optional[Cliente]:
+        """Busca um cliente pelo telefone"""
+        cliente = self.cache.obter_por_telefone(telefone)
+        if cliente is not None:
+            return cliente
+        geracao = self.cache.geracao
+        results = self.consultar_clientes(SQL_CLIENTE_POR_TELEFONE, (telefone,))
+        if not results:
+            return None
+        self.cache.guardar(results[:1], geracao)
+        return results[0]
+    
+    def pagina_clientes(self, cursor: Optional[Tuple[str, int]] = None,
+                        anterior: bool = False,
+                        limite: int = CLIENTES_POR_PAGINA) -> Tuple[List[Cliente], bool]:
+        """Retorna uma página de clientes ativos ordenada por (vencimento, id).
+        
+        ``cursor`` é o par (vencimento, id) da borda da página atual: sem cursor
+        retorna a primeira página; com ``anterior`` retorna os registros antes
+        dele. O segundo valor indica se há mais registros naquela direção.
+        """
+        clientes = self.consultar_clientes(*consulta_pagina(cursor, anterior, limite))
+        return recortar_pagina(clientes, limite, anterior)
+    
+    def resumo_status(self, dias_breve: int = 3) -> Dict:
+        """Totais dos clientes ativos por situação de vencimento e receita.
+        
+        Retorna ``total``, ``receita``, a contagem de cada faixa (``vencidos``,
+        ``vencendo_hoje``, ``vencendo_breve`` = 1 a ``dias_breve`` dias,
+        ``em_dia``), ``vencendo_3_dias`` (hoje + breve) e ``ativos`` (não vencidos).
+        """
+        linhas = self.executar_query(SQL_RESUMO_STATUS, (data_br(), data_br(dias_breve)))
+        return completar_resumo(resumo_por_faixa(
+            (linha['faixa'], linha['total'], linha['receita']) for linha in linhas))
+    
+    def _reconstruir_snapshot(self, conn: sqlite3.Connection, hoje: str):
+        """Recalcula o snapshot inteiro a partir da tabela clientes"""
+        resumo = resumo_por_faixa(conn.execute(SQL_RESUMO_STATUS, (hoje, data_br(3))))
+        conn.execute(SQL_SNAPSHOT_GRAVAR, params_snapshot_gravar(hoje, resumo))
+    
+    def virar_snapshot_status(self) -> bool:
+        """Alinha o snapshot de status com a data de hoje (Brasília).
+        
+        Com um dia de diferença as faixas são deslocadas usando duas contagens
+        pontuais no índice; sem snapshot, ou após mais de um dia parado, ele é
+        reconstruído. Retorna True se houve alteração.
+        """
+        hoje = data_br()
+        try:
+            with self.pool.conexao() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    linha = conn.execute(SQL_SNAPSHOT_DATA).fetchone()
+                    if linha and linha[0] == hoje:
+                        conn.rollback()
+                        return False
+                    
+                    if linha and linha[0] == data_br(-1):
+                        novos_hoje = conn.execute(SQL_CONTAR_VENCIMENTO, (hoje,)).fetchone()[0]
+                        novos_breve = conn.execute(SQL_CONTAR_VENCIMENTO, (data_br(3),)).fetchone()[0]
+                        conn.execute(SQL_SNAPSHOT_VIRAR_DIA,
+                                     params_virar_dia(hoje, novos_hoje, novos_breve))
+                    else:
+                        self._reconstruir_snapshot(conn, hoje)
+                    conn.commit()
+                    logger.info(f"Snapshot de status alinhado para {hoje}")
+                    return True
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro na virada do snapshot de status: {e}")
+            return False
+    
+    def snapshot_status(self) -> Dict:
+        """Resumo de status lido do snapshot materializado (uma linha).
+        
+        Mesmas chaves de ``resumo_status``; faz a virada do dia antes, se
+        necessário, e recorre ao cálculo completo se o snapshot falhar.
+        """
+        linhas = self.executar_query(SQL_SNAPSHOT_LER)
+        if not linhas or linhas[0]['data_referencia'] != data_br():
+            self.virar_snapshot_status()
+            linhas = self.executar_query(SQL_SNAPSHOT_LER)
+        if not linhas:
+            return self.resumo_status()
+        return completar_resumo(linhas[0])
+    
+    def buscar_cliente_por_id(self, cliente_id: int, ativo_apenas: bool = False) -> Optional[Cliente]:
+        """Busca um cliente pelo ID (cache ou lookup direto pela chave primária)"""
+        cliente = self.cache.obter(cliente_id)
+        if cliente is None:
+            geracao = self.cache.geracao
+            results = self.consultar_clientes(SQL_CLIENTE_POR_ID, (cliente_id,))
+            if not results:
+                return None
+            self.cache.guardar(results, geracao)
+            cliente = results[0]
+        if ativo_apenas and not cliente.ativo:
+            return None
+        return cliente
+    
+    def buscar_clientes_por_ids(self, cliente_ids: List[int]) -> Dict[int, Cliente]:
+        """Busca vários clientes pelo ID em lote, retornando {id: cliente}"""
+        clientes = {}
+        faltantes = []
+        for cliente_id in dict.fromkeys(cliente_ids):
+            cliente = self.cache.obter(cliente_id)
+            if cliente is None:
+                faltantes.append(cliente_id)
+            else:
+                clientes[cliente_id] = cliente
+        if faltantes:
+            geracao = self.cache.geracao
+            lidos = self._ler_clientes_por_ids(faltantes)
+            self.cache.guardar(list(lidos.values()), geracao)
+            clientes.update(lidos)
+        return clientes
+    
+    def _ler_clientes_por_ids(self, cliente_ids) -> Dict[int, Cliente]:
+        """Lê clientes direto do banco, em lotes, retornando {id: cliente}"""
+        clientes = {}
+        for lote in em_partes(list(cliente_ids)):
+            query = SQL_CLIENTES_POR_IDS.format(marcadores=marcadores(len(lote)))
+            for cliente in self.consultar_clientes(query, tuple(lote)):
+                clientes[cliente.id] = cliente
+        return clientes
+    
+    def atualizar_cliente(self, cliente_id: int, campo: str, valor) -> bool:
+        """Atualiza um campo específico de um cliente pelo ID"""
+        coluna = coluna_cliente(campo)
+        if coluna is None:
+            return False
+        resultado = self.executar_comando(SQL_CLIENTE_ATUALIZAR_CAMPO.format(coluna=coluna),
+                                          (valor, cliente_id))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    def atualizar_cliente_completo(self, cliente_id: int, nome: str, telefone: str, 
+                         pacote: str, plano: float, servidor: str, vencimento: str) -> bool:
+        """Atualiza todos os dados de um cliente pelo ID"""
+        resultado = self.executar_comando(SQL_CLIENTE_ATUALIZAR_COMPLETO, (
+            nome, telefone, pacote, plano, servidor, vencimento, cliente_id))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    def atualizar_campo_cliente(self, telefone: str, campo: str, valor) -> bool:
+        """Atualiza um campo específico do cliente"""
+        resultado = self.executar_comando(
+            SQL_CLIENTE_ATUALIZAR_CAMPO_TELEFONE.format(coluna=campo), (valor, telefone))
+        self.cache.invalidar_telefone(telefone)
+        return resultado
+    
+    def excluir_cliente(self, cliente_id: int) -> bool:
+        """Remove um cliente permanentemente pelo ID"""
+        resultado = self.executar_comando(SQL_CLIENTE_EXCLUIR, (cliente_id,))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    def deletar_cliente(self, telefone: str) -> bool:
+        """Remove um cliente (marca como inativo)"""
+        resultado = self.executar_comando(SQL_CLIENTE_DESATIVAR, (telefone,))
+        self.cache.invalidar_telefone(telefone)
+        return resultado
+    
+    def clientes_vencendo(self, dias: int) -> List[Cliente]:
+        """Busca clientes que vencem em X dias"""
+        return self.consultar_clientes(SQL_CLIENTES_VENCENDO,
+                                       (data_br(dias), data_br(dias + 1)))
+    
+    def clientes_vencidos(self) -> List[Cliente]:
+        """Busca clientes com vencimento em atraso"""
+        return self.consultar_clientes(SQL_CLIENTES_VENCIDOS, (data_br(),))
+    
+    # Métodos para renovações
+    def registrar_renovacao(self, cliente_id: int, dias_adicionados: int, valor: float,
+                           observacoes: str = "") -> bool:
+        """Registra uma renovação por ID do cliente"""
+        # Buscar dados atuais do cliente (incluindo inativos)
+        cliente = self.buscar_cliente_por_id(cliente_id)
+        if not cliente:
+            return False
+        return self.executar_comando(SQL_RENOVACAO_INSERIR, params_renovacao(
+            cliente, dias_adicionados, valor, observacoes))
+    
+    def registrar_renovacao_telefone(self, telefone: str, novo_vencimento: str, 
+                           pacote_novo: str, plano_novo: float,
+                           observacoes: str = "") -> bool:
+        """Registra uma renovação (método legado)"""
+        # Buscar dados atuais do cliente
+        cliente = self.buscar_cliente_por_telefone(telefone)
+        if not cliente:
+            return False
+        return self.executar_comando(SQL_RENOVACAO_INSERIR, params_renovacao_telefone(
+            cliente, novo_vencimento, pacote_novo, plano_novo, observacoes))
+    
+    def historico_renovacoes(self, telefone: Optional[str] = None) -> List[Dict]:
+        """Retorna o histórico de renovações"""
+        if telefone:
+            return self.executar_query(SQL_HISTORICO_TELEFONE, (telefone,))
+        return self.executar_query(SQL_HISTORICO_TODOS)
+    
+    # Métodos para configurações
+    def get_configuracoes(self) -> Optional[Dict]:
+        """Busca as configurações do admin"""
+        results = self.executar_query(SQL_CONFIGURACOES)
+        return results[0] if results else None
+    
+    def salvar_configuracoes(self, pix_key: str, empresa_nome: str, contato_suporte: str) -> bool:
+        """Salva as configurações do admin"""
+        return self.executar_comando(SQL_CONFIGURACOES_SALVAR,
+                                     (pix_key, empresa_nome, contato_suporte, momento_br()))
+    
+    # Métodos para log de mensagens
+    def log_mensagem(self, telefone: str, nome_cliente: str, tipo_mensagem: str,
+                    conteudo: str, status: str, erro_detalhes: str = "",
+                    tentativas: int = 1, whatsapp_id: Optional[str] = None) -> bool:
+        """Registra o envio de uma mensagem (tentativas = chamadas HTTP feitas;
+        whatsapp_id = id devolvido pela Evolution API, usado pelos recibos)"""
+        return self.executar_comando(SQL_LOG_INSERIR, params_log_mensagem(
+            telefone, nome_cliente, tipo_mensagem, conteudo, status,
+            erro_detalhes, tentativas, whatsapp_id))
+    
+    def registrar_entregas(self, entregas: List[Tuple[str, str, str]]) -> Optional[List[str]]:
+        """Grava recibos (whatsapp_id, situacao, momento) em mensagens_log.
+        
+        Retorna os ids que ainda não estão no log (o recibo chegou antes do
+        registro do envio), ou None em erro.
+        """
+        if not entregas:
+            return []
+        ids = list({whatsapp_id for whatsapp_id, _, _ in entregas})
+        try:
+            with self.pool.conexao() as conn:
+                existentes = {linha[0] for linha in conn.execute(
+                    SQL_LOG_IDS_EXISTENTES.format(marcadores=marcadores(len(ids))), ids)}
+                conn.executemany(SQL_LOG_ENTREGA, params_entregas(entregas, existentes))
+                conn.commit()
+                return [whatsapp_id for whatsapp_id in ids if whatsapp_id not in existentes]
+        except Exception as e:
+            logger.error(f"Erro ao registrar recibos de entrega: {e}")
+            return None
+    
+    # Métodos da fila persistente de mensagens
+    def enfileirar_mensagem(self, telefone: str, conteudo: str, tipo_mensagem: str,
+                            nome_cliente: str = "", prioridade: int = 0,
+                            max_tentativas: int = FILA_MAX_TENTATIVAS) -> Optional[int]:
+        """Coloca uma mensagem na fila de envio e retorna o ID (None em erro)"""
+        cursor = self._executar_escrita(SQL_FILA_INSERIR, params_enfileirar(
+            telefone, conteudo, tipo_mensagem, nome_cliente, prioridade, max_tentativas))
+        return cursor.lastrowid if cursor is not None else None
+    
+    def reservar_mensagens(self, limite: int, lease_segundos: int, dono: str) -> List[Dict]:
+        """Reserva até ``limite`` mensagens vencidas para ``dono``.
+        
+        A seleção e a marcação acontecem na mesma transação (BEGIN IMMEDIATE),
+        então dois despachantes nunca recebem a mesma mensagem. Reservas
+        vencidas de um despachante que caiu são retomadas aqui; as que já
+        esgotaram as tentativas são encerradas como 'erro'.
+        """
+        agora = momento_br()
+        try:
+            with self.pool.conexao() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(SQL_FILA_EXPIRAR_ESGOTADAS, (agora,))
+                    ids = [linha[0] for linha in
+                           conn.execute(SQL_FILA_DISPONIVEIS, (agora, limite))]
+                    if not ids:
+                        conn.commit()
+                        return []
+                    lista = marcadores(len(ids))
+                    conn.execute(SQL_FILA_RESERVAR.format(marcadores=lista),
+                                 (dono, momento_br(lease_segundos), *ids))
+                    cursor = conn.execute(SQL_FILA_RESERVADAS.format(marcadores=lista), ids)
+                    colunas = [description[0] for description in cursor.description]
+                    reservadas = [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+                    conn.commit()
+                    return reservadas
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao reservar mensagens da fila: {e}")
+            return []
+    
+    def concluir_mensagem(self, mensagem_id: int, dono: str, sucesso: bool,
+                          erro: str = "", definitivo: bool = False) -> Optional[str]:
+        """Registra o resultado de uma mensagem reservada por ``dono``.
+        
+        Sucesso marca 'enviado'; falha reagenda como 'pendente' ou, sem
+        tentativas restantes (ou com ``definitivo``), encerra como 'erro'.
+        Retorna o novo status, ou None se a reserva já não pertence a ``dono``
+        (venceu e foi retomada).
+        """
+        query, params = comando_concluir(mensagem_id, dono, sucesso, erro, definitivo)
+        try:
+            with self.pool.conexao() as conn:
+                try:
+                    if conn.execute(query, params).rowcount == 0:
+                        conn.rollback()
+                        return None
+                    status = conn.execute(SQL_FILA_STATUS, (mensagem_id,)).fetchone()[0]
+                    conn.commit()
+                    return status
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao concluir mensagem {mensagem_id} da fila: {e}")
+            return None
+    
+    def resumo_fila(self, limite_proximas: int = 5) -> Dict:
+        """Contagem por status e próximas mensagens pendentes da fila"""
+        return montar_resumo_fila(
+            self.executar_query(SQL_FILA_POR_STATUS),
+            self.executar_query(SQL_FILA_PROXIMAS, (limite_proximas,)),
+            self.executar_query(SQL_FILA_ENVIADAS_HOJE, (data_br(),)))
+    
+    # Verificação de números no WhatsApp
+    def contatos_verificados(self, numeros: List[str],
+                             validade_horas: int = EVOLUTION_CONTATO_VALIDADE_HORAS) -> Dict[str, bool]:
+        """Resultados ainda válidos de ``numeros`` (formatados): {numero: existe}"""
+        limite = limite_validade_contatos(validade_horas)
+        verificados = {}
+        try:
+            with self.pool.conexao() as conn:
+                for parte in em_partes(list(dict.fromkeys(numeros))):
+                    query = SQL_CONTATOS_VERIFICADOS.format(marcadores=marcadores(len(parte)))
+                    for numero, existe in conn.execute(query, (*parte, limite)):
+                        verificados[numero] = bool(existe)
+        except Exception as e:
+            logger.error(f"Erro ao ler contatos verificados: {e}")
+        return verificados
+    
+    def salvar_contatos(self, resultados: List[Tuple[str, bool, Optional[str]]]) -> bool:
+        """Grava (numero, existe, jid) com a data da verificação"""
+        if not resultados:
+            return True
+        return self._executar_escrita(SQL_CONTATOS_SALVAR, params_contatos(resultados),
+                                      varios=True) is not None
+    
+    def resumo_contatos(self, validade_horas: int = EVOLUTION_CONTATO_VALIDADE_HORAS) -> Dict:
+        """Quantos números válidos estão guardados, com e sem WhatsApp"""
+        return montar_resumo_contatos(self.executar_query(
+            SQL_CONTATOS_RESUMO, (limite_validade_contatos(validade_horas),)))
+    
+    def estatisticas_mensagens(self) -> Dict:
+        """Retorna estatísticas de mensagens enviadas"""
+        return montar_estatisticas_mensagens(
+            self.executar_query(SQL_LOG_TOTAL),
+            self.executar_query(SQL_LOG_POR_STATUS),
+            self.executar_query(SQL_LOG_POR_TIPO))
+    
+    def envios_por_dia(self, dias: int = 7) -> List[Dict]:
+        """Contagem de mensagens por dia e status nos últimos X dias"""
+        return self.executar_query(SQL_ENVIOS_POR_DIA, (data_br(-dias),))
+    
+    def envios_por_status(self, dias: int = 30) -> List[Dict]:
+        """Contagem de mensagens por status nos últimos X dias"""
+        return self.executar_query(SQL_ENVIOS_POR_STATUS, (data_br(-dias),))
+    
+    def entregas_por_situacao(self, dias: int = 30) -> List[Dict]:
+        """Mensagens enviadas por situação de entrega nos últimos X dias"""
+        return self.executar_query(SQL_ENTREGAS_POR_SITUACAO, (data_br(-dias),))
+    
+    # Métodos para templates
+    def salvar_template(self, nome: str, titulo: str, conteudo: str, tipo: str) -> bool:
+        """Salva um template personalizado"""
+        return self.executar_comando(SQL_TEMPLATE_SALVAR, (nome, titulo, conteudo, tipo))
+    
+    def buscar_template(self, nome: str) -> Optional[Dict]:
+        """Busca um template pelo nome"""
+        results = self.executar_query(SQL_TEMPLATE_BUSCAR, (nome,))
+        return results[0] if results else None
+    
+    def listar_templates(self) -> List[Dict]:
+        """Lista todos os templates ativos"""
+        return self.executar_query(SQL_TEMPLATES_LISTAR)
@@ -1,33 +1,644 @@
-# database/db.py
+"""
+Acesso assíncrono ao banco (aiosqlite) para uso dentro do event loop do bot.
+
+Mesma interface do DatabaseManager síncrono, com os métodos como corrotinas:
+as consultas rodam na thread de cada conexão aiosqlite e o loop fica livre
+para atender outras atualizações enquanto o disco trabalha. O cache de
+clientes é o mesmo do gerenciador síncrono, então escritas feitas por um lado
+invalidam o que o outro tem em memória.
+"""
+
+import asyncio
+import logging
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import List, Dict, Optional, Tuple
 
 import aiosqlite
 
-DB_PATH = "clientes.db"
+from config import (DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, CLIENTES_POR_PAGINA,
+                    FILA_MAX_TENTATIVAS, EVOLUTION_CONTATO_VALIDADE_HORAS)
+from database import (Cliente, criar_tabela, obter_cache, estatisticas_checkpoint_wal,
+                      pragmas_conexao, momento_br, data_br, CONSULTAS_INDEXADAS,
+                      SQL_CLIENTES_TODOS, SQL_CLIENTE_POR_ID, SQL_CLIENTE_POR_TELEFONE,
+                      SQL_CLIENTES_POR_IDS, SQL_CLIENTE_INSERIR, SQL_CLIENTE_ATUALIZAR_CAMPO,
+                      SQL_CLIENTE_ATUALIZAR_CAMPO_TELEFONE, SQL_CLIENTE_ATUALIZAR_COMPLETO,
+                      SQL_CLIENTE_EXCLUIR, SQL_CLIENTE_DESATIVAR,
+                      SQL_CLIENTES_VENCENDO, SQL_CLIENTES_VENCIDOS,
+                      SQL_RESUMO_STATUS, SQL_CONTAR_VENCIMENTO, SQL_SNAPSHOT_LER,
+                      SQL_SNAPSHOT_DATA, SQL_SNAPSHOT_GRAVAR, SQL_SNAPSHOT_VIRAR_DIA,
+                      SQL_RENOVACAO_INSERIR, SQL_HISTORICO_TODOS, SQL_HISTORICO_TELEFONE,
+                      SQL_CONFIGURACOES, SQL_CONFIGURACOES_SALVAR,
+                      SQL_LOG_INSERIR, SQL_LOG_TOTAL, SQL_LOG_POR_STATUS, SQL_LOG_POR_TIPO,
+                      SQL_LOG_ENTREGA, SQL_LOG_IDS_EXISTENTES,
+                      SQL_ENVIOS_POR_DIA, SQL_ENVIOS_POR_STATUS, SQL_ENTREGAS_POR_SITUACAO,
+                      SQL_FILA_INSERIR, SQL_FILA_DISPONIVEIS, SQL_FILA_EXPIRAR_ESGOTADAS,
+                      SQL_FILA_RESERVAR, SQL_FILA_RESERVADAS, SQL_FILA_STATUS,
+                      SQL_FILA_POR_STATUS, SQL_FILA_PROXIMAS, SQL_FILA_ENVIADAS_HOJE,
+                      SQL_CONTATOS_VERIFICADOS, SQL_CONTATOS_SALVAR, SQL_CONTATOS_RESUMO,
+                      SQL_TEMPLATE_SALVAR, SQL_TEMPLATE_BUSCAR, SQL_TEMPLATES_LISTAR,
+                      em_partes, marcadores, alertar_planos, consulta_pagina,
+                      recortar_pagina, resumo_por_faixa, completar_resumo,
+                      params_snapshot_gravar, params_virar_dia, coluna_cliente,
+                      params_renovacao, params_renovacao_telefone, params_log_mensagem,
+                      params_entregas, params_enfileirar, comando_concluir,
+                      montar_resumo_fila, limite_validade_contatos, params_contatos,
+                      montar_resumo_contatos, montar_estatisticas_mensagens)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolConexoesAsync:
+    """Pool de conexões aiosqlite reutilizáveis, para um único event loop"""
+    
+    def __init__(self, db_path: str, tamanho: int = DB_POOL_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.tamanho = max(1, tamanho)
+        self.timeout = timeout
+        self._disponiveis: asyncio.LifoQueue = asyncio.LifoQueue(maxsize=self.tamanho)
+        self._criadas = 0
+    
+    async def _criar_conexao(self) -> aiosqlite.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs configurados"""
+        conn = await aiosqlite.connect(self.db_path, timeout=self.timeout)
+        try:
+            for pragma in pragmas_conexao():
+                await conn.execute(pragma)
+        except BaseException:
+            # Erro ou cancelamento no meio dos PRAGMAs: não deixar a conexão aberta
+            await asyncio.shield(conn.close())
+            raise
+        return conn
+    
+    @staticmethod
+    async def _conexao_saudavel(conn: aiosqlite.Connection) -> bool:
+        """Verifica se a conexão ainda responde"""
+        try:
+            async with conn.execute("SELECT 1") as cursor:
+                await cursor.fetchone()
+            return True
+        except (sqlite3.Error, ValueError):
+            return False
+    
+    async def _descartar(self, conn: aiosqlite.Connection):
+        """Fecha uma conexão e libera sua vaga no pool"""
+        self._criadas -= 1
+        try:
+            await conn.close()
+        except (sqlite3.Error, ValueError):
+            pass
+    
+    async def obter(self) -> aiosqlite.Connection:
+        """Retira uma conexão do pool, criando uma nova se houver vaga"""
+        while True:
+            try:
+                conn = self._disponiveis.get_nowait()
+            except asyncio.QueueEmpty:
+                if self._criadas < self.tamanho:
+                    # Vaga reservada antes do await: o loop pode alternar aqui.
+                    # Liberada em qualquer saída sem conexão, inclusive cancelamento
+                    self._criadas += 1
+                    try:
+                        return await self._criar_conexao()
+                    except BaseException:
+                        self._criadas -= 1
+                        raise
+                try:
+                    conn = await asyncio.wait_for(self._disponiveis.get(), self.timeout)
+                except asyncio.TimeoutError:
+                    raise sqlite3.OperationalError(
+                        f"Pool de conexões esgotado após {self.timeout}s")
+            
+            if await self._conexao_saudavel(conn):
+                return conn
+            logger.warning("Conexão do pool inválida descartada")
+            await self._descartar(conn)
+    
+    async def devolver(self, conn: aiosqlite.Connection):
+        """Devolve a conexão ao pool, desfazendo transações pendentes"""
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._disponiveis.put_nowait(conn)
+        except (sqlite3.Error, ValueError, asyncio.QueueFull):
+            await self._descartar(conn)
+    
+    @asynccontextmanager
+    async def conexao(self):
+        """Context manager que empresta uma conexão do pool"""
+        conn = await self.obter()
+        try:
+            yield conn
+        finally:
+            # Mesmo cancelada, a tarefa precisa devolver a conexão
+            await asyncio.shield(self.devolver(conn))
+    
+    async def fechar(self):
+        """Fecha todas as conexões ociosas do pool"""
+        while True:
+            try:
+                conn = self._disponiveis.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            await self._descartar(conn)
+    
+    def estatisticas(self) -> Dict:
+        """Retorna o uso atual do pool"""
+        return {
+            'tamanho': self.tamanho,
+            'criadas': self._criadas,
+            'ociosas': self._disponiveis.qsize(),
+        }
+
+
+async def _linhas_dict(cursor: aiosqlite.Cursor) -> List[Dict]:
+    colunas = [description[0] for description in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in await cursor.fetchall()]
+
+
+class DatabaseManagerAsync:
+    """Versão assíncrona do DatabaseManager (mesmos métodos, com await).
+    
+    Os textos SQL e a montagem de parâmetros e resultados vêm de ``database``;
+    aqui fica só a execução pelo pool aiosqlite.
+    """
+    
+    def __init__(self, pool: Optional[PoolConexoesAsync] = None):
+        self.db_path = DB_PATH
+        self.pool = pool or PoolConexoesAsync(self.db_path)
+        self.cache = obter_cache(self.db_path)
+    
+    async def verificar_planos_consulta(self) -> Dict[str, List[str]]:
+        """Roda EXPLAIN QUERY PLAN nas consultas indexadas e alerta sobre SCANs"""
+        planos = {}
+        for nome, (query, params) in CONSULTAS_INDEXADAS.items():
+            linhas = await self.executar_query(f"EXPLAIN QUERY PLAN {query}", params)
+            planos[nome] = [linha['detail'] for linha in linhas]
+            alertar_planos(nome, planos[nome])
+        return planos
+    
+    def estatisticas_cache(self) -> Dict:
+        """Retorna acertos/falhas do cache de clientes"""
+        return self.cache.estatisticas()
+    
+    def estatisticas_checkpoint(self) -> Optional[Dict]:
+        """Retorna as estatísticas do checkpoint do WAL (None se desativado)"""
+        return estatisticas_checkpoint_wal()
+    
+    def estatisticas_pool(self) -> Dict:
+        """Uso do pool de conexões assíncronas"""
+        return self.pool.estatisticas()
+    
+    async def executar_query(self, query: str, params: tuple = ()) -> List[Dict]:
+        """Executa uma query e retorna os resultados"""
+        try:
+            async with self.pool.conexao() as conn:
+                async with conn.execute(query, params) as cursor:
+                    return await _linhas_dict(cursor)
+        except Exception as e:
+            logger.error(f"Erro ao executar query: {e}")
+            return []
+    
+    async def consultar_clientes(self, query: str, params: tuple = ()) -> List[Cliente]:
+        """Executa uma consulta na tabela clientes e retorna registros Cliente"""
+        try:
+            async with self.pool.conexao() as conn:
+                async with conn.execute(query, params) as cursor:
+                    montar = Cliente.fabrica([description[0] for description in cursor.description])
+                    return [montar(linha) for linha in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erro ao executar query: {e}")
+            return []
+    
+    async def executar_comando(self, query: str, params: tuple = ()) -> bool:
+        """Executa um comando (INSERT, UPDATE, DELETE)"""
+        return await self._executar_escrita(query, params) is not None
+    
+    async def _executar_escrita(self, query: str, params: tuple = (),
+                                varios: bool = False) -> Optional[aiosqlite.Cursor]:
+        """Executa e confirma um comando (``varios``: executemany); None em erro"""
+        try:
+            async with self.pool.conexao() as conn:
+                try:
+                    if varios:
+                        cursor = await conn.executemany(query, params)
+                    else:
+                        cursor = await conn.execute(query, params)
+                    await conn.commit()
+                    return cursor
+                except Exception:
+                    await conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao executar comando: {e}")
+            return None
+    
+    # Métodos para clientes
+    async def adicionar_cliente(self, nome: str, telefone: str, pacote: str,
+                                plano: float, vencimento: str, servidor: str,
+                                chat_id: Optional[int] = None) -> bool:
+        """Adiciona um novo cliente"""
+        cursor = await self._executar_escrita(SQL_CLIENTE_INSERIR, (nome, telefone, pacote, plano,
+                                                                    vencimento, servidor, chat_id))
+        if cursor is None:
+            return False
+        self.cache.invalidar_id(cursor.lastrowid, novo=True)
+        return True
+    
+    async def listar_clientes(self, ativo_apenas: bool = True) -> List[Cliente]:
+        """Lista todos os clientes (servido pelo cache quando possível)"""
+        geracao = self.cache.geracao
+        clientes, pendentes = self.cache.lista()
+        
+        if clientes is None:
+            clientes = await self.consultar_clientes(SQL_CLIENTES_TODOS)
+            self.cache.carregar_lista(clientes, geracao)
+        
+        if pendentes:
+            relidos = list((await self._ler_clientes_por_ids(pendentes)).values())
+            self.cache.resolver_pendentes(relidos, pendentes, geracao)
+            clientes.extend(relidos)
+        
+        if ativo_apenas:
+            clientes = [c for c in clientes if c.ativo]
+        clientes.sort(key=lambda c: c.nome)
+        return clientes
+    
+    async def buscar_cliente_por_telefone(self, telefone: str) -> Optional[Cliente]:
+        """Busca um cliente pelo telefone"""
+        cliente = self.cache.obter_por_telefone(telefone)
+        if cliente is not None:
+            return cliente
+        geracao = self.cache.geracao
+        results = await self.consultar_clientes(SQL_CLIENTE_POR_TELEFONE, (telefone,))
+        if not results:
+            return None
+        self.cache.guardar(results[:1], geracao)
+        return results[0]
+    
+    async def pagina_clientes(self, cursor: Optional[Tuple[str, int]] = None,
+                              anterior: bool = False,
+                              limite: int = CLIENTES_POR_PAGINA) -> Tuple[List[Cliente], bool]:
+        """Página de clientes ativos ordenada por (vencimento, id); ver DatabaseManager"""
+        clientes = await self.consultar_clientes(*consulta_pagina(cursor, anterior, limite))
+        return recortar_pagina(clientes, limite, anterior)
+    
+    async def resumo_status(self, dias_breve: int = 3) -> Dict:
+        """Totais dos clientes ativos por situação de vencimento e receita"""
+        linhas = await self.executar_query(SQL_RESUMO_STATUS, (data_br(), data_br(dias_breve)))
+        return completar_resumo(resumo_por_faixa(
+            (linha['faixa'], linha['total'], linha['receita']) for linha in linhas))
+    
+    async def _reconstruir_snapshot(self, conn: aiosqlite.Connection, hoje: str):
+        """Recalcula o snapshot inteiro a partir da tabela clientes"""
+        async with conn.execute(SQL_RESUMO_STATUS, (hoje, data_br(3))) as cursor:
+            resumo = resumo_por_faixa(await cursor.fetchall())
+        await conn.execute(SQL_SNAPSHOT_GRAVAR, params_snapshot_gravar(hoje, resumo))
+    
+    async def virar_snapshot_status(self) -> bool:
+        """Alinha o snapshot de status com a data de hoje (Brasília)"""
+        hoje = data_br()
+        try:
+            async with self.pool.conexao() as conn:
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    async with conn.execute(SQL_SNAPSHOT_DATA) as cursor:
+                        linha = await cursor.fetchone()
+                    if linha and linha[0] == hoje:
+                        await conn.rollback()
+                        return False
+                    
+                    if linha and linha[0] == data_br(-1):
+                        async with conn.execute(SQL_CONTAR_VENCIMENTO, (hoje,)) as cursor:
+                            novos_hoje = (await cursor.fetchone())[0]
+                        async with conn.execute(SQL_CONTAR_VENCIMENTO, (data_br(3),)) as cursor:
+                            novos_breve = (await cursor.fetchone())[0]
+                        await conn.execute(SQL_SNAPSHOT_VIRAR_DIA,
+                                           params_virar_dia(hoje, novos_hoje, novos_breve))
+                    else:
+                        await self._reconstruir_snapshot(conn, hoje)
+                    await conn.commit()
+                    logger.info(f"Snapshot de status alinhado para {hoje}")
+                    return True
+                except Exception:
+                    await conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro na virada do snapshot de status: {e}")
+            return False
+    
+    async def snapshot_status(self) -> Dict:
+        """Resumo de status lido do snapshot materializado (uma linha)"""
+        linhas = await self.executar_query(SQL_SNAPSHOT_LER)
+        if not linhas or linhas[0]['data_referencia'] != data_br():
+            await self.virar_snapshot_status()
+            linhas = await self.executar_query(SQL_SNAPSHOT_LER)
+        if not linhas:
+            return await self.resumo_status()
+        return completar_resumo(linhas[0])
+    
+    async def buscar_cliente_por_id(self, cliente_id: int,
+                                    ativo_apenas: bool = False) -> Optional[Cliente]:
+        """Busca um cliente pelo ID (cache ou lookup direto pela chave primária)"""
+        cliente = self.cache.obter(cliente_id)
+        if cliente is None:
+            geracao = self.cache.geracao
+            results = await self.consultar_clientes(SQL_CLIENTE_POR_ID, (cliente_id,))
+            if not results:
+                return None
+            self.cache.guardar(results, geracao)
+            cliente = results[0]
+        if ativo_apenas and not cliente.ativo:
+            return None
+        return cliente
+    
+    async def buscar_clientes_por_ids(self, cliente_ids: List[int]) -> Dict[int, Cliente]:
+        """Busca vários clientes pelo ID em lote, retornando {id: cliente}"""
+        clientes = {}
+        faltantes = []
+        for cliente_id in dict.fromkeys(cliente_ids):
+            cliente = self.cache.obter(cliente_id)
+            if cliente is None:
+                faltantes.append(cliente_id)
+            else:
+                clientes[cliente_id] = cliente
+        if faltantes:
+            geracao = self.cache.geracao
+            lidos = await self._ler_clientes_por_ids(faltantes)
+            self.cache.guardar(list(lidos.values()), geracao)
+            clientes.update(lidos)
+        return clientes
+    
+    async def _ler_clientes_por_ids(self, cliente_ids) -> Dict[int, Cliente]:
+        """Lê clientes direto do banco, em lotes, retornando {id: cliente}"""
+        clientes = {}
+        for lote in em_partes(list(cliente_ids)):
+            query = SQL_CLIENTES_POR_IDS.format(marcadores=marcadores(len(lote)))
+            for cliente in await self.consultar_clientes(query, tuple(lote)):
+                clientes[cliente.id] = cliente
+        return clientes
+    
+    async def atualizar_cliente(self, cliente_id: int, campo: str, valor) -> bool:
+        """Atualiza um campo específico de um cliente pelo ID"""
+        coluna = coluna_cliente(campo)
+        if coluna is None:
+            return False
+        resultado = await self.executar_comando(
+            SQL_CLIENTE_ATUALIZAR_CAMPO.format(coluna=coluna), (valor, cliente_id))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    async def atualizar_cliente_completo(self, cliente_id: int, nome: str, telefone: str,
+                                         pacote: str, plano: float, servidor: str,
+                                         vencimento: str) -> bool:
+        """Atualiza todos os dados de um cliente pelo ID"""
+        resultado = await self.executar_comando(SQL_CLIENTE_ATUALIZAR_COMPLETO, (
+            nome, telefone, pacote, plano, servidor, vencimento, cliente_id))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    async def atualizar_campo_cliente(self, telefone: str, campo: str, valor) -> bool:
+        """Atualiza um campo específico do cliente"""
+        resultado = await self.executar_comando(
+            SQL_CLIENTE_ATUALIZAR_CAMPO_TELEFONE.format(coluna=campo), (valor, telefone))
+        self.cache.invalidar_telefone(telefone)
+        return resultado
+    
+    async def excluir_cliente(self, cliente_id: int) -> bool:
+        """Remove um cliente permanentemente pelo ID"""
+        resultado = await self.executar_comando(SQL_CLIENTE_EXCLUIR, (cliente_id,))
+        self.cache.invalidar_id(cliente_id)
+        return resultado
+    
+    async def deletar_cliente(self, telefone: str) -> bool:
+        """Remove um cliente (marca como inativo)"""
+        resultado = await self.executar_comando(SQL_CLIENTE_DESATIVAR, (telefone,))
+        self.cache.invalidar_telefone(telefone)
+        return resultado
+    
+    async def clientes_vencendo(self, dias: int) -> List[Cliente]:
+        """Busca clientes que vencem em X dias"""
+        return await self.consultar_clientes(SQL_CLIENTES_VENCENDO,
+                                             (data_br(dias), data_br(dias + 1)))
+    
+    async def clientes_vencidos(self) -> List[Cliente]:
+        """Busca clientes com vencimento em atraso"""
+        return await self.consultar_clientes(SQL_CLIENTES_VENCIDOS, (data_br(),))
+    
+    # Métodos para renovações
+    async def registrar_renovacao(self, cliente_id: int, dias_adicionados: int, valor: float,
+                                  observacoes: str = "") -> bool:
+        """Registra uma renovação por ID do cliente"""
+        cliente = await self.buscar_cliente_por_id(cliente_id)
+        if not cliente:
+            return False
+        return await self.executar_comando(SQL_RENOVACAO_INSERIR, params_renovacao(
+            cliente, dias_adicionados, valor, observacoes))
+    
+    async def registrar_renovacao_telefone(self, telefone: str, novo_vencimento: str,
+                                           pacote_novo: str, plano_novo: float,
+                                           observacoes: str = "") -> bool:
+        """Registra uma renovação (método legado)"""
+        cliente = await self.buscar_cliente_por_telefone(telefone)
+        if not cliente:
+            return False
+        return await self.executar_comando(SQL_RENOVACAO_INSERIR, params_renovacao_telefone(
+            cliente, novo_vencimento, pacote_novo, plano_novo, observacoes))
+    
+    async def historico_renovacoes(self, telefone: Optional[str] = None) -> List[Dict]:
+        """Retorna o histórico de renovações"""
+        if telefone:
+            return await self.executar_query(SQL_HISTORICO_TELEFONE, (telefone,))
+        return await self.executar_query(SQL_HISTORICO_TODOS)
+    
+    # Métodos para configurações
+    async def get_configuracoes(self) -> Optional[Dict]:
+        """Busca as configurações do admin"""
+        results = await self.executar_query(SQL_CONFIGURACOES)
+        return results[0] if results else None
+    
+    async def salvar_configuracoes(self, pix_key: str, empresa_nome: str,
+                                   contato_suporte: str) -> bool:
+        """Salva as configurações do admin"""
+        return await self.executar_comando(SQL_CONFIGURACOES_SALVAR,
+                                           (pix_key, empresa_nome, contato_suporte, momento_br()))
+    
+    # Métodos para log de mensagens
+    async def log_mensagem(self, telefone: str, nome_cliente: str, tipo_mensagem: str,
+                           conteudo: str, status: str, erro_detalhes: str = "",
+                           tentativas: int = 1, whatsapp_id: Optional[str] = None) -> bool:
+        """Registra o envio de uma mensagem (ver DatabaseManager.log_mensagem)"""
+        return await self.executar_comando(SQL_LOG_INSERIR, params_log_mensagem(
+            telefone, nome_cliente, tipo_mensagem, conteudo, status,
+            erro_detalhes, tentativas, whatsapp_id))
+    
+    async def registrar_entregas(self, entregas: List[Tuple[str, str, str]]) -> Optional[List[str]]:
+        """Grava recibos (whatsapp_id, situacao, momento) em uma transação e
+        retorna os ids ainda ausentes do log (ver DatabaseManager)"""
+        if not entregas:
+            return []
+        ids = list({whatsapp_id for whatsapp_id, _, _ in entregas})
+        try:
+            async with self.pool.conexao() as conn:
+                async with conn.execute(
+                        SQL_LOG_IDS_EXISTENTES.format(marcadores=marcadores(len(ids))),
+                        ids) as cursor:
+                    existentes = {linha[0] for linha in await cursor.fetchall()}
+                await conn.executemany(SQL_LOG_ENTREGA, params_entregas(entregas, existentes))
+                await conn.commit()
+                return [whatsapp_id for whatsapp_id in ids if whatsapp_id not in existentes]
+        except Exception as e:
+            logger.error(f"Erro ao registrar recibos de entrega: {e}")
+            return None
+    
+    # Métodos da fila persistente de mensagens
+    async def enfileirar_mensagem(self, telefone: str, conteudo: str, tipo_mensagem: str,
+                                  nome_cliente: str = "", prioridade: int = 0,
+                                  max_tentativas: int = FILA_MAX_TENTATIVAS) -> Optional[int]:
+        """Coloca uma mensagem na fila de envio e retorna o ID (None em erro)"""
+        cursor = await self._executar_escrita(SQL_FILA_INSERIR, params_enfileirar(
+            telefone, conteudo, tipo_mensagem, nome_cliente, prioridade, max_tentativas))
+        return cursor.lastrowid if cursor is not None else None
+    
+    async def reservar_mensagens(self, limite: int, lease_segundos: int, dono: str) -> List[Dict]:
+        """Reserva até ``limite`` mensagens vencidas para ``dono`` (ver DatabaseManager)"""
+        agora = momento_br()
+        try:
+            async with self.pool.conexao() as conn:
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    await conn.execute(SQL_FILA_EXPIRAR_ESGOTADAS, (agora,))
+                    async with conn.execute(SQL_FILA_DISPONIVEIS, (agora, limite)) as cursor:
+                        ids = [linha[0] for linha in await cursor.fetchall()]
+                    if not ids:
+                        await conn.commit()
+                        return []
+                    lista = marcadores(len(ids))
+                    await conn.execute(SQL_FILA_RESERVAR.format(marcadores=lista),
+                                       (dono, momento_br(lease_segundos), *ids))
+                    async with conn.execute(SQL_FILA_RESERVADAS.format(marcadores=lista),
+                                            ids) as cursor:
+                        reservadas = await _linhas_dict(cursor)
+                    await conn.commit()
+                    return reservadas
+                except Exception:
+                    await conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao reservar mensagens da fila: {e}")
+            return []
+    
+    async def concluir_mensagem(self, mensagem_id: int, dono: str, sucesso: bool,
+                                erro: str = "", definitivo: bool = False) -> Optional[str]:
+        """Registra o resultado de uma mensagem reservada por ``dono`` (ver DatabaseManager)"""
+        query, params = comando_concluir(mensagem_id, dono, sucesso, erro, definitivo)
+        try:
+            async with self.pool.conexao() as conn:
+                try:
+                    cursor = await conn.execute(query, params)
+                    if cursor.rowcount == 0:
+                        await conn.rollback()
+                        return None
+                    async with conn.execute(SQL_FILA_STATUS, (mensagem_id,)) as cursor:
+                        status = (await cursor.fetchone())[0]
+                    await conn.commit()
+                    return status
+                except Exception:
+                    await conn.rollback()
+                    raise
+        except Exception as e:
+            logger.error(f"Erro ao concluir mensagem {mensagem_id} da fila: {e}")
+            return None
+    
+    async def resumo_fila(self, limite_proximas: int = 5) -> Dict:
+        """Contagem por status e próximas mensagens pendentes da fila"""
+        return montar_resumo_fila(
+            await self.executar_query(SQL_FILA_POR_STATUS),
+            await self.executar_query(SQL_FILA_PROXIMAS, (limite_proximas,)),
+            await self.executar_query(SQL_FILA_ENVIADAS_HOJE, (data_br(),)))
+    
+    # Verificação de números no WhatsApp
+    async def contatos_verificados(self, numeros: List[str],
+                                   validade_horas: int = EVOLUTION_CONTATO_VALIDADE_HORAS) -> Dict[str, bool]:
+        """Resultados ainda válidos de ``numeros`` (formatados): {numero: existe}"""
+        limite = limite_validade_contatos(validade_horas)
+        verificados = {}
+        try:
+            async with self.pool.conexao() as conn:
+                for parte in em_partes(list(dict.fromkeys(numeros))):
+                    query = SQL_CONTATOS_VERIFICADOS.format(marcadores=marcadores(len(parte)))
+                    async with conn.execute(query, (*parte, limite)) as cursor:
+                        async for numero, existe in cursor:
+                            verificados[numero] = bool(existe)
+        except Exception as e:
+            logger.error(f"Erro ao ler contatos verificados: {e}")
+        return verificados
+    
+    async def salvar_contatos(self, resultados: List[Tuple[str, bool, Optional[str]]]) -> bool:
+        """Grava (numero, existe, jid) com a data da verificação"""
+        if not resultados:
+            return True
+        return await self._executar_escrita(SQL_CONTATOS_SALVAR, params_contatos(resultados),
+                                            varios=True) is not None
+    
+    async def resumo_contatos(self, validade_horas: int = EVOLUTION_CONTATO_VALIDADE_HORAS) -> Dict:
+        """Quantos números válidos estão guardados, com e sem WhatsApp"""
+        return montar_resumo_contatos(await self.executar_query(
+            SQL_CONTATOS_RESUMO, (limite_validade_contatos(validade_horas),)))
+    
+    async def estatisticas_mensagens(self) -> Dict:
+        """Retorna estatísticas de mensagens enviadas"""
+        return montar_estatisticas_mensagens(
+            await self.executar_query(SQL_LOG_TOTAL),
+            await self.executar_query(SQL_LOG_POR_STATUS),
+            await self.executar_query(SQL_LOG_POR_TIPO))
+    
+    async def envios_por_dia(self, dias: int = 7) -> List[Dict]:
+        """Contagem de mensagens por dia e status nos últimos X dias"""
+        return await self.executar_query(SQL_ENVIOS_POR_DIA, (data_br(-dias),))
+    
+    async def envios_por_status(self, dias: int = 30) -> List[Dict]:
+        """Contagem de mensagens por status nos últimos X dias"""
+        return await self.executar_query(SQL_ENVIOS_POR_STATUS, (data_br(-dias),))
+    
+    async def entregas_por_situacao(self, dias: int = 30) -> List[Dict]:
+        """Mensagens enviadas por situação de entrega nos últimos X dias"""
+        return await self.executar_query(SQL_ENTREGAS_POR_SITUACAO, (data_br(-dias),))
+    
+    # Métodos para templates
+    async def salvar_template(self, nome: str, titulo: str, conteudo: str, tipo: str) -> bool:
+        """Salva um template personalizado"""
+        return await self.executar_comando(SQL_TEMPLATE_SALVAR, (nome, titulo, conteudo, tipo))
+    
+    async def buscar_template(self, nome: str) -> Optional[Dict]:
+        """Busca um template pelo nome"""
+        results = await self.executar_query(SQL_TEMPLATE_BUSCAR, (nome,))
+        return results[0] if results else None
+    
+    async def listar_templates(self) -> List[Dict]:
+        """Lista todos os templates ativos"""
+        return await self.executar_query(SQL_TEMPLATES_LISTAR)
+
+
+_db: Optional[DatabaseManagerAsync] = None
+
+
+def obter_db() -> DatabaseManagerAsync:
+    """Retorna o gerenciador assíncrono único do processo (pool compartilhado)"""
+    global _db
+    if _db is None:
+        _db = DatabaseManagerAsync()
+    return _db
+
 
 async def criar_tabelas():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT,
-                telefone TEXT UNIQUE,
-                pacote TEXT,
-                plano REAL,
-                vencimento TEXT,
-                chat_id INTEGER
-            )
-        ''')
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS renovacoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telefone TEXT,
-                data_renovacao TEXT,
-                novo_vencimento TEXT,
-                pacote TEXT,
-                plano REAL
-            )
-        ''')
-        await db.commit()
-
-async def get_db():
-    return await aiosqlite.connect(DB_PATH)
+    """Cria/atualiza o esquema (o mesmo de criar_tabela) sem travar o loop"""
+    await asyncio.to_thread(criar_tabela)
+
+
+async def fechar_db(application=None):
+    """Hook de post_shutdown: fecha as conexões do pool assíncrono"""
+    if _db is not None:
+        await _db.pool.fechar()
+        logger.info("Pool assíncrono do banco encerrado")
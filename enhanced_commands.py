@@ -4,6 +4,7 @@ Integração com o NotificationServiceImproved
 """
 
 import logging
+import time
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from datetime import datetime
@@ -13,9 +14,24 @@ logger = logging.getLogger(__name__)
 class EnhancedCommands:
     """Comandos aprimorados com recursos avançados de notificação"""
     
-    def __init__(self, notification_service, db_manager):
+    def __init__(self, notification_service=None, db_manager=None):
+        from database.db import obter_db
         self.notification_service = notification_service
-        self.db = db_manager
+        self.db = db_manager or obter_db()
+    
+    async def _clientes_por_tipo(self, tipo: str):
+        """Retorna (clientes, template) do tipo de lote, ou (None, None) se inválido"""
+        if tipo == "vencimento_2_dias":
+            return await self.db.clientes_vencendo(2), "2_dias"
+        if tipo == "vencimento_1_dia":
+            return await self.db.clientes_vencendo(1), "1_dia"
+        if tipo == "vencimento_hoje":
+            return await self.db.clientes_vencendo(0), "hoje"
+        if tipo == "vencidos":
+            return await self.db.clientes_vencidos(), "vencido"
+        if tipo == "todos_ativos":
+            return await self.db.listar_clientes(), "geral"
+        return None, None
     
     async def comando_sistema_status(self, update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /sistema_status - Status completo do sistema"""
@@ -51,6 +67,36 @@ class EnhancedCommands:
             msg += f"• Status: {'🟢 OK' if rate_info['status'] else '🔴 Limitado'}\n"
             msg += f"• Mensagens no minuto: {rate_info['mensagens_no_minuto']}\n"
             
+            # Limitador de envio da Evolution API
+            from whatsapp_service import obter_whatsapp_service
+            limite = obter_whatsapp_service().estatisticas_limite()
+            msg += f"\n🪣 **Limitador WhatsApp:**\n"
+            if limite['ativo']:
+                msg += f"• Ritmo: {limite['mensagens_por_minuto']:g}/min (rajada {limite['capacidade']})\n"
+                msg += f"• Fichas disponíveis: {limite['fichas']:.1f}/{limite['capacidade']}\n"
+                msg += f"• Aguardando vaga: {limite['reservas_pendentes']}\n"
+                msg += f"• Intervalo por número: {limite['intervalo_destino']:g}s\n"
+                msg += f"• Envios com espera: {limite['envios_com_espera']}/{limite['envios_liberados']}\n"
+                msg += f"• Espera média/máxima: {limite['espera_media']:.1f}s / {limite['espera_maxima']:.1f}s\n"
+            else:
+                msg += "• Desativado (EVOLUTION_MENSAGENS_POR_MINUTO=0)\n"
+            
+            # Webhook da Evolution API (modo webhook)
+            from evolution_webhook import obter_receptor_evolution
+            receptor = obter_receptor_evolution().estatisticas()
+            if receptor['ativo']:
+                ws = obter_whatsapp_service()
+                msg += f"\n📡 **Webhook Evolution:**\n"
+                msg += f"• Eventos: {receptor['eventos']} (último: {receptor['ultimo_evento'] or '-'})\n"
+                msg += f"• Conexão por eventos: {'sim' if ws.estado_por_eventos else 'não'}\n"
+                msg += f"• Recibos: {receptor['recibos']} recebidos, {receptor['gravados']} gravados\n"
+                msg += f"• Aguardando envio no log: {receptor['aguardando_envio']}\n"
+            
+            # Banco: pool de conexões assíncronas
+            pool = self.db.estatisticas_pool()
+            msg += f"\n🗄️ **Banco de Dados:**\n"
+            msg += f"• Conexões assíncronas: {pool['criadas']}/{pool['tamanho']} ({pool['ociosas']} ociosas)\n"
+            
             # Botões de ação
             keyboard = [
                 [InlineKeyboardButton("🔄 Atualizar", callback_data="sistema_status")],
@@ -85,22 +131,8 @@ class EnhancedCommands:
             tipo = context.args[0].lower()
             
             # Obter clientes baseado no tipo
-            if tipo == "vencimento_2_dias":
-                clientes = self.db.clientes_vencendo(2)
-                template = "2_dias"
-            elif tipo == "vencimento_1_dia":
-                clientes = self.db.clientes_vencendo(1)
-                template = "1_dia"
-            elif tipo == "vencimento_hoje":
-                clientes = self.db.clientes_vencendo(0)
-                template = "hoje"
-            elif tipo == "vencidos":
-                clientes = self.db.clientes_vencidos()
-                template = "vencido"
-            elif tipo == "todos_ativos":
-                clientes = self.db.listar_clientes_ativos()
-                template = "geral"
-            else:
+            clientes, template = await self._clientes_por_tipo(tipo)
+            if clientes is None:
                 await update.message.reply_text("❌ Tipo inválido. Use `/notificar_lote` para ver os tipos disponíveis.")
                 return
             
@@ -138,35 +170,65 @@ class EnhancedCommands:
         if data.startswith("lote_confirmar_"):
             tipo = data.replace("lote_confirmar_", "")
             
-            # Mostrar progresso
-            await query.edit_message_text(
-                "🚀 **PROCESSANDO ENVIO EM LOTE**\n\n"
-                "⏳ Iniciando envio de notificações...\n"
-                "📊 Progresso será atualizado em tempo real.",
-                parse_mode='Markdown'
-            )
-            
             # Executar envio
             try:
-                resultados = await self.notification_service.processar_vencimentos_automatico()
+                from whatsapp_service import obter_whatsapp_service
+                from utils.mensagens import mensagem_cobranca
+                
+                clientes, _ = await self._clientes_por_tipo(tipo)
+                if not clientes:
+                    await query.edit_message_text(f"ℹ️ Nenhum cliente encontrado para o tipo: {tipo}")
+                    return
+                
+                total = len(clientes)
+                await query.edit_message_text(
+                    "🚀 **PROCESSANDO ENVIO EM LOTE**\n\n"
+                    f"⏳ Enviando {total} notificações...\n"
+                    "📊 Progresso será atualizado em tempo real.",
+                    parse_mode='Markdown'
+                )
+                
+                # Envio paralelo na sessão compartilhada; resultados chegam
+                # conforme cada mensagem termina
+                ws = obter_whatsapp_service()
+                textos = [mensagem_cobranca(cliente) for cliente in clientes]
+                sucessos = falhas = 0
+                ultima_atualizacao = time.monotonic()
+                
+                async for resultado in ws.enviar_lote(
+                        (cliente.telefone, texto) for cliente, texto in zip(clientes, textos)):
+                    cliente = clientes[resultado['indice']]
+                    if resultado['sucesso']:
+                        sucessos += 1
+                    else:
+                        falhas += 1
+                    await self.db.log_mensagem(
+                        cliente.telefone, cliente.nome, f"lote_{tipo}",
+                        textos[resultado['indice']],
+                        "enviado" if resultado['sucesso'] else "erro",
+                        resultado['erro'] or "", resultado['tentativas'],
+                        resultado['mensagem_id'])
+                    
+                    # Atualizar o progresso no máximo a cada 3 segundos
+                    if time.monotonic() - ultima_atualizacao >= 3:
+                        ultima_atualizacao = time.monotonic()
+                        await query.edit_message_text(
+                            "🚀 **PROCESSANDO ENVIO EM LOTE**\n\n"
+                            f"📤 {sucessos + falhas}/{total} processadas\n"
+                            f"✅ {sucessos} sucessos • ❌ {falhas} falhas",
+                            parse_mode='Markdown'
+                        )
                 
                 # Criar relatório
                 msg = "📋 **RELATÓRIO DE ENVIO EM LOTE**\n\n"
                 msg += f"✅ **Processamento concluído!**\n\n"
-                
-                for categoria, quantidade in resultados.items():
-                    if categoria != 'total_processados' and categoria != 'sucessos' and categoria != 'falhas':
-                        msg += f"• {categoria.replace('_', ' ').title()}: {quantidade}\n"
+                msg += f"• Tipo: {tipo.replace('_', ' ').title()}\n"
                 
                 msg += f"\n📊 **Resumo:**\n"
-                msg += f"• Total processados: {resultados.get('total_processados', 0)}\n"
-                msg += f"• Sucessos: {resultados.get('sucessos', 0)}\n"
-                msg += f"• Falhas: {resultados.get('falhas', 0)}\n"
-                
-                # Taxa de sucesso
-                if resultados.get('total_processados', 0) > 0:
-                    taxa = (resultados.get('sucessos', 0) / resultados.get('total_processados', 1)) * 100
-                    msg += f"• Taxa de sucesso: {taxa:.1f}%\n"
+                msg += f"• Total processados: {total}\n"
+                msg += f"• Sucessos: {sucessos}\n"
+                msg += f"• Falhas: {falhas}\n"
+                msg += f"• Taxa de sucesso: {sucessos / total * 100:.1f}%\n"
                 
                 msg += f"\n🕒 Processado em: {datetime.now().strftime('%H:%M:%S')}"
                 
@@ -179,6 +241,7 @@ class EnhancedCommands:
                 await query.edit_message_text(msg, parse_mode='Markdown', reply_markup=reply_markup)
                 
             except Exception as e:
+                logger.error(f"Erro no envio em lote: {e}")
                 await query.edit_message_text(
                     f"❌ **ERRO NO ENVIO EM LOTE**\n\n"
                     f"Detalhes: {e}\n\n"
@@ -189,6 +252,48 @@ class EnhancedCommands:
         elif data == "lote_cancelar":
             await query.edit_message_text("❌ Envio em lote cancelado.")
     
+    async def comando_verificar_numeros(self, update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /verificar_numeros [forcar] - Confere quais clientes têm WhatsApp"""
+        try:
+            from whatsapp_service import obter_whatsapp_service
+            
+            clientes = await self.db.listar_clientes()
+            if not clientes:
+                await update.message.reply_text("ℹ️ Nenhum cliente ativo para verificar.")
+                return
+            
+            forcar = bool(context.args) and context.args[0].lower() == "forcar"
+            await update.message.reply_text(f"🔎 Verificando {len(clientes)} números no WhatsApp...")
+            
+            inicio = time.monotonic()
+            existentes = await obter_whatsapp_service().verificar_numeros(
+                [cliente.telefone for cliente in clientes], forcar=forcar)
+            sem_whatsapp = [cliente for cliente in clientes
+                            if existentes.get(cliente.telefone) is False]
+            nao_verificados = sum(1 for cliente in clientes
+                                  if cliente.telefone not in existentes)
+            
+            msg = "🔎 **VERIFICAÇÃO DE NÚMEROS**\n\n"
+            msg += f"• Clientes: {len(clientes)}\n"
+            msg += f"• Com WhatsApp: {len(clientes) - len(sem_whatsapp) - nao_verificados}\n"
+            msg += f"• Sem WhatsApp: {len(sem_whatsapp)}\n"
+            if nao_verificados:
+                msg += f"• Não verificados (falha na API): {nao_verificados}\n"
+            msg += f"• Tempo: {time.monotonic() - inicio:.1f}s\n"
+            
+            if sem_whatsapp:
+                msg += "\n⚠️ **Não receberão mensagens:**\n"
+                for cliente in sem_whatsapp[:20]:
+                    msg += f"• {cliente.nome} - {cliente.telefone}\n"
+                if len(sem_whatsapp) > 20:
+                    msg += f"• ... e mais {len(sem_whatsapp) - 20}\n"
+            
+            await update.message.reply_text(msg, parse_mode='Markdown')
+            
+        except Exception as e:
+            logger.error(f"Erro no comando verificar_numeros: {e}")
+            await update.message.reply_text(f"❌ Erro ao verificar números: {e}")
+    
     async def comando_stats_avancado(self, update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /stats_avancado - Estatísticas detalhadas"""
         try:
@@ -0,0 +1,285 @@
+"""
+Webhook da Evolution API: estado da conexão, QR Code e recibos de entrega
+"""
+
+import asyncio
+import hmac
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import (EVOLUTION_WEBHOOK_CAMINHO, EVOLUTION_WEBHOOK_SEGREDO,
+                    EVOLUTION_RECIBOS_INTERVALO, EVOLUTION_RECIBOS_LOTE,
+                    EVOLUTION_RECIBOS_RETENCAO)
+from database import NIVEIS_ENTREGA, agora_br, momento_br
+from database.db import DatabaseManagerAsync, obter_db
+
+logger = logging.getLogger(__name__)
+
+# Status da mensagem na Evolution API (nome ou código do Baileys) -> situação
+# gravada em mensagens_log.entrega
+SITUACOES_ENTREGA = {
+    'ERROR': 'erro', 0: 'erro',
+    'PENDING': 'pendente', 1: 'pendente',
+    'SERVER_ACK': 'servidor', 2: 'servidor',
+    'DELIVERY_ACK': 'entregue', 3: 'entregue',
+    'READ': 'lido', 4: 'lido',
+    'PLAYED': 'reproduzido', 5: 'reproduzido',
+}
+
+EVENTOS_MENSAGEM = ('MESSAGES_UPDATE', 'MESSAGES_UPSERT', 'SEND_MESSAGE')
+
+
+class ReceptorEvolution:
+    """Recebe os eventos da instância sem tocar no banco durante a requisição.
+    
+    CONNECTION_UPDATE e QRCODE_UPDATED vão direto para o WhatsAppService
+    (estado em memória e cache do QR Code). Os recibos de entrega ficam em
+    memória, um por mensagem e só o mais avançado, e são gravados em lote a cada
+    ``intervalo`` segundos (ou ao juntar ``lote``). Um recibo que chega antes de
+    o envio aparecer em mensagens_log espera até ``retencao`` segundos.
+    """
+    
+    def __init__(self, db: Optional[DatabaseManagerAsync] = None,
+                 intervalo: float = EVOLUTION_RECIBOS_INTERVALO,
+                 lote: int = EVOLUTION_RECIBOS_LOTE,
+                 retencao: float = EVOLUTION_RECIBOS_RETENCAO,
+                 segredo: str = EVOLUTION_WEBHOOK_SEGREDO):
+        self.db = db or obter_db()
+        self.intervalo = intervalo
+        self.lote = max(1, lote)
+        self.retencao = retencao
+        self.segredo = segredo
+        # whatsapp_id -> (situacao, momento)
+        self._recibos: Dict[str, Tuple[str, str]] = {}
+        # Recibos sem envio correspondente no log: whatsapp_id -> (situacao, momento, prazo)
+        self._aguardando: Dict[str, Tuple[str, str, float]] = {}
+        self._aviso: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parando = False
+        self._stats = {
+            'eventos': 0,
+            'ignorados': 0,
+            'conexao': 0,
+            'qrcode': 0,
+            'recibos': 0,
+            'gravados': 0,
+            'descartados': 0,
+            'ultimo_evento': None,
+        }
+    
+    @property
+    def ativo(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+    
+    def avisar(self):
+        """Antecipa a gravação do lote"""
+        if self._aviso is not None:
+            self._aviso.set()
+    
+    async def receber(self, request: web.Request) -> web.Response:
+        """Handler aiohttp do webhook; responde assim que o evento é lido"""
+        if self.segredo:
+            recebido = request.query.get('segredo', '')
+            if not hmac.compare_digest(recebido, self.segredo):
+                logger.warning(f"Webhook da Evolution com segredo inválido de {request.remote}")
+                return web.Response(status=403)
+        try:
+            corpo = await request.json()
+        except Exception as e:
+            logger.warning(f"Evento inválido recebido da Evolution API: {e}")
+            return web.Response(status=400)
+        if not isinstance(corpo, dict):
+            return web.Response(status=400)
+        # Com "byEvents" a instância acrescenta o evento ao caminho
+        evento = request.match_info.get('evento') or corpo.get('event')
+        self.processar_evento(evento, corpo)
+        return web.Response()
+    
+    def processar_evento(self, evento: Optional[str], corpo: Dict):
+        """Aplica um evento do webhook (``evento`` como 'connection.update',
+        'CONNECTION_UPDATE' ou 'connection-update')"""
+        from whatsapp_service import obter_whatsapp_service
+        
+        ws = obter_whatsapp_service()
+        nome = str(evento or '').upper().replace('.', '_').replace('-', '_')
+        instancia = corpo.get('instance')
+        if instancia and instancia != ws.instance_name:
+            self._stats['ignorados'] += 1
+            return
+        self._stats['eventos'] += 1
+        self._stats['ultimo_evento'] = agora_br().strftime('%d/%m/%Y %H:%M:%S')
+        dados = corpo.get('data') or {}
+        
+        if nome == 'CONNECTION_UPDATE' and isinstance(dados, dict) and dados.get('state'):
+            # Eventos chegando: o monitor de conexão passa a só conferir o estado
+            ws.estado_por_eventos = True
+            ws.registrar_estado({'instanceName': ws.instance_name, 'state': dados['state']})
+            self._stats['conexao'] += 1
+        elif nome == 'QRCODE_UPDATED' and isinstance(dados, dict):
+            qrcode = dados.get('qrcode')
+            qr_base64 = qrcode.get('base64') if isinstance(qrcode, dict) else None
+            if qr_base64 and ws.registrar_qr_code(qr_base64):
+                self._stats['qrcode'] += 1
+        elif nome in EVENTOS_MENSAGEM:
+            if isinstance(dados, dict) and isinstance(dados.get('messages'), list):
+                dados = dados['messages']
+            for item in dados if isinstance(dados, list) else [dados]:
+                recibo = self._extrair_recibo(item)
+                if recibo:
+                    self.adicionar_recibo(*recibo)
+        else:
+            self._stats['ignorados'] += 1
+    
+    @staticmethod
+    def _extrair_recibo(item: object) -> Optional[Tuple[str, str]]:
+        """(whatsapp_id, situacao) de uma mensagem enviada pela instância"""
+        if not isinstance(item, dict):
+            return None
+        chave = item.get('key') if isinstance(item.get('key'), dict) else {}
+        if not item.get('fromMe', chave.get('fromMe', True)):
+            return None
+        # messages.update traz o id do WhatsApp em keyId (messageId é o id interno)
+        whatsapp_id = item.get('keyId') or chave.get('id')
+        status = item.get('status')
+        if status is None and isinstance(item.get('update'), dict):
+            status = item['update'].get('status')
+        if isinstance(status, str):
+            status = status.upper()
+        situacao = SITUACOES_ENTREGA.get(status)
+        if not whatsapp_id or not situacao:
+            return None
+        return whatsapp_id, situacao
+    
+    def adicionar_recibo(self, whatsapp_id: str, situacao: str):
+        """Guarda o recibo para o próximo lote, se avançar a situação da mensagem"""
+        self._stats['recibos'] += 1
+        atual = self._recibos.get(whatsapp_id)
+        if atual is None or NIVEIS_ENTREGA[situacao] > NIVEIS_ENTREGA[atual[0]]:
+            self._recibos[whatsapp_id] = (situacao, momento_br())
+        if len(self._recibos) >= self.lote:
+            self.avisar()
+    
+    async def gravar(self) -> int:
+        """Grava os recibos acumulados numa transação; retorna quantos foram aplicados"""
+        agora = time.monotonic()
+        recibos, self._recibos = self._recibos, {}
+        prazos: Dict[str, float] = {}
+        for whatsapp_id, (situacao, momento, prazo) in self._aguardando.items():
+            if prazo <= agora:
+                self._stats['descartados'] += 1
+                continue
+            prazos[whatsapp_id] = prazo
+            novo = recibos.get(whatsapp_id)
+            if novo is None or NIVEIS_ENTREGA[situacao] > NIVEIS_ENTREGA[novo[0]]:
+                recibos[whatsapp_id] = (situacao, momento)
+        self._aguardando = {}
+        if not recibos:
+            return 0
+        
+        entregas: List[Tuple[str, str, str]] = [
+            (whatsapp_id, situacao, momento)
+            for whatsapp_id, (situacao, momento) in recibos.items()]
+        ausentes = await self.db.registrar_entregas(entregas)
+        if ausentes is None:
+            # Erro no banco: tenta de novo no próximo lote
+            ausentes = list(recibos)
+        for whatsapp_id in ausentes:
+            situacao, momento = recibos[whatsapp_id]
+            self._aguardando[whatsapp_id] = (situacao, momento,
+                                             prazos.get(whatsapp_id, agora + self.retencao))
+        gravados = len(recibos) - len(ausentes)
+        self._stats['gravados'] += gravados
+        return gravados
+    
+    async def _loop(self):
+        while not self._parando:
+            self._aviso.clear()
+            try:
+                await asyncio.wait_for(self._aviso.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.gravar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao gravar recibos de entrega: {e}")
+    
+    def iniciar(self):
+        """Inicia a gravação em lote no event loop atual (idempotente)"""
+        if self.ativo:
+            return
+        self._parando = False
+        self._aviso = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._loop(), name="recibos-evolution")
+        logger.info("Receptor do webhook da Evolution API iniciado")
+    
+    async def parar(self):
+        """Grava o que estiver acumulado e encerra"""
+        if not self.ativo:
+            return
+        self._parando = True
+        self.avisar()
+        await asyncio.gather(self._tarefa, return_exceptions=True)
+        self._tarefa = None
+        logger.info("Receptor do webhook da Evolution API encerrado")
+    
+    def estatisticas(self) -> Dict:
+        """Contadores do receptor nesta execução"""
+        return {**self._stats,
+                'ativo': self.ativo,
+                'pendentes': len(self._recibos),
+                'aguardando_envio': len(self._aguardando)}
+
+
+_receptor: Optional[ReceptorEvolution] = None
+_configuracao: Optional[asyncio.Task] = None
+
+
+def obter_receptor_evolution() -> ReceptorEvolution:
+    """Retorna o receptor único do webhook da Evolution API"""
+    global _receptor
+    if _receptor is None:
+        _receptor = ReceptorEvolution()
+    return _receptor
+
+
+def registrar_rotas_evolution(caminho: str = EVOLUTION_WEBHOOK_CAMINHO):
+    """Publica o webhook no servidor do modo webhook (servidor_webhook)"""
+    from servidor_webhook import registrar_rota
+    
+    async def receber(request: web.Request) -> web.Response:
+        return await obter_receptor_evolution().receber(request)
+    
+    registrar_rota('POST', caminho, receber)
+    registrar_rota('POST', f"{caminho}/{{evento}}", receber)
+
+
+async def iniciar_receptor_evolution(application=None):
+    """Hook de post_init: inicia a gravação dos recibos e aponta o webhook da
+    instância para o bot.
+    
+    A configuração do webhook roda em segundo plano: o post_init acontece
+    antes de o servidor começar a escutar, e com a Evolution API fora do ar
+    as retentativas atrasariam a subida do bot inteiro.
+    """
+    global _configuracao
+    from whatsapp_service import obter_whatsapp_service
+    obter_receptor_evolution().iniciar()
+    if _configuracao is None or _configuracao.done():
+        _configuracao = asyncio.create_task(obter_whatsapp_service().configurar_webhook(),
+                                            name="configurar-webhook-evolution")
+
+
+async def parar_receptor_evolution(application=None):
+    """Hook de post_shutdown: grava os últimos recibos"""
+    global _configuracao
+    if _configuracao is not None:
+        _configuracao.cancel()
+        await asyncio.gather(_configuracao, return_exceptions=True)
+        _configuracao = None
+    if _receptor is not None:
+        await _receptor.parar()
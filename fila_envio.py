@@ -0,0 +1,177 @@
+"""
+Fila persistente de mensagens WhatsApp e o despachante que a esvazia
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Optional, Dict
+from config import FILA_LOTE, FILA_LEASE_SEGUNDOS, FILA_INTERVALO
+from database import agora_br
+from database.db import DatabaseManagerAsync, obter_db
+
+logger = logging.getLogger(__name__)
+
+class DespachanteFila:
+    """Esvazia a tabela fila_mensagens dentro do event loop do bot.
+    
+    A cada volta reserva um lote (com prazo de validade) no banco, envia pelo
+    WhatsAppService compartilhado e grava o resultado de cada mensagem. Se o
+    processo cair no meio do lote, as reservas vencem e as mensagens voltam a
+    ser elegíveis; a conclusão só é aceita enquanto a reserva pertence a este
+    despachante, então uma mensagem retomada por outro não é gravada duas vezes.
+    """
+    
+    def __init__(self, db: Optional[DatabaseManagerAsync] = None, lote: int = FILA_LOTE,
+                 lease_segundos: int = FILA_LEASE_SEGUNDOS,
+                 intervalo: float = FILA_INTERVALO):
+        self.db = db or obter_db()
+        self.lote = max(1, lote)
+        self.lease_segundos = lease_segundos
+        self.intervalo = intervalo
+        self.dono = f"despachante-{uuid.uuid4().hex[:8]}"
+        self._aviso: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._parando = False
+        self._stats = {
+            'lotes': 0,
+            'enviadas': 0,
+            'reagendadas': 0,
+            'falharam': 0,
+            'reservas_perdidas': 0,
+            'ultimo_lote': None,
+        }
+    
+    @property
+    def ativo(self) -> bool:
+        return self._tarefa is not None and not self._tarefa.done()
+    
+    def avisar(self):
+        """Acorda o despachante (chamado logo após enfileirar)"""
+        if self._aviso is not None:
+            self._aviso.set()
+    
+    async def processar_lote(self) -> int:
+        """Reserva e envia um lote; retorna quantas mensagens foram processadas"""
+        from whatsapp_service import obter_whatsapp_service
+        
+        # Com o circuito aberto a fila espera, em vez de gastar tentativas
+        ws = obter_whatsapp_service()
+        if not ws.disjuntor.aceitando():
+            return 0
+        
+        mensagens = await self.db.reservar_mensagens(self.lote, self.lease_segundos, self.dono)
+        if not mensagens:
+            return 0
+        
+        async for resultado in ws.enviar_lote(
+                (mensagem['telefone'], mensagem['conteudo']) for mensagem in mensagens):
+            mensagem = mensagens[resultado['indice']]
+            erro = resultado['erro'] or ("" if resultado['sucesso'] else "Envio não confirmado")
+            # Número sem WhatsApp não ganha nova tentativa
+            status = await self.db.concluir_mensagem(mensagem['id'], self.dono,
+                                                     resultado['sucesso'], erro,
+                                                     definitivo=resultado['sem_whatsapp'])
+            if status is None:
+                self._stats['reservas_perdidas'] += 1
+                continue
+            if status == 'pendente':
+                self._stats['reagendadas'] += 1
+                continue
+            
+            # Resultado definitivo: registrar no histórico de envios
+            if status == 'enviado':
+                self._stats['enviadas'] += 1
+            else:
+                self._stats['falharam'] += 1
+            await self.db.log_mensagem(mensagem['telefone'], mensagem['nome_cliente'],
+                                       mensagem['tipo_mensagem'], mensagem['conteudo'],
+                                       status, erro, resultado['tentativas'],
+                                       resultado['mensagem_id'])
+        
+        self._stats['lotes'] += 1
+        self._stats['ultimo_lote'] = agora_br().strftime('%d/%m/%Y %H:%M:%S')
+        return len(mensagens)
+    
+    async def _loop(self):
+        while not self._parando:
+            try:
+                processadas = await self.processar_lote()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no despachante da fila: {e}")
+                processadas = 0
+            if processadas or self._parando:
+                continue
+            self._aviso.clear()
+            try:
+                await asyncio.wait_for(self._aviso.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+    
+    def iniciar(self):
+        """Inicia o despachante no event loop atual (idempotente)"""
+        if self.ativo:
+            return
+        self._parando = False
+        self._aviso = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._loop(), name="despachante-fila")
+        logger.info(f"Despachante da fila iniciado ({self.dono})")
+    
+    async def parar(self, timeout: float = 30):
+        """Termina o lote em andamento e encerra o despachante.
+        
+        Passado ``timeout`` a tarefa é cancelada; as mensagens ainda reservadas
+        voltam para a fila quando a reserva vencer.
+        """
+        if not self.ativo:
+            return
+        self._parando = True
+        self.avisar()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._tarefa), timeout)
+        except asyncio.TimeoutError:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+        self._tarefa = None
+        logger.info("Despachante da fila encerrado")
+    
+    def estatisticas(self) -> Dict:
+        """Contadores do despachante nesta execução"""
+        stats = dict(self._stats)
+        stats['ativo'] = self.ativo
+        stats['dono'] = self.dono
+        return stats
+
+
+_despachante: Optional[DespachanteFila] = None
+
+
+def obter_despachante() -> DespachanteFila:
+    """Retorna o despachante único do processo"""
+    global _despachante
+    if _despachante is None:
+        _despachante = DespachanteFila()
+    return _despachante
+
+
+async def enfileirar(telefone: str, conteudo: str, tipo_mensagem: str,
+                     nome_cliente: str = "", prioridade: int = 0) -> Optional[int]:
+    """Grava a mensagem na fila e acorda o despachante; não espera o envio"""
+    mensagem_id = await obter_despachante().db.enfileirar_mensagem(
+        telefone, conteudo, tipo_mensagem, nome_cliente, prioridade)
+    if mensagem_id is not None:
+        obter_despachante().avisar()
+    return mensagem_id
+
+
+async def iniciar_despachante(application=None):
+    """Hook de post_init: começa a esvaziar a fila"""
+    obter_despachante().iniciar()
+
+
+async def parar_despachante(application=None):
+    """Hook de post_shutdown: encerra o despachante"""
+    if _despachante is not None:
+        await _despachante.parar()
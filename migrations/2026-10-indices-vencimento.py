@@ -0,0 +1,44 @@
+"""
+Migração: índices secundários para as consultas de vencimento, histórico de
+renovações e logs de mensagens.
+
+Uso: python migrations/2026-10-indices-vencimento.py [caminho/clientes.db]
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import INDICES
+
+
+def aplicar(db_path: str):
+    """Cria os índices e atualiza as estatísticas do planejador.
+    
+    Índices de tabelas ou colunas que o banco ainda não tem são pulados; o
+    bot cria as duas coisas (e os índices) em criar_tabela() ao iniciar.
+    """
+    conn = sqlite3.connect(db_path)
+    aplicados = 0
+    try:
+        for indice in INDICES:
+            try:
+                conn.execute(indice)
+                aplicados += 1
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Índice pulado ({e}): {indice}")
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"✅ {aplicados}/{len(INDICES)} índices aplicados em {db_path}")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erro ao aplicar índices: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    aplicar(sys.argv[1] if len(sys.argv) > 1 else "clientes.db")
@@ -0,0 +1,83 @@
+"""
+Processamento concorrente das atualizações do Telegram, em ordem por chat
+"""
+
+import logging
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessadorPorChat(BaseUpdateProcessor):
+    """Roda chats diferentes em paralelo e as atualizações de um mesmo chat
+    uma de cada vez, na ordem de chegada.
+    
+    A primeira atualização de um chat ocupa uma das ``max_concurrent_updates``
+    vagas e, ao terminar, processa as que chegaram enquanto isso para o mesmo
+    chat. As que esperam não ocupam vaga, então um chat lento (ex.: cobrança
+    aguardando o timeout do WhatsApp) não bloqueia os demais, e o estado dos
+    ConversationHandler continua sendo atualizado em sequência.
+    """
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._pendentes: Dict[int, Deque[Awaitable[Any]]] = {}
+        self._maior_fila = 0
+    
+    @staticmethod
+    def _chave(update: object) -> Optional[int]:
+        """Chat da atualização (ou o usuário, se não houver chat)"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return None
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chave = self._chave(update)
+        if chave is None:
+            await coroutine
+            return
+        
+        fila = self._pendentes.get(chave)
+        if fila is not None:
+            # O chat já está sendo atendido: entra na fila dele e libera a vaga
+            fila.append(coroutine)
+            self._maior_fila = max(self._maior_fila, len(fila))
+            return
+        
+        fila = self._pendentes[chave] = deque([coroutine])
+        try:
+            while fila:
+                try:
+                    await fila[0]
+                except Exception as e:
+                    logger.error(f"Erro ao processar atualização do chat {chave}: {e}")
+                finally:
+                    fila.popleft()
+        finally:
+            # Cancelado no desligamento: descartar o que não chegou a rodar
+            for restante in fila:
+                restante.close()
+            del self._pendentes[chave]
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+    
+    def estatisticas(self) -> Dict:
+        """Chats em atendimento e atualizações aguardando a vez"""
+        return {
+            'limite': self.max_concurrent_updates,
+            'chats_ativos': len(self._pendentes),
+            'aguardando': sum(len(fila) - 1 for fila in self._pendentes.values()),
+            'maior_fila': self._maior_fila,
+        }
@@ -0,0 +1,127 @@
+"""
+Modo webhook: servidor aiohttp embutido que recebe as atualizações do Telegram
+"""
+
+import asyncio
+import hmac
+import logging
+import secrets
+import signal
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from aiohttp import web
+from telegram import Update
+
+from config import (WEBHOOK_CAMINHO, WEBHOOK_ENDERECO, WEBHOOK_PORTA,
+                    WEBHOOK_SEGREDO, WEBHOOK_URL)
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+# Rotas de outros módulos servidas pelo mesmo servidor (ex.: webhook da Evolution API)
+_rotas_extras: List[Tuple[str, str, Handler]] = []
+
+
+def registrar_rota(metodo: str, caminho: str, handler: Handler) -> None:
+    """Registra uma rota extra; vale para os servidores criados depois"""
+    _rotas_extras.append((metodo.upper(), caminho, handler))
+
+
+def criar_app_web(application, segredo: str = WEBHOOK_SEGREDO,
+                  caminho: str = WEBHOOK_CAMINHO) -> web.Application:
+    """Monta o app aiohttp que entrega as atualizações à fila do bot.
+    
+    Cada POST é validado pelo cabeçalho X-Telegram-Bot-Api-Secret-Token (quando
+    há segredo), convertido em Update e colocado em ``application.update_queue``;
+    a resposta sai logo em seguida, sem esperar o handler rodar.
+    """
+    async def receber_update(request: web.Request) -> web.Response:
+        if segredo:
+            recebido = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+            if not hmac.compare_digest(recebido, segredo):
+                logger.warning(f"Webhook do Telegram com segredo inválido de {request.remote}")
+                return web.Response(status=403)
+        try:
+            dados = await request.json()
+            update = Update.de_json(dados, application.bot)
+        except Exception as e:
+            logger.warning(f"Atualização inválida recebida no webhook: {e}")
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        await application.update_queue.put(update)
+        return web.Response()
+    
+    async def saude(request: web.Request) -> web.Response:
+        from whatsapp_service import obter_whatsapp_service
+        return web.json_response({'ok': True, 'fila': application.update_queue.qsize(),
+                                  'limite_envio': obter_whatsapp_service().estatisticas_limite()})
+    
+    app_web = web.Application()
+    app_web.router.add_post(caminho, receber_update)
+    app_web.router.add_get('/saude', saude)
+    for metodo, caminho_extra, handler in _rotas_extras:
+        app_web.router.add_route(metodo, caminho_extra, handler)
+    return app_web
+
+
+async def executar_webhook(application, parar: Optional[asyncio.Event] = None,
+                           endereco: str = WEBHOOK_ENDERECO,
+                           porta: int = WEBHOOK_PORTA,
+                           url: str = WEBHOOK_URL) -> None:
+    """Roda o bot em modo webhook até ``parar`` ser sinalizado (ou SIGINT/SIGTERM).
+    
+    Substitui ``run_polling``: inicializa a aplicação e chama os mesmos hooks
+    post_init/post_shutdown. Com ``url`` o webhook é registrado no Telegram sem
+    descartar as atualizações pendentes; sem ``url`` o servidor só escuta
+    localmente, para testes com um remetente falso.
+    """
+    parar = parar or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sinal, parar.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    
+    # O Telegram aceita só [A-Za-z0-9_-]; sem segredo configurado, gera um por execução
+    segredo = WEBHOOK_SEGREDO or (secrets.token_urlsafe(32) if url else '')
+    
+    runner = web.AppRunner(criar_app_web(application, segredo))
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await runner.setup()
+        await web.TCPSite(runner, endereco, porta).start()
+        await application.start()
+        logger.info(f"Webhook escutando em {endereco}:{porta}{WEBHOOK_CAMINHO}")
+        
+        if url:
+            await application.bot.set_webhook(
+                url=f"{url}{WEBHOOK_CAMINHO}",
+                secret_token=segredo,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=False)
+            logger.info(f"Webhook registrado no Telegram: {url}{WEBHOOK_CAMINHO}")
+        else:
+            logger.warning("WEBHOOK_URL não configurada: webhook não registrado no Telegram")
+        
+        await parar.wait()
+    finally:
+        # O webhook continua registrado: o Telegram guarda as atualizações
+        # até o bot voltar
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sinal)
+            except (NotImplementedError, RuntimeError):
+                pass
@@ -0,0 +1,124 @@
+import asyncio
+
+import whatsapp_service
+from whatsapp_service import CircuitoAberto, DisjuntorEvolution, LimitadorTaxa, WhatsAppService
+
+
+def _disjuntor_aberto() -> DisjuntorEvolution:
+    disjuntor = DisjuntorEvolution(falhas_para_abrir=1, tempo_aberto=0)
+    disjuntor.registrar_falha("timeout")
+    assert disjuntor.estado == DisjuntorEvolution.ABERTO
+    return disjuntor
+
+
+def test_sondagem_cancelada_volta_a_aberto():
+    disjuntor = _disjuntor_aberto()
+
+    async def sondagem_lenta() -> bool:
+        await asyncio.sleep(60)
+        return True
+
+    async def cenario():
+        try:
+            await asyncio.wait_for(disjuntor.liberar(sondagem_lenta), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+        assert disjuntor.estado == DisjuntorEvolution.ABERTO
+        assert disjuntor.aceitando()
+
+        async def sondagem_ok() -> bool:
+            return True
+
+        await disjuntor.liberar(sondagem_ok)
+        assert disjuntor.estado == DisjuntorEvolution.FECHADO
+
+    asyncio.run(cenario())
+
+
+def test_sondagem_falha_mantem_aberto():
+    disjuntor = _disjuntor_aberto()
+
+    async def sondagem_desconectada() -> bool:
+        return False
+
+    async def cenario():
+        try:
+            await disjuntor.liberar(sondagem_desconectada)
+        except CircuitoAberto:
+            pass
+        else:
+            raise AssertionError("envio deveria ser recusado")
+        assert disjuntor.estado == DisjuntorEvolution.ABERTO
+
+    asyncio.run(cenario())
+
+
+class _SessaoTravada:
+    """Sessão HTTP de uma instância travada: o envio nunca responde e a
+    consulta de estado estoura o timeout, como faria o aiohttp"""
+
+    closed = False
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.timeouts = []
+
+    async def request(self, *args, **kwargs):
+        self.requisicoes += 1
+        await asyncio.sleep(3600)
+
+    def get(self, *args, timeout=None, **kwargs):
+        self.requisicoes += 1
+        self.timeouts.append(timeout.total)
+        return _RespostaEstourada()
+
+
+class _RespostaEstourada:
+    async def __aenter__(self):
+        raise asyncio.TimeoutError()
+
+    async def __aexit__(self, *erro):
+        return False
+
+
+def _servico(sessao) -> WhatsAppService:
+    servico = WhatsAppService()
+    servico.session = sessao
+    servico.limitador = LimitadorTaxa(mensagens_por_minuto=0)
+    return servico
+
+
+def test_envio_cancelado_nao_conta_como_sucesso():
+    servico = _servico(_SessaoTravada())
+    servico.disjuntor.registrar_falha("timeout")
+    servico.disjuntor.registrar_falha("timeout")
+
+    async def cenario():
+        try:
+            await asyncio.wait_for(servico.enviar_mensagem("11999990000", "oi"), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("envio deveria ter sido cancelado")
+
+    asyncio.run(cenario())
+    assert servico.session.requisicoes == 1
+    assert servico.disjuntor.falhas_consecutivas == 2
+
+
+def test_sondagem_e_uma_consulta_curta_sem_retentativas():
+    sessao = _SessaoTravada()
+    servico = _servico(sessao)
+    servico.disjuntor = _disjuntor_aberto()
+
+    async def cenario():
+        try:
+            return await servico.enviar_mensagem_resultado("11999990000", "oi")
+        finally:
+            servico.session = None
+
+    resultado = asyncio.run(cenario())
+    assert not resultado['sucesso'] and resultado['tentativas'] == 0
+    assert sessao.requisicoes == 1
+    assert sessao.timeouts == [whatsapp_service.EVOLUTION_SONDAGEM_TIMEOUT]
+    assert servico.disjuntor.estado == DisjuntorEvolution.ABERTO
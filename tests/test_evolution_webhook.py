@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+import evolution_webhook
+import whatsapp_service
+
+
+class _ServicoSemResposta:
+    """Evolution API fora do ar: a configuração do webhook nunca termina"""
+
+    def __init__(self):
+        self.cancelado = False
+
+    async def configurar_webhook(self):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelado = True
+            raise
+
+
+def test_configurar_webhook_nao_segura_a_inicializacao(monkeypatch):
+    servico = _ServicoSemResposta()
+    monkeypatch.setattr(whatsapp_service, 'obter_whatsapp_service', lambda: servico)
+
+    async def cenario():
+        inicio = time.monotonic()
+        await evolution_webhook.iniciar_receptor_evolution()
+        assert time.monotonic() - inicio < 1
+        await asyncio.sleep(0)
+        await evolution_webhook.parar_receptor_evolution()
+
+    asyncio.run(cenario())
+    assert servico.cancelado
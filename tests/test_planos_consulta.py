@@ -0,0 +1,17 @@
+import database
+from database import CONSULTAS_INDEXADAS, DatabaseManager, criar_tabela, fechar_pools
+
+
+def test_consultas_indexadas_nao_fazem_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'clientes.db'))
+    criar_tabela()
+    try:
+        planos = DatabaseManager().verificar_planos_consulta()
+    finally:
+        fechar_pools()
+    
+    assert set(planos) == set(CONSULTAS_INDEXADAS)
+    for nome, detalhes in planos.items():
+        assert detalhes, f"{nome}: EXPLAIN QUERY PLAN não retornou plano"
+        scans = [detalhe for detalhe in detalhes if detalhe.startswith('SCAN')]
+        assert not scans, f"{nome} voltou a varrer a tabela: {scans}"
@@ -0,0 +1,57 @@
+import asyncio
+
+import aiosqlite
+
+import database.db
+from database.db import PoolConexoesAsync
+
+
+def test_cancelar_criacao_libera_a_vaga(tmp_path):
+    pool = PoolConexoesAsync(str(tmp_path / 'clientes.db'), tamanho=1, timeout=0.1)
+    criar_conexao = pool._criar_conexao
+
+    async def criacao_lenta():
+        await asyncio.sleep(60)
+
+    async def cenario():
+        pool._criar_conexao = criacao_lenta
+        try:
+            await asyncio.wait_for(pool.obter(), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+        assert pool.estatisticas()['criadas'] == 0
+
+        pool._criar_conexao = criar_conexao
+        async with pool.conexao() as conn:
+            async with conn.execute("SELECT 1") as cursor:
+                assert await cursor.fetchone() == (1,)
+        await pool.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_erro_nos_pragmas_fecha_a_conexao(tmp_path, monkeypatch):
+    abertas = []
+    conectar = aiosqlite.connect
+
+    def conectar_registrando(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        abertas.append(conn)
+        return conn
+
+    monkeypatch.setattr(database.db.aiosqlite, 'connect', conectar_registrando)
+    monkeypatch.setattr(database.db, 'pragmas_conexao',
+                        lambda: ["SELECT * FROM tabela_inexistente"])
+    pool = PoolConexoesAsync(str(tmp_path / 'clientes.db'), tamanho=1)
+
+    async def cenario():
+        try:
+            await pool.obter()
+        except Exception:
+            pass
+        else:
+            raise AssertionError("a criação da conexão deveria falhar")
+
+    asyncio.run(cenario())
+    assert pool.estatisticas()['criadas'] == 0
+    assert len(abertas) == 1 and not abertas[0]._running
@@ -0,0 +1,35 @@
+import asyncio
+
+import database
+import database.db
+from database import DatabaseManager, criar_tabela, data_br, fechar_pools
+from database.db import DatabaseManagerAsync
+
+
+def test_renovacao_com_vencimento_invalido_conta_de_hoje(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'clientes.db')
+    monkeypatch.setattr(database, 'DB_PATH', caminho)
+    monkeypatch.setattr(database.db, 'DB_PATH', caminho)
+    criar_tabela()
+    db = DatabaseManager()
+    db_async = DatabaseManagerAsync()
+
+    async def renovar_async(cliente_id):
+        try:
+            return await db_async.registrar_renovacao(cliente_id, 30, 25.0)
+        finally:
+            await db_async.pool.fechar()
+
+    try:
+        assert db.adicionar_cliente("Fulano", "5511999990000", "Mensal", 25.0,
+                                    "data-invalida", "srv")
+        cliente = db.buscar_cliente_por_telefone("5511999990000")
+        assert cliente.vencimento_obj is None
+
+        assert db.registrar_renovacao(cliente.id, 30, 25.0)
+        assert asyncio.run(renovar_async(cliente.id))
+        historico = db.historico_renovacoes("5511999990000")
+    finally:
+        fechar_pools()
+
+    assert [linha['novo_vencimento'] for linha in historico] == [data_br(30)] * 2
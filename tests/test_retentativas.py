@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from whatsapp_service import LimitadorTaxa, PoliticaRetentativa, WhatsAppService
+
+
+class _Resposta:
+    def __init__(self, status: int):
+        self.status = status
+        self.headers = {}
+
+    def release(self):
+        pass
+
+    async def json(self):
+        return {'key': {'id': 'ABC'}}
+
+    async def text(self):
+        return ""
+
+
+class _Sessao:
+    """Sessão HTTP falsa: devolve os status pedidos e, depois deles, fica
+    sem responder até estourar o timeout da tentativa"""
+
+    closed = False
+
+    def __init__(self, *status: int):
+        self.status = list(status)
+        self.requisicoes = 0
+
+    async def request(self, metodo, url, timeout=None, **kwargs):
+        self.requisicoes += 1
+        if self.status:
+            return _Resposta(self.status.pop(0))
+        await asyncio.wait_for(asyncio.sleep(3600), timeout.total)
+
+
+def _servico(sessao, limitador: LimitadorTaxa) -> WhatsAppService:
+    servico = WhatsAppService()
+    servico.session = sessao
+    servico.limitador = limitador
+    servico.politica = PoliticaRetentativa(tentativas=3, base=0, maximo=0)
+    return servico
+
+
+def _enviar(servico: WhatsAppService, prazo: float):
+    async def cenario():
+        try:
+            return await servico.enviar_mensagem_resultado("11999990000", "oi", prazo=prazo)
+        finally:
+            servico.session = None
+
+    inicio = time.monotonic()
+    resultado = asyncio.run(cenario())
+    return resultado, time.monotonic() - inicio
+
+
+def test_retentativa_nao_espera_intervalo_do_destino():
+    sessao = _Sessao(503, 200)
+    servico = _servico(sessao, LimitadorTaxa(mensagens_por_minuto=6000,
+                                             intervalo_destino=10))
+
+    resultado, duracao = _enviar(servico, prazo=5)
+
+    assert resultado['sucesso'] and resultado['tentativas'] == 2
+    assert duracao < 1
+
+
+def test_prazo_limita_o_envio_inteiro():
+    sessao = _Sessao()
+    servico = _servico(sessao, LimitadorTaxa(mensagens_por_minuto=0))
+
+    resultado, duracao = _enviar(servico, prazo=0.2)
+
+    assert not resultado['sucesso']
+    assert resultado['erro'].startswith("TimeoutError")
+    assert duracao < 1
+    assert servico.disjuntor.falhas_consecutivas == 1
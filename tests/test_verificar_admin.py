@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot import verificar_admin
+
+
+class _Consulta:
+    def __init__(self):
+        self.respostas = []
+
+    async def answer(self, texto=None, show_alert=False):
+        self.respostas.append((texto, show_alert))
+
+
+def test_botao_de_nao_admin_e_recusado_no_proprio_botao(monkeypatch):
+    monkeypatch.setenv('ADMIN_CHAT_ID', '1')
+    chamadas = []
+
+    @verificar_admin
+    async def processar(update, context):
+        chamadas.append(update)
+
+    consulta = _Consulta()
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=2), message=None,
+                             effective_message=None, callback_query=consulta)
+
+    asyncio.run(processar(update, None))
+
+    assert not chamadas
+    assert len(consulta.respostas) == 1 and consulta.respostas[0][1] is True
@@ -0,0 +1,35 @@
+# utils/mensagens.py
+
+
+def mensagem_cobranca(cliente) -> str:
+    """
+    Monta o texto de cobrança/lembrete enviado por WhatsApp ao cliente,
+    conforme os dias restantes até o vencimento.
+    """
+    dias_restantes = cliente.dias_restantes
+
+    if dias_restantes < 0:
+        status_msg = f"VENCIDO há {abs(dias_restantes)} dias"
+        urgencia = "🔴 URGENTE"
+    elif dias_restantes == 0:
+        status_msg = "VENCE HOJE"
+        urgencia = "⚠️ ATENÇÃO"
+    elif dias_restantes <= 3:
+        status_msg = f"Vence em {dias_restantes} dias"
+        urgencia = "🟡 LEMBRETE"
+    else:
+        status_msg = f"Vence em {dias_restantes} dias"
+        urgencia = "🔔 LEMBRETE"
+
+    return f"""
+{urgencia} - Renovação de Plano
+
+Olá {cliente.nome}!
+
+📅 Status: {status_msg}
+📦 Pacote: {cliente.pacote}
+💰 Valor: R$ {cliente.plano:.2f}
+🖥️ Servidor: {cliente.servidor}
+
+Para renovar seu plano, entre em contato conosco.
+"""
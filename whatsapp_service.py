@@ -5,11 +5,307 @@ Serviço de integração com Evolution API para WhatsApp
 import aiohttp
 import asyncio
 import logging
-from typing import Optional, Dict
-from config import EVOLUTION_API_URL, EVOLUTION_API_KEY, EVOLUTION_INSTANCE_NAME
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Iterable, List, Tuple, AsyncIterator, Callable, Awaitable
+from config import (EVOLUTION_API_URL, EVOLUTION_API_KEY, EVOLUTION_INSTANCE_NAME,
+                    EVOLUTION_CONEXOES_MAX, EVOLUTION_CONEXOES_POR_HOST,
+                    EVOLUTION_KEEPALIVE, EVOLUTION_DNS_CACHE_TTL,
+                    EVOLUTION_TIMEOUT, EVOLUTION_TIMEOUT_CONEXAO,
+                    EVOLUTION_LOTE_CONCORRENCIA, EVOLUTION_MENSAGENS_POR_MINUTO,
+                    EVOLUTION_VERIFICACAO_LOTE, EVOLUTION_VERIFICACAO_CONCORRENCIA,
+                    EVOLUTION_RAJADA, EVOLUTION_INTERVALO_DESTINO,
+                    EVOLUTION_TENTATIVAS, EVOLUTION_BACKOFF_BASE,
+                    EVOLUTION_BACKOFF_MAX, EVOLUTION_PRAZO_CHAMADA,
+                    EVOLUTION_DISJUNTOR_FALHAS, EVOLUTION_DISJUNTOR_ESPERA,
+                    EVOLUTION_SONDAGEM_TIMEOUT,
+                    EVOLUTION_ESTADO_TTL, EVOLUTION_ESTADO_INTERVALO,
+                    EVOLUTION_ESTADO_INTERVALO_EVENTOS, EVOLUTION_WEBHOOK_URL,
+                    EVOLUTION_WEBHOOK_SEGREDO,
+                    EVOLUTION_QR_PRAZO, EVOLUTION_QR_ATRASO_MAX,
+                    EVOLUTION_QR_VALIDADE)
 
 logger = logging.getLogger(__name__)
 
+# Eventos que a instância envia ao webhook (ver evolution_webhook.py)
+EVENTOS_WEBHOOK = ["QRCODE_UPDATED", "CONNECTION_UPDATE", "MESSAGES_UPSERT",
+                   "MESSAGES_UPDATE", "SEND_MESSAGE"]
+
+class LimitadorTaxa:
+    """Token bucket para os envios à Evolution API.
+    
+    O balde guarda até ``rajada`` fichas e é reabastecido a
+    ``mensagens_por_minuto``; cada envio consome uma ficha. Além disso, dois
+    envios para o mesmo destino ficam separados por ``intervalo_destino``
+    segundos. As vagas são reservadas sob lock e a espera acontece fora dele,
+    então um número em espera não segura os envios para outros números.
+    """
+    
+    def __init__(self, mensagens_por_minuto: float = EVOLUTION_MENSAGENS_POR_MINUTO,
+                 rajada: int = EVOLUTION_RAJADA,
+                 intervalo_destino: float = EVOLUTION_INTERVALO_DESTINO):
+        self.mensagens_por_minuto = mensagens_por_minuto
+        self.capacidade = max(1, rajada)
+        self.intervalo_destino = max(0.0, intervalo_destino)
+        self._taxa = mensagens_por_minuto / 60.0  # fichas por segundo
+        self._fichas = float(self.capacidade)
+        self._atualizado = time.monotonic()
+        self._ultimo_por_destino: Dict[str, float] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._liberados = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+    
+    @property
+    def ativo(self) -> bool:
+        return self._taxa > 0
+    
+    def _reabastecer(self, agora: float):
+        """Acrescenta as fichas geradas desde a última leitura"""
+        self._fichas = min(self.capacidade,
+                           self._fichas + (agora - self._atualizado) * self._taxa)
+        self._atualizado = agora
+    
+    def _reservar(self, destino: Optional[str]) -> float:
+        """Consome uma ficha e retorna quantos segundos esperar por ela"""
+        agora = time.monotonic()
+        self._reabastecer(agora)
+        # Saldo negativo = fichas já prometidas a quem está esperando
+        self._fichas -= 1
+        espera = -self._fichas / self._taxa if self._fichas < 0 else 0.0
+        
+        if destino and self.intervalo_destino > 0:
+            ultimo = self._ultimo_por_destino.get(destino)
+            if ultimo is not None:
+                espera = max(espera, ultimo + self.intervalo_destino - agora)
+            self._ultimo_por_destino[destino] = agora + espera
+            if len(self._ultimo_por_destino) > 1000:
+                self._descartar_destinos_antigos(agora)
+        return espera
+    
+    def _descartar_destinos_antigos(self, agora: float):
+        """Remove destinos cujo intervalo mínimo já passou"""
+        limite = agora - self.intervalo_destino
+        for destino in [d for d, t in self._ultimo_por_destino.items() if t < limite]:
+            del self._ultimo_por_destino[destino]
+    
+    async def aguardar(self, destino: Optional[str] = None) -> float:
+        """Espera a vez de enviar para ``destino``; retorna o tempo esperado"""
+        if not self.ativo:
+            return 0.0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            espera = self._reservar(destino)
+        
+        if espera > 0:
+            try:
+                await asyncio.sleep(espera)
+            except asyncio.CancelledError:
+                # Devolver a ficha reservada para não penalizar os próximos
+                self._fichas = min(self.capacidade, self._fichas + 1)
+                raise
+            self._esperas += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+        self._liberados += 1
+        return espera
+    
+    def estatisticas(self) -> Dict:
+        """Nível atual do balde e tempos de espera acumulados"""
+        if self.ativo:
+            self._reabastecer(time.monotonic())
+        return {
+            'ativo': self.ativo,
+            'mensagens_por_minuto': self.mensagens_por_minuto,
+            'capacidade': self.capacidade,
+            'fichas': round(max(self._fichas, 0.0), 2),
+            'reservas_pendentes': math.ceil(-self._fichas) if self._fichas < 0 else 0,
+            'intervalo_destino': self.intervalo_destino,
+            'envios_liberados': self._liberados,
+            'envios_com_espera': self._esperas,
+            'espera_media': round(self._espera_total / self._esperas, 2) if self._esperas else 0.0,
+            'espera_maxima': round(self._espera_maxima, 2),
+        }
+
+class PoliticaRetentativa:
+    """Decide quando repetir uma chamada à Evolution API e quanto esperar.
+    
+    São transitórios: timeouts, falhas de conexão e os status 408, 425, 429
+    e 5xx de gateway/indisponibilidade. Os demais (400, 401, 404...) são
+    definitivos e devolvidos na hora. A espera segue backoff exponencial com
+    jitter completo, ou o Retry-After enviado pela API, sem passar do prazo.
+    """
+    
+    STATUS_TRANSITORIOS = frozenset({408, 425, 429, 500, 502, 503, 504})
+    
+    def __init__(self, tentativas: int = EVOLUTION_TENTATIVAS,
+                 base: float = EVOLUTION_BACKOFF_BASE,
+                 maximo: float = EVOLUTION_BACKOFF_MAX,
+                 prazo: float = EVOLUTION_PRAZO_CHAMADA):
+        self.tentativas = max(1, tentativas)
+        self.base = base
+        self.maximo = maximo
+        self.prazo = prazo
+    
+    def status_transitorio(self, status: int) -> bool:
+        return status in self.STATUS_TRANSITORIOS
+    
+    @staticmethod
+    def excecao_transitoria(erro: BaseException) -> bool:
+        return isinstance(erro, (asyncio.TimeoutError, aiohttp.ClientConnectionError,
+                                 aiohttp.ClientPayloadError))
+    
+    @staticmethod
+    def ler_retry_after(valor: Optional[str]) -> Optional[float]:
+        """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos"""
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            pass
+        try:
+            quando = parsedate_to_datetime(valor)
+        except (TypeError, ValueError):
+            return None
+        if quando.tzinfo is None:
+            quando = quando.replace(tzinfo=timezone.utc)
+        return max(0.0, (quando - datetime.now(timezone.utc)).total_seconds())
+    
+    def espera(self, tentativa: int, retry_after: Optional[float] = None) -> float:
+        """Segundos até a próxima tentativa, depois da tentativa número ``tentativa``"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.maximo, self.base * 2 ** (tentativa - 1)))
+
+
+class CircuitoAberto(Exception):
+    """Envio recusado na hora porque o circuito da Evolution API está aberto"""
+
+
+class DisjuntorEvolution:
+    """Circuit breaker dos envios à Evolution API.
+    
+    Fechado: os envios passam e as falhas transitórias seguidas são contadas.
+    Ao chegar a ``falhas_para_abrir`` o circuito abre e todo envio falha na
+    hora com CircuitoAberto. Passados ``tempo_aberto`` segundos, o próximo
+    envio vira sondagem (semiaberto): só ele consulta a instância, enquanto
+    os demais continuam recusados; se a instância responder conectada o
+    circuito fecha, senão volta a abrir.
+    """
+    
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    SEMIABERTO = 'semiaberto'
+    
+    def __init__(self, falhas_para_abrir: int = EVOLUTION_DISJUNTOR_FALHAS,
+                 tempo_aberto: float = EVOLUTION_DISJUNTOR_ESPERA):
+        self.falhas_para_abrir = max(1, falhas_para_abrir)
+        self.tempo_aberto = tempo_aberto
+        self.estado = self.FECHADO
+        self.falhas_consecutivas = 0
+        self.ultima_falha: Optional[str] = None
+        self._desde = time.monotonic()
+        self._aberturas = 0
+        self._recusados = 0
+    
+    def _mudar(self, estado: str):
+        if estado != self.estado:
+            logger.warning(f"Circuito da Evolution API: {self.estado} -> {estado}")
+            self.estado = estado
+            self._desde = time.monotonic()
+    
+    def _abrir(self):
+        self._aberturas += 1
+        self._mudar(self.ABERTO)
+    
+    def segundos_para_sondagem(self) -> float:
+        if self.estado != self.ABERTO:
+            return 0.0
+        return max(0.0, self._desde + self.tempo_aberto - time.monotonic())
+    
+    def aceitando(self) -> bool:
+        """True se um envio agora não seria recusado sem tentar"""
+        if self.estado == self.FECHADO:
+            return True
+        return self.estado == self.ABERTO and self.segundos_para_sondagem() == 0
+    
+    def _recusar(self):
+        self._recusados += 1
+        if self.estado == self.SEMIABERTO:
+            raise CircuitoAberto("Evolution API em verificação (circuito semiaberto)")
+        raise CircuitoAberto(f"Evolution API indisponível (circuito aberto, nova "
+                             f"verificação em {self.segundos_para_sondagem():.0f}s)")
+    
+    async def liberar(self, sondar: Callable[[], Awaitable[bool]]):
+        """Deixa o envio seguir ou levanta CircuitoAberto.
+        
+        Com o circuito aberto e o prazo vencido, executa ``sondar`` antes.
+        """
+        if self.estado == self.FECHADO:
+            return
+        if not self.aceitando():
+            self._recusar()
+        
+        # A mudança para semiaberto acontece antes do primeiro await, então
+        # envios concorrentes já encontram a sondagem em andamento
+        self._mudar(self.SEMIABERTO)
+        try:
+            conectado = await sondar()
+        except Exception as e:
+            logger.error(f"Erro na sondagem da Evolution API: {e}")
+            conectado = False
+        except BaseException:
+            # Sondagem cancelada (ex.: wait_for do chamador estourou): volta a
+            # aberto já com o prazo vencido, para o próximo envio sondar de novo
+            self._mudar(self.ABERTO)
+            self._desde -= self.tempo_aberto
+            raise
+        if conectado:
+            self.falhas_consecutivas = 0
+            self._mudar(self.FECHADO)
+            return
+        self.ultima_falha = "Sondagem: instância não conectada"
+        self._mudar(self.ABERTO)
+        self._recusar()
+    
+    def registrar_sucesso(self):
+        self.falhas_consecutivas = 0
+    
+    def registrar_falha(self, erro: str):
+        self.falhas_consecutivas += 1
+        self.ultima_falha = erro
+        if self.estado == self.FECHADO and self.falhas_consecutivas >= self.falhas_para_abrir:
+            self._abrir()
+    
+    def descricao(self) -> str:
+        """Estado em uma linha, para as telas de status"""
+        if self.estado == self.FECHADO:
+            return "🟢 Fechado (envios normais)"
+        if self.estado == self.SEMIABERTO:
+            return "🟡 Semiaberto (verificando a instância)"
+        return f"🔴 Aberto (nova verificação em {self.segundos_para_sondagem():.0f}s)"
+    
+    def estatisticas(self) -> Dict:
+        return {
+            'estado': self.estado,
+            'falhas_consecutivas': self.falhas_consecutivas,
+            'falhas_para_abrir': self.falhas_para_abrir,
+            'tempo_aberto': self.tempo_aberto,
+            'segundos_no_estado': round(time.monotonic() - self._desde),
+            'segundos_para_sondagem': round(self.segundos_para_sondagem()),
+            'aberturas': self._aberturas,
+            'recusados': self._recusados,
+            'ultima_falha': self.ultima_falha,
+        }
+
+
 class WhatsAppService:
     """Serviço para integração com Evolution API"""
     
@@ -22,17 +318,50 @@ class WhatsAppService:
         self.api_key = EVOLUTION_API_KEY
         self.instance_name = EVOLUTION_INSTANCE_NAME
         self.session = None
+        # Limite de envio compartilhado por mensagens avulsas, com mídia e lotes
+        self.limitador = LimitadorTaxa()
+        self.politica = PoliticaRetentativa()
+        self.disjuntor = DisjuntorEvolution()
+        # Último estado da conexão (connectionState) e quando foi obtido
+        self._estado: Optional[Dict] = None
+        self._estado_em = 0.0
+        self._consulta_estado: Optional[asyncio.Task] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._conectado: Optional[asyncio.Event] = None
+        # Latência e taxa de acerto de cada estratégia de obtenção do QR Code
+        self._stats_qr: Dict[str, Dict] = {}
+        # Imagem do QR Code por instância (bytes, validade) e geração em andamento
+        self._qr_cache: Dict[str, Tuple[bytes, float]] = {}
+        self._qr_em_andamento: Dict[str, asyncio.Future] = {}
+        self._reconexao: Optional[asyncio.Future] = None
+        # Verdadeiro quando o estado chega por eventos do webhook: o monitor
+        # passa a consultar a API só de vez em quando
+        self.estado_por_eventos = False
     
     async def get_session(self):
         """Retorna uma sessão HTTP reutilizável"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            # Conector limitado, com keep-alive e cache de DNS, para reaproveitar
+            # conexões já abertas com a Evolution API entre os envios
+            connector = aiohttp.TCPConnector(
+                limit=EVOLUTION_CONEXOES_MAX,
+                limit_per_host=EVOLUTION_CONEXOES_POR_HOST,
+                keepalive_timeout=EVOLUTION_KEEPALIVE,
+                ttl_dns_cache=EVOLUTION_DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=EVOLUTION_TIMEOUT,
+                                              connect=EVOLUTION_TIMEOUT_CONEXAO),
+            )
         return self.session
     
     async def close_session(self):
-        """Fecha a sessão HTTP"""
+        """Fecha a sessão HTTP (e o conector)"""
         if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
     
     def get_headers(self) -> Dict[str, str]:
         """Retorna os headers para requisições à Evolution API"""
@@ -41,11 +370,125 @@ class WhatsAppService:
             'apikey': self.api_key
         }
     
-    async def enviar_mensagem(self, telefone: str, mensagem: str) -> bool:
+    @asynccontextmanager
+    async def _requisitar(self, metodo: str, url: str, destino: Optional[str] = None,
+                          registro: Optional[Dict] = None, prazo: Optional[float] = None,
+                          **kwargs):
+        """Faz a requisição na sessão compartilhada, repetindo erros transitórios.
+        
+        Uso: ``async with self._requisitar('POST', url, json=...) as response``.
+        ``prazo`` é o tempo total da chamada (padrão EVOLUTION_PRAZO_CHAMADA),
+        contando esperas do limitador e das retentativas; quem tem orçamento
+        de tela passa o seu aqui em vez de envolver a chamada em wait_for.
+        Cada tentativa tem o timeout pedido (ou o padrão da sessão), limitado
+        ao que resta do prazo. Com ``destino`` (envios) a chamada passa pelo
+        circuit breaker e cada tentativa pelo limitador de envio; o intervalo
+        entre mensagens ao mesmo número vale só para a primeira, já que as
+        retentativas repetem a mesma mensagem. O número de tentativas feitas
+        é gravado em ``registro['tentativas']``. Esgotadas as tentativas,
+        devolve a última resposta recebida ou propaga a última exceção.
+        """
+        session = await self.get_session()
+        politica = self.politica
+        kwargs.setdefault('headers', self.get_headers())
+        timeout = kwargs.pop('timeout', None)
+        total_tentativa = (timeout.total if timeout and timeout.total
+                           else EVOLUTION_TIMEOUT)
+        prazo = politica.prazo if prazo is None else prazo
+        limite = time.monotonic() + prazo
+        if destino:
+            await self.disjuntor.liberar(self._sondar_instancia)
+            await self._aguardar_limitador(destino, limite, prazo)
+        
+        tentativa = 0
+        motivo = None
+        # Desfecho para o circuit breaker: resposta definitiva da API ou a
+        # falha transitória que encerrou a chamada. Cancelamento e exceções
+        # não transitórias deixam os dois vazios e não contam
+        respondeu = False
+        falha_transitoria = None
+        try:
+            while True:
+                tentativa += 1
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    falha_transitoria = motivo
+                    raise asyncio.TimeoutError(f"Prazo de {prazo:g}s esgotado")
+                try:
+                    response = await session.request(
+                        metodo, url,
+                        timeout=aiohttp.ClientTimeout(total=min(total_tentativa, restante),
+                                                      connect=EVOLUTION_TIMEOUT_CONEXAO),
+                        **kwargs)
+                except Exception as e:
+                    if not politica.excecao_transitoria(e):
+                        raise
+                    motivo = f"{type(e).__name__}: {e}"
+                    espera = politica.espera(tentativa)
+                    if (tentativa >= politica.tentativas
+                            or time.monotonic() + espera >= limite):
+                        falha_transitoria = motivo
+                        raise
+                else:
+                    if not politica.status_transitorio(response.status):
+                        respondeu = True
+                        break
+                    motivo = f"HTTP {response.status}"
+                    if tentativa >= politica.tentativas:
+                        falha_transitoria = motivo
+                        break
+                    espera = politica.espera(tentativa, politica.ler_retry_after(
+                        response.headers.get('Retry-After')))
+                    if time.monotonic() + espera >= limite:
+                        falha_transitoria = motivo
+                        break
+                    response.release()
+                
+                logger.warning(f"{metodo} {url} falhou ({motivo}); tentativa "
+                               f"{tentativa + 1}/{politica.tentativas} em {espera:.1f}s")
+                await asyncio.sleep(espera)
+                if destino:
+                    await self._aguardar_limitador(None, limite, prazo)
+        finally:
+            if registro is not None:
+                registro['tentativas'] = tentativa
+            if destino:
+                # Só falhas transitórias contam; 4xx definitivo prova que a API responde
+                if respondeu:
+                    self.disjuntor.registrar_sucesso()
+                elif falha_transitoria:
+                    self.disjuntor.registrar_falha(falha_transitoria)
+        
+        try:
+            yield response
+        finally:
+            response.release()
+    
+    async def _aguardar_limitador(self, destino: Optional[str], limite: float, prazo: float):
+        """Espera a vez no limitador sem passar do ``limite`` da chamada"""
+        try:
+            await asyncio.wait_for(self.limitador.aguardar(destino),
+                                   max(0.0, limite - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Prazo de {prazo:g}s esgotado aguardando o limite de envio")
+    
+    async def enviar_mensagem(self, telefone: str, mensagem: str,
+                              prazo: Optional[float] = None) -> bool:
         """Envia mensagem via WhatsApp usando Evolution API"""
+        resultado = await self.enviar_mensagem_resultado(telefone, mensagem, prazo)
+        return resultado['sucesso']
+    
+    async def enviar_mensagem_resultado(self, telefone: str, mensagem: str,
+                                        prazo: Optional[float] = None) -> Dict:
+        """Envia a mensagem e detalha o resultado.
+        
+        Retorna {'sucesso', 'tentativas', 'erro', 'mensagem_id'}, para quem
+        registra o envio em mensagens_log; ``mensagem_id`` é o id da mensagem no
+        WhatsApp, ao qual os recibos de entrega do webhook se referem.
+        ``prazo`` limita o envio inteiro (ver _requisitar).
+        """
+        registro = {'tentativas': 0}
         try:
-            session = await self.get_session()
-            
             # Formatar o número de telefone
             numero_formatado = self.formatar_numero_whatsapp(telefone)
             
@@ -59,28 +502,103 @@ class WhatsAppService:
             url = f"{self.api_url}/message/sendText/{self.instance_name}"
             logger.info(f"Enviando mensagem para {numero_formatado} via URL: {url}")
             
-            async with session.post(url, json=data, headers=self.get_headers()) as response:
+            async with self._requisitar('POST', url, destino=numero_formatado,
+                                        registro=registro, prazo=prazo,
+                                        json=data) as response:
                 if response.status == 200:
                     response_data = await response.json()
                     logger.info(f"Mensagem enviada para {telefone}: {response_data}")
-                    return True
+                    chave = response_data.get('key') if isinstance(response_data, dict) else None
+                    return {'sucesso': True, 'tentativas': registro['tentativas'], 'erro': None,
+                            'mensagem_id': chave.get('id') if isinstance(chave, dict) else None}
                 else:
                     error_text = await response.text()
                     logger.error(f"Erro ao enviar mensagem para {telefone}: {response.status} - {error_text}")
-                    return False
+                    return {'sucesso': False, 'tentativas': registro['tentativas'],
+                            'erro': f"HTTP {response.status}: {error_text[:200]}",
+                            'mensagem_id': None}
                     
+        except CircuitoAberto as e:
+            logger.warning(f"Envio para {telefone} recusado: {e}")
+            return {'sucesso': False, 'tentativas': 0, 'erro': str(e), 'mensagem_id': None}
         except Exception as e:
             logger.error(f"Exceção ao enviar mensagem para {telefone}: {str(e)}")
             logger.error(f"URL tentada: {self.api_url}/message/sendText/{self.instance_name}")
             logger.error(f"Configurações: API_URL={self.api_url}, INSTANCE={self.instance_name}")
-            return False
+            return {'sucesso': False, 'tentativas': registro['tentativas'],
+                    'erro': f"{type(e).__name__}: {e}", 'mensagem_id': None}
+    
+    def estatisticas_disjuntor(self) -> Dict:
+        """Estado do circuit breaker dos envios"""
+        return self.disjuntor.estatisticas()
+    
+    def estatisticas_limite(self) -> Dict:
+        """Estado do limitador de envio (tela da fila e /saude)"""
+        return self.limitador.estatisticas()
+    
+    async def enviar_lote(self, mensagens: Iterable[Tuple[str, str]],
+                          concorrencia: int = EVOLUTION_LOTE_CONCORRENCIA) -> AsyncIterator[Dict]:
+        """Envia várias mensagens em paralelo na sessão compartilhada.
+        
+        ``mensagens`` é um iterável de pares (telefone, texto). Os envios são
+        distribuídos entre ``concorrencia`` workers, respeitando o limitador de
+        envio do serviço, e os resultados são devolvidos à
+        medida que terminam::
+        
+            async for resultado in ws.enviar_lote(pares):
+                resultado  # {'indice', 'telefone', 'sucesso', 'tentativas', 'erro',
+                           #  'mensagem_id', 'sem_whatsapp'}
+        
+        Números que a verificação aponta como sem WhatsApp não são enviados e
+        voltam com ``sem_whatsapp`` verdadeiro. Interromper a iteração cancela
+        os envios ainda pendentes.
+        """
+        mensagens = list(mensagens)
+        try:
+            existentes = await self.verificar_numeros([telefone for telefone, _ in mensagens])
+        except Exception as e:
+            logger.warning(f"Verificação de números indisponível, enviando sem filtro: {e}")
+            existentes = {}
+        
+        entrada: asyncio.Queue = asyncio.Queue()
+        saida: asyncio.Queue = asyncio.Queue()
+        for indice, (telefone, texto) in enumerate(mensagens):
+            if existentes.get(telefone) is False:
+                saida.put_nowait({'indice': indice, 'telefone': telefone, 'sucesso': False,
+                                  'tentativas': 0, 'erro': "Número sem WhatsApp",
+                                  'mensagem_id': None, 'sem_whatsapp': True})
+            else:
+                entrada.put_nowait((indice, telefone, texto))
+        total = len(mensagens)
+        
+        async def trabalhador():
+            while True:
+                try:
+                    indice, telefone, texto = entrada.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    resultado = await self.enviar_mensagem_resultado(telefone, texto)
+                except Exception as e:
+                    resultado = {'sucesso': False, 'tentativas': 0, 'erro': str(e),
+                                 'mensagem_id': None}
+                await saida.put({'indice': indice, 'telefone': telefone,
+                                 'sem_whatsapp': False, **resultado})
+        
+        tarefas = [asyncio.create_task(trabalhador())
+                   for _ in range(min(max(1, concorrencia), entrada.qsize()))]
+        try:
+            for _ in range(total):
+                yield await saida.get()
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
     
     async def enviar_mensagem_com_midia(self, telefone: str, mensagem: str, 
                                        midia_url: str, tipo_midia: str = "image") -> bool:
         """Envia mensagem com mídia (imagem, documento, etc.)"""
         try:
-            session = await self.get_session()
-            
             numero_formatado = self.formatar_numero_whatsapp(telefone)
             
             # Dados da mensagem com mídia
@@ -101,7 +619,8 @@ class WhatsAppService:
             endpoint = endpoint_map.get(tipo_midia, "sendMedia")
             url = f"{self.api_url}/message/{endpoint}/{self.instance_name}"
             
-            async with session.post(url, json=data, headers=self.get_headers()) as response:
+            async with self._requisitar('POST', url, destino=numero_formatado,
+                                        json=data) as response:
                 if response.status == 200:
                     response_data = await response.json()
                     logger.info(f"Mensagem com mídia enviada para {telefone}: {response_data}")
@@ -115,24 +634,81 @@ class WhatsAppService:
             logger.error(f"Exceção ao enviar mídia para {telefone}: {e}")
             return False
     
-    async def verificar_status_instancia(self) -> Optional[Dict]:
+    def registrar_estado(self, estado: Dict):
+        """Guarda o estado da conexão recebido (consulta ou evento)"""
+        anterior = self._estado.get('state') if self._estado else None
+        self._estado = estado
+        self._estado_em = time.monotonic()
+        if estado.get('state') != anterior:
+            logger.info(f"Estado da instância {self.instance_name}: {anterior} -> {estado.get('state')}")
+        # Acorda quem espera a conexão (aguardar_conexao_estavel)
+        evento = self._evento_conectado()
+        if estado.get('state') in ('open', 'connected'):
+            evento.set()
+            # QR Code já foi usado; o próximo pedido deve gerar outro
+            self.invalidar_qr_code()
+        else:
+            evento.clear()
+    
+    def _evento_conectado(self) -> asyncio.Event:
+        if self._conectado is None:
+            self._conectado = asyncio.Event()
+        return self._conectado
+    
+    def invalidar_estado(self):
+        """Descarta o estado em memória (após reiniciar, desconectar, recriar...)"""
+        self._estado_em = 0.0
+        self.invalidar_qr_code()
+    
+    def idade_estado(self) -> Optional[float]:
+        """Segundos desde a última atualização do estado (None se nunca obtido)"""
+        if self._estado is None:
+            return None
+        return time.monotonic() - self._estado_em
+    
+    async def verificar_status_instancia(self, max_idade: Optional[float] = None) -> Optional[Dict]:
+        """Estado da instância, lido da memória enquanto tiver até ``max_idade``
+        segundos (padrão EVOLUTION_ESTADO_TTL).
+        
+        Fora disso consulta a API; chamadas simultâneas compartilham a mesma
+        consulta. Com o monitor rodando o valor em memória está sempre fresco.
+        """
+        limite = self._validade_estado() if max_idade is None else max_idade
+        idade = self.idade_estado()
+        if idade is not None and idade <= limite:
+            return dict(self._estado)
+        
+        if self._consulta_estado is None or self._consulta_estado.done():
+            self._consulta_estado = asyncio.ensure_future(self._consultar_estado_instancia())
+        return dict(await asyncio.shield(self._consulta_estado))
+    
+    def _validade_estado(self) -> float:
+        """Validade do estado em memória; maior quando ele chega por eventos"""
+        if self.estado_por_eventos:
+            return max(EVOLUTION_ESTADO_TTL, 2 * EVOLUTION_ESTADO_INTERVALO_EVENTOS)
+        return EVOLUTION_ESTADO_TTL
+    
+    async def _consultar_estado_instancia(self) -> Dict:
+        """Consulta /instance/connectionState e atualiza o estado em memória"""
+        estado = await self._buscar_estado_instancia()
+        self.registrar_estado(estado)
+        return estado
+    
+    async def _buscar_estado_instancia(self) -> Dict:
         """Obtém informações detalhadas do status da instância"""
         try:
-            session = await self.get_session()
-            
             url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
-            logger.info(f"Verificando status via URL: {url}")
+            logger.debug(f"Verificando status via URL: {url}")
             
-            async with session.get(url, 
-                                 headers=self.get_headers(),
-                                 allow_redirects=True,
-                                 timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with self._requisitar('GET', url,
+                                        allow_redirects=True,
+                                        timeout=aiohttp.ClientTimeout(total=15)) as response:
                 
-                logger.info(f"Status da verificação: {response.status}")
+                logger.debug(f"Status da verificação: {response.status}")
                 
                 if response.status == 200:
                     data = await response.json()
-                    logger.info(f"Status da instância {self.instance_name}: {data}")
+                    logger.debug(f"Status da instância {self.instance_name}: {data}")
                     return data.get('instance', {})
                 elif response.status == 404:
                     logger.warning(f"Instância {self.instance_name} não existe")
@@ -145,39 +721,73 @@ class WhatsAppService:
         except Exception as e:
             logger.error(f"Exceção ao verificar status da instância: {e}")
             return {'state': 'error', 'message': str(e)}
-
-    async def verificar_status(self) -> bool:
+    
+    async def _sondar_instancia(self) -> bool:
+        """Sondagem do circuito semiaberto: uma única consulta curta ao
+        connectionState, fora da política de retentativas"""
+        session = await self.get_session()
+        url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
+        timeout = aiohttp.ClientTimeout(total=EVOLUTION_SONDAGEM_TIMEOUT,
+                                        connect=min(EVOLUTION_TIMEOUT_CONEXAO,
+                                                    EVOLUTION_SONDAGEM_TIMEOUT))
+        async with session.get(url, headers=self.get_headers(), timeout=timeout) as response:
+            if response.status != 200:
+                logger.warning(f"Sondagem da Evolution API: HTTP {response.status}")
+                return False
+            estado = (await response.json()).get('instance', {})
+        self.registrar_estado(estado)
+        return estado.get('state') in ('open', 'connected')
+    
+    async def verificar_status(self, max_idade: Optional[float] = None) -> bool:
         """Verifica se a instância do WhatsApp está conectada"""
         try:
-            session = await self.get_session()
-            
-            url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
-            
-            async with session.get(url, headers=self.get_headers()) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    status = data.get('instance', {}).get('state', '')
-                    
-                    # Estados que indicam conexão ativa (mais rigoroso)
-                    estados_conectados = ['open', 'connected']  # Removido 'connecting' para ser mais específico
-                    conectado = status in estados_conectados
-                    
-                    logger.info(f"Status da instância {self.instance_name}: {status}")
-                    return conectado
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Erro ao verificar status: {response.status} - {error_text}")
-                    return False
-                    
+            estado = await self.verificar_status_instancia(max_idade)
+            # Estados que indicam conexão ativa (mais rigoroso)
+            estados_conectados = ['open', 'connected']  # Removido 'connecting' para ser mais específico
+            return bool(estado) and estado.get('state', '') in estados_conectados
         except Exception as e:
             logger.error(f"Exceção ao verificar status: {e}")
             return False
     
+    async def _monitorar_estado(self):
+        """Mantém o estado da conexão atualizado; mais frequente se desconectado.
+        
+        Com o webhook entregando CONNECTION_UPDATE a consulta só confere o
+        estado, a cada EVOLUTION_ESTADO_INTERVALO_EVENTOS segundos.
+        """
+        while True:
+            try:
+                estado = await self._consultar_estado_instancia()
+                conectado = estado.get('state') in ('open', 'connected')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no monitor de conexão: {e}")
+                conectado = False
+            if self.estado_por_eventos:
+                intervalo = EVOLUTION_ESTADO_INTERVALO_EVENTOS
+            elif conectado:
+                intervalo = EVOLUTION_ESTADO_INTERVALO
+            else:
+                intervalo = min(5.0, EVOLUTION_ESTADO_INTERVALO)
+            await asyncio.sleep(intervalo)
+    
+    def iniciar_monitor(self):
+        """Inicia o monitor de conexão no event loop atual (idempotente)"""
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitorar_estado(),
+                                                name="monitor-conexao-whatsapp")
+    
+    async def parar_monitor(self):
+        """Interrompe o monitor de conexão"""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+    
     async def criar_instancia(self) -> bool:
         """Cria uma nova instância do WhatsApp com configurações estabilizadas"""
         try:
-            session = await self.get_session()
-            
             data = {
                 "instanceName": self.instance_name,
                 "qrcode": True,
@@ -189,7 +799,7 @@ class WhatsAppService:
                 "readMessages": True,
                 "readStatus": True,
                 "syncFullHistory": False,
-                "webhookEvents": ["QRCODE_UPDATED", "CONNECTION_UPDATE", "MESSAGES_UPSERT"],
+                "webhookEvents": list(EVENTOS_WEBHOOK),
                 "websocket": {
                     "events": ["QRCODE_UPDATED", "CONNECTION_UPDATE"]
                 }
@@ -198,16 +808,17 @@ class WhatsAppService:
             url = f"{self.api_url}/instance/create"
             logger.info(f"Criando instância via URL: {url} com dados: {data}")
             
-            async with session.post(url, 
-                                  json=data, 
-                                  headers=self.get_headers(),
-                                  timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with self._requisitar('POST', url,
+                                        json=data,
+                                        timeout=aiohttp.ClientTimeout(total=30)) as response:
                 
                 logger.info(f"Status da criação: {response.status}")
                 
                 if response.status in [200, 201]:
                     response_data = await response.json()
                     logger.info(f"Instância criada: {response_data}")
+                    self.invalidar_estado()
+                    await self.configurar_webhook()
                     return True
                 else:
                     error_text = await response.text()
@@ -218,16 +829,45 @@ class WhatsAppService:
             logger.error(f"Exceção ao criar instância: {e}")
             return False
     
+    async def configurar_webhook(self, url: str = EVOLUTION_WEBHOOK_URL) -> bool:
+        """Aponta o webhook da instância para o servidor do bot (sem URL pública
+        configurada, não faz nada)"""
+        if not url:
+            return False
+        if EVOLUTION_WEBHOOK_SEGREDO:
+            url = f"{url}{'&' if '?' in url else '?'}segredo={EVOLUTION_WEBHOOK_SEGREDO}"
+        try:
+            data = {
+                "webhook": {
+                    "enabled": True,
+                    "url": url,
+                    "byEvents": False,
+                    "base64": False,
+                    "events": list(EVENTOS_WEBHOOK)
+                }
+            }
+            async with self._requisitar('POST', f"{self.api_url}/webhook/set/{self.instance_name}",
+                                        json=data,
+                                        timeout=aiohttp.ClientTimeout(total=15)) as response:
+                if response.status in [200, 201]:
+                    logger.info(f"Webhook da instância {self.instance_name} configurado")
+                    return True
+                error_text = await response.text()
+                logger.warning(f"Falha ao configurar webhook: {response.status} - {error_text[:200]}")
+                return False
+        except Exception as e:
+            logger.error(f"Erro ao configurar webhook da instância: {e}")
+            return False
+    
     async def reiniciar_instancia(self) -> bool:
         """Reinicia a instância do WhatsApp"""
         try:
-            session = await self.get_session()
-            
             url = f"{self.api_url}/instance/restart/{self.instance_name}"
             
-            async with session.post(url, headers=self.get_headers()) as response:
+            async with self._requisitar('POST', url) as response:
                 if response.status == 200:
                     logger.info(f"Instância {self.instance_name} reiniciada com sucesso")
+                    self.invalidar_estado()
                     return True
                 else:
                     error_text = await response.text()
@@ -241,13 +881,12 @@ class WhatsAppService:
     async def logout_instancia(self) -> bool:
         """Desconecta a instância do WhatsApp"""
         try:
-            session = await self.get_session()
-            
             url = f"{self.api_url}/instance/logout/{self.instance_name}"
             
-            async with session.post(url, headers=self.get_headers()) as response:
+            async with self._requisitar('POST', url) as response:
                 if response.status == 200:
                     logger.info(f"Instância {self.instance_name} desconectada com sucesso")
+                    self.invalidar_estado()
                     return True
                 else:
                     error_text = await response.text()
@@ -261,12 +900,10 @@ class WhatsAppService:
     async def obter_qr_code(self) -> Optional[Dict]:
         """Obtém o QR Code para conexão"""
         try:
-            session = await self.get_session()
-            
             url = f"{self.api_url}/instance/connect/{self.instance_name}"
             logger.info(f"Solicitando QR Code via URL: {url}")
             
-            async with session.get(url, headers=self.get_headers()) as response:
+            async with self._requisitar('GET', url) as response:
                 if response.status == 200:
                     data = await response.json()
                     logger.info(f"Resposta QR Code: {data}")
@@ -280,131 +917,229 @@ class WhatsAppService:
             logger.error(f"Exceção ao obter QR Code: {e}")
             return None
     
+    async def obter_qr_code_imagem(self) -> Optional[bytes]:
+        """Imagem PNG do QR Code da instância, pronta para enviar ao Telegram.
+        
+        Reaproveita a última imagem enquanto estiver dentro de
+        EVOLUTION_QR_VALIDADE, e pedidos simultâneos (clique duplo, duas telas)
+        esperam a mesma geração em vez de reiniciar a instância cada um.
+        """
+        chave = self.instance_name
+        em_cache = self._qr_cache.get(chave)
+        if em_cache and em_cache[1] > time.monotonic():
+            return em_cache[0]
+        
+        geracao = self._qr_em_andamento.get(chave)
+        if geracao is None or geracao.done():
+            geracao = asyncio.ensure_future(self._gerar_qr_code_bytes(chave))
+            self._qr_em_andamento[chave] = geracao
+        return await asyncio.shield(geracao)
+    
+    async def _gerar_qr_code_bytes(self, chave: str) -> Optional[bytes]:
+        import base64
+        
+        try:
+            qr_base64 = await self.gerar_qr_code_base64()
+            if not qr_base64:
+                return None
+            qr_bytes = base64.b64decode(qr_base64, validate=True)
+            self._qr_cache[chave] = (qr_bytes, time.monotonic() + EVOLUTION_QR_VALIDADE)
+            return qr_bytes
+        except Exception as e:
+            logger.error(f"Erro ao decodificar QR Code: {e}")
+            return None
+        finally:
+            self._qr_em_andamento.pop(chave, None)
+    
+    def invalidar_qr_code(self):
+        """Descarta o QR Code em memória da instância"""
+        self._qr_cache.pop(self.instance_name, None)
+    
+    def registrar_qr_code(self, qr_base64: str) -> bool:
+        """Guarda o QR Code recebido pelo evento QRCODE_UPDATED, para que o
+        próximo pedido use a imagem nova sem consultar a API"""
+        import base64
+        
+        limpo = self.validar_e_limpar_base64(qr_base64)
+        if not limpo:
+            return False
+        self._qr_cache[self.instance_name] = (base64.b64decode(limpo),
+                                              time.monotonic() + EVOLUTION_QR_VALIDADE)
+        return True
+    
+    # Estratégias para obter o QR Code. As duas primeiras só consultam a API e
+    # podem rodar em paralelo; restart e instância limpa derrubam a sessão atual
+    ESTRATEGIAS_QR_CONSULTA = ('connect', 'qrcode')
+    ESTRATEGIAS_QR_DESTRUTIVAS = ('restart', 'instancia_limpa')
+    
     async def gerar_qr_code_base64(self) -> Optional[str]:
-        """Gera novo QR Code e retorna em base64 validado"""
+        """Gera novo QR Code e retorna em base64 validado.
+        
+        Primeiro consulta /instance/connect e /instance/qrcode em paralelo
+        (a primeira resposta válida vence e a outra é cancelada). Restart e
+        recriação da instância só rodam se nenhuma consulta trouxer o QR Code
+        dentro de EVOLUTION_QR_PRAZO segundos.
+        """
         try:
-            session = await self.get_session()
-            
-            # Método 1: Tentar via endpoint connect (melhor prática Evolution API)
-            connect_url = f"{self.api_url}/instance/connect/{self.instance_name}"
-            logger.info(f"Tentando via connect: {connect_url}")
-            
-            try:
-                async with session.get(connect_url, 
-                                     headers=self.get_headers(),
-                                     timeout=aiohttp.ClientTimeout(total=20)) as response:
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"Connect response obtida: {list(data.keys()) if isinstance(data, dict) else type(data)}")
-                        
-                        qr_base64 = await self._extrair_qr_code_avancado(data)
-                        if qr_base64:
-                            validated = self.validar_e_limpar_base64(qr_base64)
-                            if validated:
-                                logger.info(f"✅ QR Code obtido via connect! Tamanho: {len(validated)}")
-                                return validated
-                    else:
-                        logger.warning(f"Endpoint connect falhou: {response.status}")
-                        
-            except Exception as e:
-                logger.warning(f"Método connect falhou: {e}")
+            qr_base64 = await self._qr_em_paralelo(EVOLUTION_QR_PRAZO)
+            if qr_base64:
+                return qr_base64
             
-            # Método 2: Tentar via endpoint direto de QR Code
-            qr_url = f"{self.api_url}/instance/qrcode/{self.instance_name}"
-            logger.info(f"Tentando via qrcode endpoint: {qr_url}")
-            
-            try:
-                async with session.get(qr_url, 
-                                     headers=self.get_headers(),
-                                     timeout=aiohttp.ClientTimeout(total=15)) as response:
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"QR endpoint response: {list(data.keys()) if isinstance(data, dict) else type(data)}")
-                        
-                        qr_base64 = await self._extrair_qr_code_avancado(data)
-                        if qr_base64:
-                            validated = self.validar_e_limpar_base64(qr_base64)
-                            if validated:
-                                logger.info(f"✅ QR Code obtido via qrcode endpoint! Tamanho: {len(validated)}")
-                                return validated
-                    else:
-                        logger.warning(f"QR endpoint falhou: {response.status}")
-                        
-            except Exception as e:
-                logger.warning(f"Método qrcode endpoint falhou: {e}")
+            logger.info("Consultas não trouxeram QR Code, partindo para o restart da instância...")
+            for nome in self.ESTRATEGIAS_QR_DESTRUTIVAS:
+                qr_base64 = await self._medir_estrategia_qr(nome)
+                if qr_base64:
+                    return qr_base64
             
-            # Método 3: MÉTODO COMPROVADO - Restart da instância com validação
-            logger.info("Executando restart da instância (método comprovado)...")
-            restart_url = f"{self.api_url}/instance/restart/{self.instance_name}"
-            
-            async with session.post(restart_url, 
-                                  headers=self.get_headers(),
-                                  timeout=aiohttp.ClientTimeout(total=25)) as response:
-                
-                logger.info(f"Status da resposta restart: {response.status}")
-                
-                if response.status in [200, 201]:
-                    data = await response.json()
-                    logger.info(f"✅ Restart executado com sucesso")
-                    
-                    # Extrair QR Code da resposta do restart usando método avançado
-                    qr_base64 = await self._extrair_qr_code_avancado(data)
-                    if qr_base64:
-                        validated = self.validar_e_limpar_base64(qr_base64)
-                        if validated:
-                            logger.info(f"✅ QR Code obtido via restart! Tamanho: {len(validated)}")
-                            return validated
-                    
-                    # Se não veio direto, aguardar e verificar status múltiplas vezes
-                    for tentativa in range(3):
-                        logger.info(f"QR Code não veio direto, verificando status... (tentativa {tentativa + 1})")
-                        await asyncio.sleep(2 + tentativa)  # Aumentar timeout a cada tentativa
-                        
-                        status_check_url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
-                        try:
-                            async with session.get(status_check_url, 
-                                                 headers=self.get_headers(),
-                                                 timeout=aiohttp.ClientTimeout(total=15)) as status_response:
-                                
-                                if status_response.status == 200:
-                                    status_data = await status_response.json()
-                                    qr_base64 = await self._extrair_qr_code_avancado(status_data)
-                                    if qr_base64:
-                                        validated = self.validar_e_limpar_base64(qr_base64)
-                                        if validated:
-                                            logger.info(f"✅ QR Code obtido via status após restart (tentativa {tentativa + 1})!")
-                                            return validated
-                        except Exception as e:
-                            logger.warning(f"Erro na verificação de status tentativa {tentativa + 1}: {e}")
-                
-                # Se restart não funcionou, tentar criar instância limpa
-                logger.info("Restart não retornou QR Code válido, tentando instância limpa...")
-                await self._deletar_e_recriar_instancia()
-                await asyncio.sleep(3)
-                
-                # Tentar restart novamente na instância limpa
-                async with session.post(restart_url, 
-                                      headers=self.get_headers(),
-                                      timeout=aiohttp.ClientTimeout(total=25)) as clean_response:
-                    
-                    if clean_response.status in [200, 201]:
-                        clean_data = await clean_response.json()
-                        qr_base64 = await self._extrair_qr_code_avancado(clean_data)
-                        if qr_base64:
-                            validated = self.validar_e_limpar_base64(qr_base64)
-                            if validated:
-                                logger.info(f"✅ QR Code obtido via restart em instância limpa!")
-                                return validated
-                
-                logger.warning("QR Code não obtido com todos os métodos")
-                return None
+            logger.warning("QR Code não obtido com todos os métodos")
+            return None
                     
         except Exception as e:
             logger.error(f"Exceção ao gerar QR Code: {e}")
             return None
     
+    async def _qr_em_paralelo(self, prazo: float) -> Optional[str]:
+        """Consulta os endpoints sem efeito colateral de forma escalonada.
+        
+        A estratégia com melhor histórico sai primeiro; a seguinte é disparada
+        se a anterior não responder dentro da sua latência típica (ou na hora,
+        sem histórico). Ao fim, as que ainda estiverem rodando são canceladas.
+        """
+        ordem = sorted(self.ESTRATEGIAS_QR_CONSULTA, key=self._custo_estrategia_qr)
+        limite = time.monotonic() + prazo
+        pendentes = set()
+        try:
+            for posicao, nome in enumerate(ordem):
+                pendentes.add(asyncio.create_task(self._medir_estrategia_qr(nome)))
+                if posicao == len(ordem) - 1:
+                    break
+                atraso = min(self._atraso_hedge_qr(nome), limite - time.monotonic())
+                if atraso > 0:
+                    qr_base64 = await self._primeiro_qr(pendentes, atraso)
+                    if qr_base64:
+                        return qr_base64
+            return await self._primeiro_qr(pendentes, limite - time.monotonic())
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+            await asyncio.gather(*pendentes, return_exceptions=True)
+    
+    @staticmethod
+    async def _primeiro_qr(pendentes: set, timeout: float) -> Optional[str]:
+        """Primeiro QR Code válido entre as tarefas, esperando até ``timeout``"""
+        limite = time.monotonic() + timeout
+        while pendentes:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return None
+            prontas, _ = await asyncio.wait(pendentes, timeout=restante,
+                                            return_when=asyncio.FIRST_COMPLETED)
+            if not prontas:
+                return None
+            for tarefa in prontas:
+                pendentes.discard(tarefa)
+                if tarefa.result():
+                    return tarefa.result()
+        return None
+    
+    def _custo_estrategia_qr(self, nome: str) -> float:
+        """Menor é melhor: estratégias sem histórico primeiro, depois por
+        taxa de acerto e latência média"""
+        stats = self._stats_qr.get(nome)
+        if not stats or not stats['execucoes']:
+            return 0.0
+        falhas = 1 - stats['sucessos'] / stats['execucoes']
+        return falhas * 100 + (stats['latencia_media'] or EVOLUTION_QR_PRAZO)
+    
+    def _atraso_hedge_qr(self, nome: str) -> float:
+        stats = self._stats_qr.get(nome)
+        if not stats or stats['latencia_media'] is None:
+            return 0.0
+        return min(stats['latencia_media'], EVOLUTION_QR_ATRASO_MAX)
+    
+    async def _medir_estrategia_qr(self, nome: str) -> Optional[str]:
+        """Executa uma estratégia e registra latência e resultado"""
+        estrategias = {
+            'connect': self._qr_via_connect,
+            'qrcode': self._qr_via_qrcode,
+            'restart': self._qr_via_restart,
+            'instancia_limpa': self._qr_via_instancia_limpa,
+        }
+        inicio = time.monotonic()
+        try:
+            qr_base64 = await estrategias[nome]()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Método {nome} falhou: {e}")
+            qr_base64 = None
+        
+        latencia = time.monotonic() - inicio
+        stats = self._stats_qr.setdefault(nome, {
+            'execucoes': 0, 'sucessos': 0, 'latencia_media': None, 'ultima_latencia': None})
+        stats['execucoes'] += 1
+        stats['ultima_latencia'] = round(latencia, 3)
+        if qr_base64:
+            stats['sucessos'] += 1
+            # Média móvel exponencial, só das execuções que trouxeram QR Code
+            media = stats['latencia_media']
+            stats['latencia_media'] = latencia if media is None else 0.7 * media + 0.3 * latencia
+            logger.info(f"✅ QR Code obtido via {nome} em {latencia:.1f}s! Tamanho: {len(qr_base64)}")
+        return qr_base64
+    
+    def estatisticas_qr(self) -> Dict[str, Dict]:
+        """Latência e acertos de cada estratégia de QR Code"""
+        return {nome: dict(stats) for nome, stats in self._stats_qr.items()}
+    
+    async def _qr_da_resposta(self, metodo: str, url: str, timeout: float) -> Optional[str]:
+        """Faz a chamada e extrai um QR Code validado da resposta, se houver"""
+        async with self._requisitar(metodo, url,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status not in (200, 201):
+                logger.warning(f"{metodo} {url} falhou: {response.status}")
+                return None
+            data = await response.json()
+            logger.debug(f"Resposta de {url}: {list(data.keys()) if isinstance(data, dict) else type(data)}")
+        qr_base64 = await self._extrair_qr_code_avancado(data)
+        return self.validar_e_limpar_base64(qr_base64) if qr_base64 else None
+    
+    async def _qr_via_connect(self) -> Optional[str]:
+        # Endpoint connect (melhor prática Evolution API)
+        return await self._qr_da_resposta(
+            'GET', f"{self.api_url}/instance/connect/{self.instance_name}", 20)
+    
+    async def _qr_via_qrcode(self) -> Optional[str]:
+        # Endpoint direto de QR Code
+        return await self._qr_da_resposta(
+            'GET', f"{self.api_url}/instance/qrcode/{self.instance_name}", 15)
+    
+    async def _qr_via_restart(self) -> Optional[str]:
+        # Restart da instância; se o QR Code não vier na resposta, consultar o status
+        restart_url = f"{self.api_url}/instance/restart/{self.instance_name}"
+        qr_base64 = await self._qr_da_resposta('POST', restart_url, 25)
+        if qr_base64:
+            return qr_base64
+        self.invalidar_estado()
+        
+        status_check_url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
+        for tentativa in range(3):
+            logger.info(f"QR Code não veio direto, verificando status... (tentativa {tentativa + 1})")
+            await asyncio.sleep(2 + tentativa)
+            try:
+                qr_base64 = await self._qr_da_resposta('GET', status_check_url, 15)
+                if qr_base64:
+                    return qr_base64
+            except Exception as e:
+                logger.warning(f"Erro na verificação de status tentativa {tentativa + 1}: {e}")
+        return None
+    
+    async def _qr_via_instancia_limpa(self) -> Optional[str]:
+        # Recriar a instância e tentar o restart nela
+        await self._deletar_e_recriar_instancia()
+        await asyncio.sleep(3)
+        return await self._qr_da_resposta(
+            'POST', f"{self.api_url}/instance/restart/{self.instance_name}", 25)
+    
     async def _extrair_qr_code_avancado(self, data: dict) -> Optional[str]:
         """Extrai QR Code de diferentes formatos de resposta da Evolution API"""
         if not isinstance(data, dict):
@@ -469,15 +1204,13 @@ class WhatsAppService:
     async def _deletar_e_recriar_instancia(self) -> bool:
         """Deleta e recria instância para garantir estado limpo"""
         try:
-            session = await self.get_session()
-            
             # Deletar instância existente
             delete_url = f"{self.api_url}/instance/delete/{self.instance_name}"
-            async with session.delete(delete_url, 
-                                    headers=self.get_headers(),
-                                    timeout=aiohttp.ClientTimeout(total=15)) as response:
+            async with self._requisitar('DELETE', delete_url,
+                                        timeout=aiohttp.ClientTimeout(total=15)) as response:
                 if response.status == 200:
                     logger.info("Instância anterior deletada para recriação")
+                    self.invalidar_estado()
                     
             await asyncio.sleep(2)
             
@@ -493,20 +1226,21 @@ class WhatsAppService:
                 "readMessages": True,
                 "readStatus": True,
                 "syncFullHistory": False,
-                "webhookEvents": ["QRCODE_UPDATED", "CONNECTION_UPDATE", "MESSAGES_UPSERT"],
+                "webhookEvents": list(EVENTOS_WEBHOOK),
                 "websocket": {
                     "events": ["QRCODE_UPDATED", "CONNECTION_UPDATE"]
                 }
             }
             
             create_url = f"{self.api_url}/instance/create"
-            async with session.post(create_url, 
-                                  headers=self.get_headers(),
-                                  json=create_data,
-                                  timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with self._requisitar('POST', create_url,
+                                        json=create_data,
+                                        timeout=aiohttp.ClientTimeout(total=30)) as response:
                 
                 if response.status in [200, 201]:
                     logger.info("Instância limpa criada com sucesso")
+                    self.invalidar_estado()
+                    await self.configurar_webhook()
                     return True
                 else:
                     logger.warning(f"Falha ao recriar instância: {response.status}")
@@ -516,40 +1250,59 @@ class WhatsAppService:
             logger.error(f"Erro ao deletar e recriar instância: {e}")
             return False
     
-
+    
     
     async def aguardar_conexao_estavel(self, timeout: int = 60) -> bool:
-        """Aguarda até que a conexão WhatsApp esteja estável"""
-        import asyncio
+        """Aguarda até que a conexão WhatsApp esteja estável.
         
+        Resolve assim que um novo estado 'open' é registrado (monitor de
+        conexão ou evento CONNECTION_UPDATE). Como reserva, consulta a API com
+        intervalos crescentes de 1 a 8 segundos, reaproveitando o estado em
+        memória quando ele foi atualizado durante a última espera.
+        """
         logger.info(f"Aguardando conexão estável por até {timeout} segundos...")
         
-        for tentativa in range(timeout // 5):  # Verificar a cada 5 segundos
+        evento = self._evento_conectado()
+        limite = time.monotonic() + timeout
+        intervalo = 1.0
+        esperado = intervalo
+        tentativa = 0
+        while True:
+            tentativa += 1
             try:
-                status = await self.verificar_status_instancia()
-                if status:
-                    state = status.get('state', '')
-                    logger.info(f"Tentativa {tentativa + 1}: Estado = {state}")
-                    
-                    if state == 'open':
-                        logger.info("✅ Conexão WhatsApp estabilizada!")
-                        return True
-                    elif state in ['close', 'connecting']:
-                        logger.info(f"Estado {state}, continuando aguardar...")
-                    else:
-                        logger.warning(f"Estado desconhecido: {state}")
-                
-                await asyncio.sleep(5)
-                
+                status = await self.verificar_status_instancia(max_idade=esperado)
+                state = status.get('state', '') if status else ''
+                logger.debug(f"Tentativa {tentativa}: Estado = {state}")
+                if state in ('open', 'connected'):
+                    logger.info("✅ Conexão WhatsApp estabilizada!")
+                    return True
             except Exception as e:
-                logger.error(f"Erro ao verificar conexão (tentativa {tentativa + 1}): {e}")
-                await asyncio.sleep(5)
+                logger.error(f"Erro ao verificar conexão (tentativa {tentativa}): {e}")
+            
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            esperado = min(intervalo, restante)
+            try:
+                await asyncio.wait_for(evento.wait(), timeout=esperado)
+                logger.info("✅ Conexão WhatsApp estabilizada!")
+                return True
+            except asyncio.TimeoutError:
+                intervalo = min(intervalo * 2, 8.0)
         
         logger.warning(f"Timeout de {timeout}s atingido, conexão não estabilizada")
         return False
-
+    
     async def reconectar_instancia(self) -> bool:
-        """Força uma reconexão da instância com aguardo de estabilização"""
+        """Força uma reconexão da instância com aguardo de estabilização.
+        
+        Chamadas simultâneas acompanham a reconexão já em andamento.
+        """
+        if self._reconexao is None or self._reconexao.done():
+            self._reconexao = asyncio.ensure_future(self._reconectar_instancia())
+        return await asyncio.shield(self._reconexao)
+    
+    async def _reconectar_instancia(self) -> bool:
         try:
             logger.info("Iniciando processo de reconexão...")
             
@@ -562,7 +1315,7 @@ class WhatsAppService:
             await asyncio.sleep(5)
             
             # 3. Gerar novo QR Code
-            qr_code = await self.gerar_qr_code_base64()
+            qr_code = await self.obter_qr_code()
             if not qr_code:
                 logger.error("Falha ao gerar QR Code após reconexão")
                 return False
@@ -582,7 +1335,7 @@ class WhatsAppService:
         except Exception as e:
             logger.error(f"Erro durante reconexão: {e}")
             return False
-
+    
     def validar_e_limpar_base64(self, base64_string: str) -> Optional[str]:
         """Valida e limpa string base64 para garantir formato correto"""
         try:
@@ -611,7 +1364,7 @@ class WhatsAppService:
         except Exception as e:
             logger.error(f"Erro ao validar base64: {e}")
             return None
-
+    
     def formatar_numero_whatsapp(self, telefone: str) -> str:
         """Formata o número de telefone para o formato do WhatsApp"""
         # Remove caracteres não numéricos
@@ -635,14 +1388,12 @@ class WhatsAppService:
     async def obter_info_contato(self, telefone: str) -> Optional[Dict]:
         """Obtém informações sobre um contato"""
         try:
-            session = await self.get_session()
-            
             numero_formatado = self.formatar_numero_whatsapp(telefone)
             
             url = f"{self.api_url}/chat/findContact/{self.instance_name}"
             data = {"number": numero_formatado}
             
-            async with session.post(url, json=data, headers=self.get_headers()) as response:
+            async with self._requisitar('POST', url, json=data) as response:
                 if response.status == 200:
                     contact_data = await response.json()
                     return contact_data
@@ -658,21 +1409,99 @@ class WhatsAppService:
     async def verificar_numero_existe(self, telefone: str) -> bool:
         """Verifica se um número existe no WhatsApp"""
         try:
-            info_contato = await self.obter_info_contato(telefone)
-            return info_contato is not None and info_contato.get('exists', False)
+            return (await self.verificar_numeros([telefone])).get(telefone, False)
         except Exception as e:
             logger.error(f"Erro ao verificar número {telefone}: {e}")
             return False
     
-    def __del__(self):
-        """Destrutor para fechar a sessão"""
-        if hasattr(self, 'session') and self.session and not self.session.closed:
-            # Como estamos em um destrutor, precisamos usar asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    loop.create_task(self.close_session())
-                else:
-                    loop.run_until_complete(self.close_session())
-            except:
-                pass  # Ignorar erros no destructor
+    async def verificar_numeros(self, telefones: Iterable[str],
+                                forcar: bool = False) -> Dict[str, bool]:
+        """Verifica em massa quais telefones têm WhatsApp: {telefone: existe}.
+        
+        Resultados recentes vêm da tabela whatsapp_contatos; o restante é
+        consultado em /chat/whatsappNumbers, em partes de
+        EVOLUTION_VERIFICACAO_LOTE números com no máximo
+        EVOLUTION_VERIFICACAO_CONCORRENCIA consultas simultâneas, e gravado.
+        Telefones que não puderam ser verificados ficam fora do resultado.
+        """
+        from database.db import obter_db
+        
+        numeros = {telefone: self.formatar_numero_whatsapp(telefone) for telefone in telefones}
+        if not numeros:
+            return {}
+        db = obter_db()
+        conhecidos = {} if forcar else await db.contatos_verificados(list(numeros.values()))
+        faltando = sorted(set(numeros.values()) - set(conhecidos))
+        
+        if faltando:
+            limite = asyncio.Semaphore(max(1, EVOLUTION_VERIFICACAO_CONCORRENCIA))
+            tamanho = max(1, EVOLUTION_VERIFICACAO_LOTE)
+            
+            async def consultar(parte: List[str]) -> List[Tuple[str, bool, Optional[str]]]:
+                async with limite:
+                    return await self._consultar_numeros(parte)
+            
+            partes = await asyncio.gather(*(consultar(faltando[i:i + tamanho])
+                                            for i in range(0, len(faltando), tamanho)))
+            novos = [resultado for parte in partes for resultado in parte]
+            await db.salvar_contatos(novos)
+            conhecidos.update((numero, existe) for numero, existe, _ in novos)
+            logger.info(f"Verificação de números: {len(novos)}/{len(faltando)} consultados, "
+                        f"{len(numeros) - len(faltando)} do cache")
+        
+        return {telefone: conhecidos[numero] for telefone, numero in numeros.items()
+                if numero in conhecidos}
+    
+    async def _consultar_numeros(self, numeros: List[str]) -> List[Tuple[str, bool, Optional[str]]]:
+        """Consulta uma parte dos números; [] se a API falhar"""
+        url = f"{self.api_url}/chat/whatsappNumbers/{self.instance_name}"
+        try:
+            async with self._requisitar('POST', url, json={"numbers": numeros}) as response:
+                if response.status not in (200, 201):
+                    error_text = await response.text()
+                    logger.error(f"Erro ao verificar números: {response.status} - {error_text}")
+                    return []
+                data = await response.json()
+        except Exception as e:
+            logger.error(f"Exceção ao verificar {len(numeros)} números: {e}")
+            return []
+        
+        if not isinstance(data, list):
+            return []
+        # A resposta segue a ordem do pedido; o número devolvido pode vir sem
+        # o nono dígito, então só se usa o campo "number" se a ordem não bater
+        if len(data) == len(numeros):
+            pares = zip(numeros, data)
+        else:
+            pedidos = set(numeros)
+            pares = ((''.join(filter(str.isdigit, str(item.get('number', '')))), item)
+                     for item in data if isinstance(item, dict))
+            pares = [(numero, item) for numero, item in pares if numero in pedidos]
+        return [(numero, bool(item.get('exists')), item.get('jid')) for numero, item in pares]
+
+
+_servico: Optional[WhatsAppService] = None
+
+
+def obter_whatsapp_service() -> WhatsAppService:
+    """Retorna a instância única do serviço, compartilhada pelo bot"""
+    global _servico
+    if _servico is None:
+        _servico = WhatsAppService()
+    return _servico
+
+
+async def iniciar_whatsapp_service(application=None):
+    """Hook post_init: abre a sessão HTTP compartilhada e o monitor de conexão"""
+    servico = obter_whatsapp_service()
+    await servico.get_session()
+    servico.iniciar_monitor()
+    logger.info("Sessão HTTP da Evolution API iniciada")
+
+
+async def encerrar_whatsapp_service(application=None):
+    """Hook post_shutdown: para o monitor e fecha a sessão HTTP compartilhada"""
+    if _servico is not None:
+        await _servico.parar_monitor()
+        await _servico.close_session()
+        logger.info("Sessão HTTP da Evolution API encerrada")